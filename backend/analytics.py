@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HLL_PRECISION = 12  # 4096 registers, ~1.6% standard error, 4 KiB per bucket
+SHARD_COUNT = 16
+
+
+class HyperLogLog:
+    """Fixed-precision HyperLogLog over 64-bit hashes"""
+
+    __slots__ = ("registers",)
+
+    _m = 1 << HLL_PRECISION
+    _alpha = 0.7213 / (1 + 1.079 / _m)
+
+    def __init__(self, registers: Optional[bytes] = None):
+        self.registers = bytearray(registers) if registers else bytearray(self._m)
+
+    def add(self, value: int):
+        index = value >> (64 - HLL_PRECISION)
+        remainder = (value << HLL_PRECISION) & 0xFFFFFFFFFFFFFFFF
+        rank = 65 - remainder.bit_length() if remainder else 65 - HLL_PRECISION
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self._m
+        estimate = self._alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+
+def visitor_hash(visitor_key: str) -> int:
+    """Stable 64-bit hash of a visitor key; the key itself is never stored"""
+    return int.from_bytes(hashlib.blake2b(visitor_key.encode(), digest_size=8).digest(), "big")
+
+
+def bucket_start(moment: datetime) -> datetime:
+    """Start of the hourly bucket a moment falls into"""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+class _Shard:
+    __slots__ = ("lock", "views", "visitors")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views: Dict[Tuple[str, datetime], int] = {}
+        self.visitors: Dict[Tuple[str, datetime], HyperLogLog] = {}
+
+
+class ViewCounter:
+    """
+    In-memory view counters flushed to `reflection_stats` in aggregate.
+
+    Recording a view touches only one shard (picked by thread) so sync
+    handlers running in the threadpool do not contend on a single lock;
+    the flush swaps each shard's dicts out and writes one row per
+    (reflection, hour) instead of one row per view.
+    """
+
+    def __init__(self, shards: int = SHARD_COUNT):
+        self._shards = [_Shard() for _ in range(shards)]
+        self._current_bucket = bucket_start(datetime.utcnow())
+        self._bucket_expires = self._current_bucket.timestamp() + 3600
+        self.recorded = 0
+        self.flushed = 0
+
+    def record_view(self, reflection_id: str, visitor_key: Optional[str] = None):
+        now = datetime.utcnow()
+        if now.timestamp() >= self._bucket_expires:
+            self._current_bucket = bucket_start(now)
+            self._bucket_expires = self._current_bucket.timestamp() + 3600
+        key = (reflection_id, self._current_bucket)
+
+        shard = self._shards[threading.get_ident() % len(self._shards)]
+        with shard.lock:
+            shard.views[key] = shard.views.get(key, 0) + 1
+            if visitor_key:
+                hll = shard.visitors.get(key)
+                if hll is None:
+                    hll = shard.visitors[key] = HyperLogLog()
+                hll.add(visitor_hash(visitor_key))
+        self.recorded += 1
+
+    def drain(self) -> Dict[Tuple[str, datetime], Tuple[int, Optional[HyperLogLog]]]:
+        """Take and reset all pending deltas"""
+        merged: Dict[Tuple[str, datetime], Tuple[int, Optional[HyperLogLog]]] = {}
+        for shard in self._shards:
+            with shard.lock:
+                views, visitors = shard.views, shard.visitors
+                shard.views, shard.visitors = {}, {}
+            for key, count in views.items():
+                total, hll = merged.get(key, (0, None))
+                shard_hll = visitors.get(key)
+                if shard_hll is not None:
+                    if hll is None:
+                        hll = shard_hll
+                    else:
+                        hll.merge(shard_hll)
+                merged[key] = (total + count, hll)
+        return merged
+
+    def restore(self, pending: Dict[Tuple[str, datetime], Tuple[int, Optional[HyperLogLog]]]):
+        """Put deltas back after a failed flush so they are not lost"""
+        shard = self._shards[0]
+        with shard.lock:
+            for key, (count, hll) in pending.items():
+                shard.views[key] = shard.views.get(key, 0) + count
+                if hll is not None:
+                    existing = shard.visitors.get(key)
+                    if existing is None:
+                        shard.visitors[key] = hll
+                    else:
+                        existing.merge(hll)
+
+    async def flush(self, db) -> int:
+        """Write pending deltas to the database, returning the number of views"""
+        pending = self.drain()
+        if not pending:
+            return 0
+        try:
+            await db.add_reflection_stats(pending)
+        except Exception:
+            self.restore(pending)
+            raise
+        views = sum(count for count, _ in pending.values())
+        self.flushed += views
+        return views
+
+
+class AnalyticsFlusher:
+    """Background task flushing a ViewCounter on an interval"""
+
+    def __init__(self, counter: ViewCounter, db, interval: float = 30.0):
+        self.counter = counter
+        self.db = db
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Final flush so views since the last interval survive a restart
+        try:
+            await self.counter.flush(self.db)
+        except Exception as e:
+            logger.error(f"Error flushing analytics on shutdown: {str(e)}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.counter.flush(self.db)
+            except Exception as e:
+                logger.error(f"Error flushing analytics: {str(e)}")
+
+
+
+
+def summarise_top(rows, limit: int):
+    """Aggregate stats rows into the `limit` most viewed reflections"""
+    totals: Dict[str, list] = {}
+    for row in rows:
+        entry = totals.setdefault(row["reflection_id"], [0, HyperLogLog()])
+        entry[0] += row["views"]
+        if row["visitors_hll"] is not None:
+            entry[1].merge(HyperLogLog(row["visitors_hll"]))
+    ranked = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+    return [(reflection_id, views, hll.count()) for reflection_id, (views, hll) in ranked]
+
+
+def summarise_series(rows, bucket: str):
+    """Aggregate hourly stats rows into hourly or daily buckets"""
+    series: Dict[datetime, list] = {}
+    for row in rows:
+        start = row["bucket_start"]
+        if bucket == "day":
+            start = start.replace(hour=0)
+        entry = series.setdefault(start, [0, HyperLogLog()])
+        entry[0] += row["views"]
+        if row["visitors_hll"] is not None:
+            entry[1].merge(HyperLogLog(row["visitors_hll"]))
+    return [(start, views, hll.count()) for start, (views, hll) in sorted(series.items())]
@@ -1,25 +1,120 @@
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
+import asyncio
+import hmac
+import logging
 import os
-import hashlib
 import secrets
 from models import AdminSession
 
-# Simple admin credentials (in production, use proper password hashing)
-ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
-ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'pranay2024')
+logger = logging.getLogger(__name__)
+
+# Cost parameters for new hashes. Argon2 defaults follow the OWASP minimum
+# (19 MiB, 2 passes); raise them if logins can afford more than ~30ms
+ARGON2_TIME_COST = int(os.environ.get("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.environ.get("ARGON2_MEMORY_COST", "19456"))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get("ARGON2_PARALLELISM", "1"))
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+
+# Hashing runs on its own small pool (argon2 releases the GIL), so logins
+# never hold up the event loop; beyond the pending limit they are refused.
+# At most half the cores, leaving the rest for serving requests
+HASH_WORKERS = int(os.environ.get("AUTH_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+MAX_PENDING_HASHES = int(os.environ.get("AUTH_MAX_PENDING", "16"))
+
+_password_context = None
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_pending_hashes = 0
+_admin_password_hash: Optional[str] = None
+# Verified against when the username is wrong, so timing does not reveal it
+_dummy_hash: Optional[str] = None
+
+
+class AuthBusyError(Exception):
+    """Too many password checks are already queued"""
+
+
+def password_context():
+    """passlib context for admin passwords (imported on first use)"""
+    global _password_context
+    if _password_context is None:
+        from passlib.context import CryptContext
+        _password_context = CryptContext(
+            schemes=["argon2", "bcrypt"],
+            deprecated="auto",
+            argon2__time_cost=ARGON2_TIME_COST,
+            argon2__memory_cost=ARGON2_MEMORY_COST,
+            argon2__parallelism=ARGON2_PARALLELISM,
+            bcrypt__rounds=BCRYPT_ROUNDS,
+        )
+    return _password_context
 
 def hash_password(password: str) -> str:
-    """Simple password hashing (in production, use bcrypt)"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash a password with argon2 (blocking; use `run_hashing` from async code)"""
+    return password_context().hash(password)
 
 def verify_password(password: str, hashed: str) -> bool:
-    """Verify password against hash"""
-    return hash_password(password) == hashed
+    """Verify a password against an argon2 or bcrypt hash in constant time"""
+    try:
+        return password_context().verify(password, hashed)
+    except (ValueError, TypeError):
+        # Malformed or unrecognised hash
+        return False
 
-async def authenticate_admin(username: str, password: str) -> Optional[str]:
-    """Authenticate admin and return session ID"""
-    if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
+def _executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="auth-hash")
+    return _hash_executor
+
+def shutdown_hash_executor():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+async def run_hashing(func, *args):
+    """Run a hashing function on the bounded auth pool"""
+    global _pending_hashes
+    if _pending_hashes >= MAX_PENDING_HASHES:
+        raise AuthBusyError()
+    _pending_hashes += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor(), func, *args)
+    finally:
+        _pending_hashes -= 1
+
+async def _admin_hash() -> str:
+    """ADMIN_PASSWORD_HASH, or ADMIN_PASSWORD hashed once on first login"""
+    global _admin_password_hash
+    if _admin_password_hash is None:
+        configured = os.environ.get("ADMIN_PASSWORD_HASH")
+        if configured:
+            if password_context().needs_update(configured):
+                logger.warning("ADMIN_PASSWORD_HASH uses outdated parameters; generate a new one with `python auth.py`")
+            _admin_password_hash = configured
+        else:
+            logger.warning("ADMIN_PASSWORD_HASH is not set; using the plaintext ADMIN_PASSWORD")
+            password = os.environ.get("ADMIN_PASSWORD", "pranay2024")
+            _admin_password_hash = await run_hashing(hash_password, password)
+    return _admin_password_hash
+
+async def _dummy() -> str:
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await run_hashing(hash_password, secrets.token_urlsafe(16))
+    return _dummy_hash
+
+async def authenticate_admin(username: str, password: str, db=None) -> Optional[str]:
+    """Authenticate admin and return session ID (raises AuthBusyError under load)"""
+    admin_username = os.environ.get("ADMIN_USERNAME", "admin")
+    username_ok = hmac.compare_digest(username.encode(), admin_username.encode())
+    # Always run a full verification so a wrong username costs the same time
+    hashed = await _admin_hash() if username_ok else await _dummy()
+    password_ok = await run_hashing(verify_password, password, hashed)
+
+    if username_ok and password_ok:
         # Import here to avoid circular imports
         from database import get_database
         
@@ -27,7 +122,7 @@ async def authenticate_admin(username: str, password: str) -> Optional[str]:
         session_id = secrets.token_urlsafe(32)
         expires_at = datetime.utcnow() + timedelta(hours=24)  # 24 hour session
         
-        db = get_database()
+        db = db or get_database()
         session = await db.create_admin_session({
             "session_id": session_id,
             "expires_at": expires_at
@@ -36,7 +131,7 @@ async def authenticate_admin(username: str, password: str) -> Optional[str]:
         return session_id
     return None
 
-async def verify_admin_session(session_id: str) -> bool:
+async def verify_admin_session(session_id: str, db=None) -> bool:
     """Verify if admin session is valid"""
     if not session_id:
         return False
@@ -44,11 +139,11 @@ async def verify_admin_session(session_id: str) -> bool:
     # Import here to avoid circular imports
     from database import get_database
     
-    db = get_database()
+    db = db or get_database()
     session = await db.get_admin_session(session_id)
     return session is not None
 
-async def logout_admin(session_id: str) -> bool:
+async def logout_admin(session_id: str, db=None) -> bool:
     """Logout admin by deleting session"""
     if not session_id:
         return False
@@ -56,7 +151,7 @@ async def logout_admin(session_id: str) -> bool:
     # Import here to avoid circular imports
     from database import get_database
     
-    db = get_database()
+    db = db or get_database()
     return await db.delete_admin_session(session_id)
 
 class AdminRequired:
@@ -66,3 +161,8 @@ class AdminRequired:
     
     async def __call__(self, session_id: Optional[str] = None) -> bool:
         return await verify_admin_session(session_id)
+
+if __name__ == "__main__":
+    # Print a hash for ADMIN_PASSWORD_HASH
+    import getpass
+    print(hash_password(getpass.getpass("Admin password: ")))
@@ -0,0 +1,42 @@
+"""
+Per-request cost of recording a reflection view.
+
+Usage: python benchmarks/analytics_overhead.py
+"""
+import sys
+import timeit
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics import ViewCounter  # noqa: E402
+
+ITERATIONS = 200_000
+
+
+def main():
+    counter = ViewCounter()
+    reflection_ids = [str(uuid.uuid4()) for _ in range(50)]
+    visitors = [f"10.0.{i // 256}.{i % 256}|Mozilla/5.0" for i in range(5000)]
+
+    state = {"i": 0}
+
+    def record():
+        i = state["i"] = state["i"] + 1
+        counter.record_view(reflection_ids[i % 50], visitors[i % 5000])
+
+    def record_anonymous():
+        i = state["i"] = state["i"] + 1
+        counter.record_view(reflection_ids[i % 50])
+
+    for name, func in (("with visitor HLL", record), ("views only", record_anonymous)):
+        seconds = min(timeit.repeat(func, number=ITERATIONS, repeat=3))
+        print(f"record_view ({name}): {seconds / ITERATIONS * 1e6:.2f} us/call")
+
+    pending = counter.drain()
+    print(f"drained {len(pending)} (reflection, hour) rows from {counter.recorded} recorded views")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Compare Database read/write latency across backends.
+
+Each URL is migrated to head, filled with a synthetic archive and then
+exercised through the Database methods the API uses. A round-trip check
+confirms tags (JSON) and datetimes come back identically on every backend.
+
+Usage:
+    python benchmarks/backend_compare.py                      # scratch SQLite only
+    python benchmarks/backend_compare.py postgresql://u:p@localhost/bench
+
+Postgres URLs must point at a disposable database: its tables are emptied.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+POSTS = 500
+READS = 300
+CONCURRENCY = 50
+WRITES = 100
+
+
+def migrate(url: str):
+    from alembic import command
+    from alembic.config import Config
+
+    os.environ["DATABASE_URL"] = url
+    command.upgrade(Config(str(BACKEND_DIR / "alembic.ini")), "head")
+
+
+def synthetic_reflection(i: int) -> dict:
+    return {
+        "title": f"Reflection {i}",
+        "excerpt": f"Excerpt for reflection {i}",
+        "content": ("Breath, presence and patient capital. " * (20 + i % 80)).strip(),
+        "category": ("blog", "journal", "artwork")[i % 3],
+        "tags": [f"tag{i % 7}", f"tag{i % 11}", "yoga"],
+        "date": datetime(2024, 1, 1, 12, 30, 15, 123456).replace(day=1 + i % 28, month=1 + i % 12),
+    }
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def timed(samples, coroutine):
+    started = time.perf_counter()
+    result = await coroutine
+    samples.append((time.perf_counter() - started) * 1000)
+    return result
+
+
+async def run(url: str):
+    from database import Database, reflections_table
+
+    db = Database(url)
+    await db.connect()
+    try:
+        await db.database.execute(reflections_table.delete())
+
+        created = []
+        for i in range(POSTS):
+            created.append(await db.create_reflection(synthetic_reflection(i)))
+
+        # Round trip: what was written must come back unchanged
+        probe = await db.get_reflection_by_id(created[7].id)
+        assert probe.tags == created[7].tags, (probe.tags, created[7].tags)
+        assert probe.date == created[7].date, (probe.date, created[7].date)
+        assert probe.created_at == created[7].created_at
+
+        results = {}
+
+        samples = []
+        for _ in range(20):
+            await timed(samples, db.get_reflections(published_only=True))
+        results["list all"] = samples
+
+        samples = []
+        for _ in range(20):
+            await timed(samples, db.get_reflections(category="journal"))
+        results["list category"] = samples
+
+        samples = []
+        for i in range(READS):
+            await timed(samples, db.get_reflection_by_id(created[i % POSTS].id))
+        results["get by id"] = samples
+
+        samples = []
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            timed(samples, db.get_reflection_by_id(created[i % POSTS].id)) for i in range(READS)
+        ))
+        concurrent_wall = (time.perf_counter() - started) * 1000
+        results[f"get by id x{READS} concurrent"] = samples
+
+        samples = []
+        for i in range(WRITES):
+            await timed(samples, db.update_reflection(created[i].id, {"title": f"Updated {i}"}))
+        results["update"] = samples
+
+        samples = []
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            timed(samples, db.create_reflection(synthetic_reflection(POSTS + i))) for i in range(WRITES)
+        ))
+        write_wall = (time.perf_counter() - started) * 1000
+        results[f"create x{WRITES} concurrent"] = samples
+
+        return results, concurrent_wall, write_wall
+    finally:
+        await db.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("urls", nargs="*")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        urls = [f"sqlite:///{tmp}/bench.db"] + args.urls
+        for url in urls:
+            migrate(url)
+            results, concurrent_wall, write_wall = asyncio.run(run(url))
+            print(f"\n{url.split('@')[-1]}")
+            print(f"  {'operation':32} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+            for name, samples in results.items():
+                print(
+                    f"  {name:32} {statistics.mean(samples):9.3f} "
+                    f"{percentile(samples, 0.5):9.3f} {percentile(samples, 0.99):9.3f}"
+                )
+            print(f"  concurrent reads wall time: {concurrent_wall:.1f} ms")
+            print(f"  concurrent creates wall time: {write_wall:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
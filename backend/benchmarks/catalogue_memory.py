@@ -0,0 +1,91 @@
+"""
+Memory and query cost of the in-memory reflection catalogue at 100k posts,
+against the same metadata held as one dict per post.
+
+Usage: python benchmarks/catalogue_memory.py
+"""
+import random
+import sys
+import timeit
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from catalogue import ReflectionCatalogue  # noqa: E402
+
+POSTS = 100_000
+CATEGORIES = ["blog", "journal", "artwork"]
+TAGS = [f"tag-{i}" for i in range(300)]
+
+
+def make_posts():
+    rng = random.Random(42)
+    start = datetime(2015, 1, 1)
+    return [
+        (
+            str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            start + timedelta(minutes=rng.randrange(10 * 365 * 24 * 60)),
+            rng.choice(CATEGORIES),
+            rng.sample(TAGS, rng.randrange(5)),
+        )
+        for _ in range(POSTS)
+    ]
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    posts = make_posts()
+    # Fresh string copies, as rows from the database would be
+    rows = [(i.encode().decode(), d, c.encode().decode(), [t.encode().decode() for t in tags]) for i, d, c, tags in posts]
+
+    def build_catalogue():
+        catalogue = ReflectionCatalogue()
+        catalogue.load(rows)
+        return catalogue
+
+    def build_dicts():
+        return [{"id": i, "date": d, "category": c, "tags": list(tags)} for i, d, c, tags in rows]
+
+    catalogue, catalogue_bytes = measure(build_catalogue)
+    dicts, dict_bytes = measure(build_dicts)
+    print(f"{POSTS} posts")
+    print(f"catalogue:     {catalogue_bytes / 1e6:.1f} MB ({catalogue_bytes / POSTS:.0f} bytes/post)")
+    print(f"list of dicts: {dict_bytes / 1e6:.1f} MB ({dict_bytes / POSTS:.0f} bytes/post, strings shared)")
+
+    # Sanity check against a plain filter
+    newest_first = sorted(dicts, key=lambda post: post["date"], reverse=True)
+    expected = [post["id"] for post in newest_first if post["category"] == "journal" and "tag-7" in post["tags"]]
+    assert catalogue.ids(category="journal", tag="tag-7") == expected
+
+    for name, query in (
+        ("first page, all", lambda: catalogue.ids(limit=20)),
+        ("first page, category", lambda: catalogue.ids(category="journal", limit=20)),
+        ("all ids for a tag", lambda: catalogue.ids(tag="tag-7")),
+        ("category + tag", lambda: catalogue.ids(category="journal", tag="tag-7")),
+        ("count for a category", lambda: catalogue.count(category="artwork")),
+    ):
+        number = 200
+        seconds = min(timeit.repeat(query, number=number, repeat=3))
+        print(f"{name}: {seconds / number * 1e6:.1f} us/query")
+
+    new_id = str(uuid.uuid4())
+    seconds = timeit.timeit(
+        lambda: (catalogue.upsert(new_id, datetime(2020, 6, 1), "blog", ["tag-1", "tag-2"], True),
+                 catalogue.remove(new_id)),
+        number=200,
+    )
+    print(f"upsert + remove: {seconds / 200 * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Import-time and app-construction budget for cold starts.
+
+Runs `python -X importtime -c "import server"` in a fresh interpreter,
+then times create_app() and the first startup against a scratch SQLite
+database migrated to head (startup reads the schema, e.g. to load the
+catalogue, so an empty file would not be representative). Exits non-zero
+if the import exceeds IMPORT_BUDGET_MS.
+
+Usage: python benchmarks/cold_start.py [--budget-ms 600]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+IMPORT_BUDGET_MS = 600
+
+
+def measure_import(module: str, repeat: int = 5):
+    """Best of `repeat` runs of (total_ms, [(cumulative_ms, name)]) for importing `module`"""
+    return min((_measure_import_once(module) for _ in range(repeat)), key=lambda run: run[0])
+
+
+def _measure_import_once(module: str):
+    env = {k: v for k, v in os.environ.items() if k not in ("DATABASE_URL", "DATABASE_READ_URL")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((int(cumulative) / 1000, depth, name.strip()))
+
+    # Entries are listed children-first, so the module's direct imports are
+    # the depth-1 entries between it and the previous top-level entry
+    position = max(i for i, (_, depth, name) in enumerate(entries) if depth == 0 and name == module)
+    children = []
+    for ms, depth, name in reversed(entries[:position]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((ms, name))
+    return entries[position][0], sorted(children, reverse=True)
+
+
+def migrate(url: str):
+    """Upgrade a scratch database to head in a separate process, keeping this one cold"""
+    env = {**os.environ, "DATABASE_URL": url}
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, check=True,
+    )
+
+
+def measure_create_app():
+    sys.path.insert(0, str(BACKEND_DIR))
+    from fastapi.testclient import TestClient
+    from settings import Settings
+    import server
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        migrate(database_url)
+        settings = Settings(
+            database_url=database_url,
+            run_background_tasks=False,
+            seed_initial_data=False,
+        )
+        started = time.perf_counter()
+        app = server.create_app(settings)
+        built = time.perf_counter()
+        with TestClient(app):
+            ready = time.perf_counter()
+    return (built - started) * 1000, (ready - built) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+
+    total, top_level = measure_import("server")
+    print(f"import server: {total:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for ms, name in top_level[:8]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    build_ms, startup_ms = measure_create_app()
+    print(f"create_app(): {build_ms:.1f} ms, startup: {startup_ms:.1f} ms")
+
+    if total > args.budget_ms:
+        print("FAIL: import time over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Size and decode time of stored reflection bodies under zlib and zstd.
+
+Reads decompress the body on every request, so decode time matters more
+than encode time here. zstd is skipped if the zstandard package is not
+installed.
+
+Usage: python benchmarks/content_codec.py
+"""
+import random
+import sys
+import timeit
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from content_codec import ZLIB_LEVEL, ZSTD_LEVEL, zstandard  # noqa: E402
+
+ITERATIONS = 2_000
+SIZES = (2_048, 8_192, 32_768)
+WORDS = (
+    "breath presence patient capital yoga practice balance markets attention "
+    "discipline compounding stillness purpose morning journal returns risk"
+).split()
+
+
+def synthetic_body(size: int) -> bytes:
+    rng = random.Random(size)
+    words = []
+    while sum(len(w) + 1 for w in words) < size:
+        words.append(rng.choice(WORDS))
+        if rng.random() < 0.08:
+            words[-1] += ".\n\n" if rng.random() < 0.2 else "."
+    return " ".join(words).encode("utf-8")[:size]
+
+
+def codecs():
+    yield "zlib", lambda raw: zlib.compress(raw, ZLIB_LEVEL), zlib.decompress
+    if zstandard is None:
+        print("zstandard is not installed; only zlib is measured")
+        return
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    decompressor = zstandard.ZstdDecompressor()
+    yield "zstd", compressor.compress, decompressor.decompress
+
+
+def main():
+    for name, compress, decompress in codecs():
+        for size in SIZES:
+            raw = synthetic_body(size)
+            blob = compress(raw)
+            encode = min(timeit.repeat(lambda: compress(raw), number=ITERATIONS, repeat=3))
+            decode = min(timeit.repeat(lambda: decompress(blob), number=ITERATIONS, repeat=3))
+            print(
+                f"{name} {size:>6} B: ratio {len(raw) / len(blob):4.1f}x, "
+                f"encode {encode / ITERATIONS * 1e6:6.1f} us, decode {decode / ITERATIONS * 1e6:5.1f} us"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Per-request cost of logging: a synchronous StreamHandler against the
+queue pipeline, writing to a stream that blocks for ~20 us per write (a
+slow pipe or a busy log collector; like real I/O it releases the GIL).
+
+Usage: python benchmarks/logging_overhead.py
+"""
+import logging
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import logging_config  # noqa: E402
+
+ITERATIONS = 20_000
+WRITE_DELAY = 20e-6
+
+
+class SlowStream:
+    """Discards output after a short sleep, like a backed-up pipe"""
+
+    def write(self, text):
+        time.sleep(WRITE_DELAY)
+
+    def flush(self):
+        pass
+
+
+def request(logger, read_logger):
+    """The log calls one contact submission plus one list request make"""
+    read_logger.info("Retrieved %d reflections", 24)
+    logger.info("Created contact submission from: %s", "someone@example.com")
+
+
+def measure(name, logger, read_logger):
+    seconds = min(timeit.repeat(lambda: request(logger, read_logger), number=ITERATIONS, repeat=3))
+    print(f"{name}: {seconds / ITERATIONS * 1e6:.2f} us/request")
+
+
+def main():
+    logger = logging.getLogger("database")
+    read_logger = logging.getLogger("database.reads")
+    root = logging.getLogger()
+
+    handler = logging.StreamHandler(SlowStream())
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    measure("sync StreamHandler", logger, read_logger)
+    root.removeHandler(handler)
+
+    logging_config.configure_logging(sample_rates={}, stream=SlowStream())
+    measure("queue + JSON, no sampling", logger, read_logger)
+    logging_config.stop_logging()
+
+    logging_config.configure_logging(stream=SlowStream())
+    measure("queue + JSON, default sampling", logger, read_logger)
+    started = time.perf_counter()
+    logging_config.stop_logging()
+    print(f"listener drained its backlog in {(time.perf_counter() - started) * 1e3:.0f} ms after the run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Effect of concurrent admin logins on public read latency.
+
+Readers fetch a reflection in a loop while attackers post wrong passwords.
+Run three ways: no logins, argon2 verification inline on the event loop,
+and verification on the bounded auth pool (what the app does).
+
+Usage: python benchmarks/login_contention.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+READERS = 20
+LOGIN_CLIENTS = 8
+DURATION = 5.0
+
+
+def migrate(url: str):
+    from alembic import command
+    from alembic.config import Config
+
+    os.environ["DATABASE_URL"] = url
+    command.upgrade(Config(str(BACKEND_DIR / "alembic.ini")), "head")
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run(url: str, logins: bool, inline: bool):
+    import httpx
+    import auth
+    from server import create_app
+    from settings import Settings
+
+    original = auth.run_hashing
+    if inline:
+        async def run_inline(func, *args):
+            return func(*args)
+        auth.run_hashing = run_inline
+
+    app = create_app(Settings(database_url=url, run_background_tasks=False))
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            reflection_id = (await client.get("/api/reflections")).json()["reflections"][0]["id"]
+            # Warm the admin hash so its one-off cost is not measured
+            await client.post("/api/admin/login", json={"username": "admin", "password": "wrong"})
+
+            latencies, statuses = [], {}
+            deadline = time.perf_counter() + DURATION
+
+            async def reader():
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    await client.get(f"/api/reflections/{reflection_id}")
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+            async def attacker():
+                while time.perf_counter() < deadline:
+                    response = await client.post("/api/admin/login", json={"username": "admin", "password": "wrong"})
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                    if response.status_code == 429:
+                        await asyncio.sleep(0.05)
+
+            tasks = [reader() for _ in range(READERS)]
+            if logins:
+                tasks += [attacker() for _ in range(LOGIN_CLIENTS)]
+            await asyncio.gather(*tasks)
+            return latencies, statuses
+    finally:
+        await app.router.shutdown()
+        auth.run_hashing = original
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        migrate(url)
+        print(f"{READERS} readers, {LOGIN_CLIENTS} login clients, {DURATION:.0f}s each, {os.cpu_count()} CPUs")
+        print(f"  {'mode':28} {'reads':>7} {'p50 ms':>8} {'p99 ms':>8} {'logins':>7}")
+        for name, logins, inline in (
+            ("no logins", False, False),
+            ("argon2 on the event loop", True, True),
+            ("argon2 on the auth pool", True, False),
+        ):
+            latencies, statuses = asyncio.run(run(url, logins, inline))
+            print(
+                f"  {name:28} {len(latencies):7d} {statistics.median(latencies):8.2f} "
+                f"{percentile(latencies, 0.99):8.2f} {sum(statuses.values()):7d}"
+                + (f"  ({statuses.get(429, 0)} refused)" if statuses.get(429) else "")
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Circuit breaker around database calls.
+
+Every call gets a timeout, so a hung database fails requests quickly
+instead of piling them up. When too many recent calls fail the circuit
+opens and calls fail immediately with CircuitOpenError; after a cool-off
+one trial call is let through (half-open) and its outcome decides whether
+the circuit closes again. A transaction counts as one call: the statements
+inside it keep their timeouts but are not counted on their own.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Optional
+
+logger = logging.getLogger(__name__)
+
+CALL_TIMEOUT = float(os.environ.get("DB_CALL_TIMEOUT", "5"))
+# Trip when at least FAILURE_RATE of the last WINDOW calls failed
+# (and there were at least MIN_CALLS of them)
+WINDOW = int(os.environ.get("DB_BREAKER_WINDOW", "20"))
+FAILURE_RATE = float(os.environ.get("DB_BREAKER_FAILURE_RATE", "0.5"))
+MIN_CALLS = int(os.environ.get("DB_BREAKER_MIN_CALLS", "5"))
+OPEN_SECONDS = float(os.environ.get("DB_BREAKER_OPEN_SECONDS", "15"))
+
+
+# The guarded transaction this task is inside, if any
+_current_transaction: contextvars.ContextVar[Optional["_GuardedTransaction"]] = contextvars.ContextVar(
+    "guarded_transaction", default=None
+)
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The database is considered down; the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Failure-rate breaker with per-call timeouts and half-open probing"""
+
+    def __init__(self, name: str, timeout: float = CALL_TIMEOUT, window: int = WINDOW,
+                 failure_rate: float = FAILURE_RATE, min_calls: int = MIN_CALLS,
+                 open_seconds: float = OPEN_SECONDS):
+        self.name = name
+        self.timeout = timeout
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = CircuitState.CLOSED
+        self._results: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.rejected = 0
+        self.trips = 0
+
+    def _allow(self) -> bool:
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                return False
+            self.state = CircuitState.HALF_OPEN
+        # Half-open: a single trial call at a time
+        if self._trial_running:
+            return False
+        self._trial_running = True
+        return True
+
+    def _record(self, ok: bool):
+        if self.state == CircuitState.HALF_OPEN:
+            self._trial_running = False
+            if ok:
+                logger.info(f"Circuit {self.name} closed after a successful trial call")
+                self.state = CircuitState.CLOSED
+                self._results.clear()
+            else:
+                self._open()
+            return
+        self._results.append(ok)
+        failures = self._results.count(False)
+        if (self.state == CircuitState.CLOSED and len(self._results) >= self.min_calls
+                and failures >= self.failure_rate * len(self._results)):
+            self._open()
+
+    def _open(self):
+        if self.state != CircuitState.OPEN:
+            self.trips += 1
+            logger.error(f"Circuit {self.name} opened; failing calls fast for {self.open_seconds:.0f}s")
+        self.state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+
+    def _enter(self):
+        if not self._allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def _cancelled(self):
+        if self.state == CircuitState.HALF_OPEN:
+            self._trial_running = False
+
+    async def _timed(self, func: Callable[[], Awaitable[Any]], timed: bool) -> Any:
+        try:
+            # asyncio.timeout keeps the call in this task, which matters for
+            # `databases` (connections and transactions are per task)
+            async with asyncio.timeout(self.timeout if timed else None):
+                return await func()
+        except TimeoutError:
+            raise TimeoutError(f"{self.name} call timed out after {self.timeout:g}s") from None
+
+    async def call(self, func: Callable[[], Awaitable[Any]], timed: bool = True) -> Any:
+        """Run `func` under the breaker, within the per-call timeout unless `timed` is False"""
+        transaction = _current_transaction.get()
+        if transaction is not None:
+            # The enclosing transaction was let through and records the outcome
+            try:
+                return await self._timed(func, timed)
+            except Exception:
+                transaction.failed = True
+                raise
+        self._enter()
+        try:
+            result = await self._timed(func, timed)
+        except asyncio.CancelledError:
+            self._cancelled()
+            raise
+        except Exception:
+            self._record(False)
+            raise
+        self._record(True)
+        return result
+
+    def stats(self) -> dict:
+        return {"state": self.state.value, "trips": self.trips, "rejected": self.rejected}
+
+
+class _GuardedTransaction:
+    """A transaction that is refused while the circuit is open and counts as one call"""
+
+    def __init__(self, transaction, breaker: CircuitBreaker):
+        self._transaction = transaction
+        self._breaker = breaker
+        self._token = None
+        self.failed = False
+
+    async def __aenter__(self):
+        if _current_transaction.get() is not None:
+            # Nested: a savepoint within the call already being counted
+            return await self._transaction.__aenter__()
+        self._breaker._enter()
+        try:
+            result = await self._breaker._timed(self._transaction.__aenter__, timed=True)
+        except asyncio.CancelledError:
+            self._breaker._cancelled()
+            raise
+        except Exception:
+            self._breaker._record(False)
+            raise
+        self._token = _current_transaction.set(self)
+        return result
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._token is None:
+            return await self._transaction.__aexit__(exc_type, exc, tb)
+        _current_transaction.reset(self._token)
+        self._token = None
+        try:
+            await self._breaker._timed(lambda: self._transaction.__aexit__(exc_type, exc, tb), timed=True)
+        except asyncio.CancelledError:
+            self._breaker._cancelled()
+            raise
+        except Exception:
+            self._breaker._record(False)
+            raise
+        if exc_type is asyncio.CancelledError:
+            self._breaker._cancelled()
+        else:
+            # An error from the caller's own code, rolled back cleanly, is not a database failure
+            self._breaker._record(not self.failed)
+
+
+class GuardedDatabase:
+    """A `databases.Database` whose queries go through a circuit breaker"""
+
+    def __init__(self, database, breaker: CircuitBreaker):
+        self.unguarded = database
+        self.breaker = breaker
+
+    def __getattr__(self, name):
+        # connect, disconnect, is_connected, ...
+        return getattr(self.unguarded, name)
+
+    def transaction(self, *args, **kwargs):
+        return _GuardedTransaction(self.unguarded.transaction(*args, **kwargs), self.breaker)
+
+    async def execute(self, query, values=None):
+        return await self.breaker.call(lambda: self.unguarded.execute(query, values))
+
+    async def execute_many(self, query, values):
+        # Bulk loads from background work may legitimately take a while
+        return await self.breaker.call(lambda: self.unguarded.execute_many(query, values), timed=False)
+
+    async def fetch_all(self, query, values=None):
+        return await self.breaker.call(lambda: self.unguarded.fetch_all(query, values))
+
+    async def fetch_one(self, query, values=None):
+        return await self.breaker.call(lambda: self.unguarded.fetch_one(query, values))
+
+    async def fetch_val(self, query, values=None, column=0):
+        return await self.breaker.call(lambda: self.unguarded.fetch_val(query, values, column=column))
@@ -0,0 +1,267 @@
+"""
+Compact in-memory index of published reflections.
+
+Only the metadata needed to answer list queries is kept: the id, date,
+category and tags of each published post. They are stored column-wise in
+`array`s, with categories and tags interned to small integer codes and
+ids packed as 16-byte UUIDs, so the whole archive costs a few dozen
+bytes per post. Each category and tag has its own date-ordered slot
+array, so a filtered list is an array slice instead of a query, and ids
+are found through a sorted array of their first 8 bytes.
+"""
+import sys
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EPOCH = datetime(1970, 1, 1)
+ID_SIZE = 16
+# Rebuild once deleted slots outnumber live ones (and are worth reclaiming)
+COMPACT_MIN_DEAD = 1024
+
+
+def _timestamp(moment: datetime) -> float:
+    if moment.tzinfo is not None:
+        moment = moment.replace(tzinfo=None) - moment.utcoffset()
+    return (moment - EPOCH).total_seconds()
+
+
+def _pack_id(reflection_id: str) -> Optional[bytes]:
+    """16 bytes for a canonical UUID string, None for any other id"""
+    if len(reflection_id) != 36:
+        return None
+    try:
+        parsed = uuid.UUID(reflection_id)
+    except ValueError:
+        return None
+    return parsed.bytes if str(parsed) == reflection_id else None
+
+
+class _Interned:
+    """Two-way mapping between names and small integer codes"""
+
+    __slots__ = ("names", "codes")
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def code(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            name = sys.intern(name)
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+class ReflectionCatalogue:
+    """Published reflection ids by date, category and tag"""
+
+    __slots__ = (
+        "loaded", "_packed_ids", "_id_keys", "_id_slots", "_other_ids", "_other_slots",
+        "_dates", "_categories", "_tag_start", "_tag_count", "_tag_codes", "_dead",
+        "_category_names", "_tag_names", "_all", "_by_category", "_by_tag",
+    )
+
+    def __init__(self):
+        # False until `load` runs; callers fall back to the database meanwhile
+        self.loaded = False
+        self._reset()
+
+    def _reset(self):
+        # Per-slot columns (append-only; deleted slots are tombstoned)
+        self._packed_ids = bytearray()
+        # Sorted 64-bit id prefixes and their slots, for lookups by id
+        self._id_keys = array("Q")
+        self._id_slots = array("I")
+        self._other_ids: Dict[int, str] = {}
+        self._other_slots: Dict[str, int] = {}
+        self._dates = array("d")
+        self._categories = array("H")
+        self._tag_start = array("I")
+        self._tag_count = array("B")
+        self._tag_codes = array("I")
+        self._dead = 0
+        self._category_names = _Interned()
+        self._tag_names = _Interned()
+        # Slot numbers ordered newest first, overall and per category/tag code
+        self._all = array("I")
+        self._by_category: Dict[int, array] = {}
+        self._by_tag: Dict[int, array] = {}
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    # Loading and updates
+    def load(self, reflections: Iterable[Tuple[str, datetime, str, List[str]]]):
+        """Replace the contents with (id, date, category, tags) of published posts"""
+        self._reset()
+        for reflection_id, date, category, tags in reflections:
+            self._append(reflection_id, date, category, tags)
+        packed_slots = [slot for slot in range(len(self._dates)) if slot not in self._other_ids]
+        packed_slots.sort(key=self._id_key)
+        self._id_keys = array("Q", map(self._id_key, packed_slots))
+        self._id_slots = array("I", packed_slots)
+        self._all = array("I", sorted(range(len(self._dates)), key=self._order_key))
+        for slot in self._all:
+            self._by_category.setdefault(self._categories[slot], array("I")).append(slot)
+            for code in self._slot_tags(slot):
+                self._by_tag.setdefault(code, array("I")).append(slot)
+        self.loaded = True
+
+    def upsert(self, reflection_id: str, date: datetime, category: str, tags: List[str], published: bool):
+        """Record a created or updated post; unpublished posts are removed"""
+        self.remove(reflection_id)
+        if not published:
+            return
+        slot = self._append(reflection_id, date, category, tags)
+        if slot not in self._other_ids:
+            key = self._id_key(slot)
+            index = bisect_right(self._id_keys, key)
+            self._id_keys.insert(index, key)
+            self._id_slots.insert(index, slot)
+        insort(self._all, slot, key=self._order_key)
+        insort(self._by_category.setdefault(self._categories[slot], array("I")), slot, key=self._order_key)
+        for code in self._slot_tags(slot):
+            insort(self._by_tag.setdefault(code, array("I")), slot, key=self._order_key)
+
+    def remove(self, reflection_id: str) -> bool:
+        found = self._find(reflection_id)
+        if found is None:
+            return False
+        slot, index = found
+        self._discard(self._all, slot)
+        self._discard(self._by_category[self._categories[slot]], slot)
+        for code in self._slot_tags(slot):
+            self._discard(self._by_tag[code], slot)
+        if index is None:
+            del self._other_slots[self._other_ids.pop(slot)]
+        else:
+            del self._id_keys[index]
+            del self._id_slots[index]
+        self._dead += 1
+        if self._dead >= COMPACT_MIN_DEAD and self._dead > len(self._all):
+            self._compact()
+        return True
+
+    # Queries
+    def ids(self, category: Optional[str] = None, tag: Optional[str] = None,
+            offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        """Ids of published posts, newest first, optionally by category and/or tag"""
+        slots = self._slots(category, tag)
+        end = None if limit is None else offset + limit
+        return [self._id(slot) for slot in slots[offset:end]]
+
+    def count(self, category: Optional[str] = None, tag: Optional[str] = None) -> int:
+        return len(self._slots(category, tag))
+
+    def category_counts(self) -> Dict[str, int]:
+        names = self._category_names.names
+        return {names[code]: len(slots) for code, slots in self._by_category.items() if slots}
+
+    def tag_counts(self) -> Dict[str, int]:
+        names = self._tag_names.names
+        return {names[code]: len(slots) for code, slots in self._by_tag.items() if slots}
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the catalogue's own containers"""
+        size = sum(sys.getsizeof(column) for column in (
+            self._packed_ids, self._id_keys, self._id_slots, self._dates, self._categories,
+            self._tag_start, self._tag_count, self._tag_codes, self._all,
+            self._other_ids, self._other_slots, self._by_category, self._by_tag,
+        ))
+        size += sum(sys.getsizeof(slots) for slots in self._by_category.values())
+        size += sum(sys.getsizeof(slots) for slots in self._by_tag.values())
+        for interned in (self._category_names, self._tag_names):
+            size += sys.getsizeof(interned.names) + sys.getsizeof(interned.codes)
+            size += sum(sys.getsizeof(name) for name in interned.names)
+        size += sum(sys.getsizeof(other) for other in self._other_ids.values())
+        return size
+
+    # Internals
+    def _order_key(self, slot: int) -> Tuple[float, int]:
+        return -self._dates[slot], slot
+
+    def _slots(self, category: Optional[str], tag: Optional[str]) -> array:
+        slots = self._all
+        if category is not None:
+            code = self._category_names.codes.get(category)
+            slots = self._by_category.get(code, array("I")) if code is not None else array("I")
+        if tag is not None:
+            code = self._tag_names.codes.get(tag)
+            tagged = self._by_tag.get(code, array("I")) if code is not None else array("I")
+            if category is None:
+                return tagged
+            # Walk the shorter list, checking the other condition per slot
+            if len(tagged) < len(slots):
+                wanted = self._category_names.codes[category]
+                return array("I", (slot for slot in tagged if self._categories[slot] == wanted))
+            return array("I", (slot for slot in slots if code in self._slot_tags(slot)))
+        return slots
+
+    def _append(self, reflection_id: str, date: datetime, category: str, tags: List[str]) -> int:
+        slot = len(self._dates)
+        packed = _pack_id(reflection_id)
+        if packed is None:
+            self._packed_ids += bytes(ID_SIZE)
+            self._other_ids[slot] = reflection_id
+            self._other_slots[reflection_id] = slot
+        else:
+            self._packed_ids += packed
+        self._dates.append(_timestamp(date))
+        self._categories.append(self._category_names.code(category))
+        codes = sorted({self._tag_names.code(tag) for tag in tags})[:255]
+        self._tag_start.append(len(self._tag_codes))
+        self._tag_count.append(len(codes))
+        self._tag_codes.extend(codes)
+        return slot
+
+    def _slot_tags(self, slot: int) -> array:
+        start = self._tag_start[slot]
+        return self._tag_codes[start:start + self._tag_count[slot]]
+
+    def _id_key(self, slot: int) -> int:
+        return int.from_bytes(self._packed_ids[slot * ID_SIZE:slot * ID_SIZE + 8], "big")
+
+    def _id(self, slot: int) -> str:
+        other = self._other_ids.get(slot) if self._other_ids else None
+        if other is not None:
+            return other
+        # Formatting the hex directly is ~3x faster than going through uuid.UUID
+        h = self._packed_ids[slot * ID_SIZE:(slot + 1) * ID_SIZE].hex()
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+    def _find(self, reflection_id: str) -> Optional[Tuple[int, Optional[int]]]:
+        """The slot holding a live id, and its position in the id index"""
+        packed = _pack_id(reflection_id)
+        if packed is None:
+            slot = self._other_slots.get(reflection_id)
+            return None if slot is None else (slot, None)
+        key = int.from_bytes(packed[:8], "big")
+        index = bisect_left(self._id_keys, key)
+        # Prefixes can collide, so compare the full id
+        while index < len(self._id_keys) and self._id_keys[index] == key:
+            slot = self._id_slots[index]
+            if self._packed_ids[slot * ID_SIZE:(slot + 1) * ID_SIZE] == packed:
+                return slot, index
+            index += 1
+        return None
+
+    def _discard(self, slots: array, slot: int):
+        index = bisect_left(slots, self._order_key(slot), key=self._order_key)
+        if index < len(slots) and slots[index] == slot:
+            del slots[index]
+
+    def _compact(self):
+        live = [
+            (self._id(slot), self._dates[slot], self._category_names.names[self._categories[slot]],
+             [self._tag_names.names[code] for code in self._slot_tags(slot)])
+            for slot in self._all
+        ]
+        self.load(
+            (reflection_id, EPOCH + timedelta(seconds=date), category, tags)
+            for reflection_id, date, category, tags in live
+        )
@@ -0,0 +1,265 @@
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Only text-like payloads benefit; images and archives are already compressed
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/xml",
+    "application/rss+xml",
+    "application/atom+xml",
+    "application/feed+json",
+    "text/",
+    "image/svg+xml",
+)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _gzip_compressobj():
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+
+
+def _compress_whole(body: bytes, encoding: str) -> bytes:
+    """Compress a complete response body"""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    compressor = _gzip_compressobj()
+    return compressor.compress(body) + compressor.flush()
+
+
+class _StreamCompressor:
+    """Incremental compressor for streamed responses"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = _gzip_compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        # Flush after every chunk so streamed events reach the client promptly
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (request target, ETag, encoding)"""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, target: str, etag: str, encoding: str) -> Optional[bytes]:
+        key = (target, etag, encoding)
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, target: str, etag: str, encoding: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            key = (target, etag, encoding)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = body
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header"""
+    offered = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        offered[token] = quality
+
+    wildcard = offered.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = offered.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip.
+
+    Whole bodies are compressed in one go and, for cacheable GET responses,
+    memoised by ETag so repeated identical responses skip recompression.
+    Streamed bodies (more_body=True) are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = 500, cache: Optional[CompressedBodyCache] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache if cache is not None else CompressedBodyCache()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # ETags are only unique per resource, so cached bodies are also keyed by the target
+        target = scope["path"]
+        if scope.get("query_string"):
+            target = f"{target}?{scope['query_string'].decode('latin-1')}"
+        responder = _CompressionResponder(self, scope["method"], target, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, method: str, target: str, encoding: str, send):
+        self.middleware = middleware
+        self.method = method
+        self.target = target
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message = None
+        self.passthrough = False
+        self.stream: Optional[_StreamCompressor] = None
+
+    async def send(self, message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self.start_message = message
+            headers = {k.lower(): v for k, v in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            self.passthrough = (
+                b"content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+                # Event streams must reach the client as each event is sent
+                or content_type.startswith("text/event-stream")
+                or message["status"] < 200
+                or message["status"] in (204, 304)
+            )
+            if self.passthrough:
+                await self.downstream(message)
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is not None:
+            chunk = self.stream.compress(body)
+            if not more_body:
+                chunk += self.stream.finish()
+            await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        if more_body:
+            # First chunk of a streamed response
+            self.stream = _StreamCompressor(self.encoding)
+            await self.downstream(self._start_with_headers(etag=None, content_length=None))
+            await self.downstream({
+                "type": "http.response.body",
+                "body": self.stream.compress(body),
+                "more_body": True,
+            })
+            return
+
+        if len(body) < self.middleware.minimum_size:
+            await self.downstream(self.start_message)
+            await self.downstream(message)
+            return
+
+        etag = None
+        compressed = None
+        if self._is_cacheable():
+            etag = self._header(b"etag") or f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            compressed = self.middleware.cache.get(self.target, etag, self.encoding)
+        if compressed is None:
+            compressed = _compress_whole(body, self.encoding)
+            if etag is not None:
+                self.middleware.cache.put(self.target, etag, self.encoding, compressed)
+
+        await self.downstream(self._start_with_headers(etag=etag, content_length=len(compressed)))
+        await self.downstream({"type": "http.response.body", "body": compressed, "more_body": False})
+
+    def _header(self, name: bytes) -> Optional[str]:
+        for key, value in self.start_message.get("headers", []):
+            if key.lower() == name:
+                return value.decode("latin-1")
+        return None
+
+    def _is_cacheable(self) -> bool:
+        if self.method != "GET" or self.start_message["status"] != 200:
+            return False
+        cache_control = (self._header(b"cache-control") or "").lower()
+        return "no-store" not in cache_control and "private" not in cache_control
+
+    def _start_with_headers(self, etag: Optional[str], content_length: Optional[int]):
+        headers = [
+            (k, v) for k, v in self.start_message.get("headers", [])
+            if k.lower() not in (b"content-length", b"etag", b"vary")
+        ]
+        vary = self._header(b"vary")
+        if vary and "accept-encoding" not in vary.lower():
+            vary = f"{vary}, Accept-Encoding"
+        headers.append((b"vary", (vary or "Accept-Encoding").encode("latin-1")))
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        if etag is not None:
+            # The compressed bytes differ from the identity body, so only a
+            # weak validator is honest here (same behaviour as nginx gzip)
+            weak_etag = etag if etag.startswith("W/") else f"W/{etag}"
+            headers.append((b"etag", weak_etag.encode("latin-1")))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode("latin-1")))
+        return {**self.start_message, "headers": headers}
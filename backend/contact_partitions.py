@@ -0,0 +1,130 @@
+"""
+Monthly partitions and archival for contact submissions.
+
+On Postgres `contacts` is range-partitioned by month on submitted_at
+(migration 0008); on SQLite it stays a plain table. ContactArchiver keeps
+partitions a few months ahead and, once a month falls out of the
+retention window, writes its submissions to a gzipped NDJSON file under
+CONTACT_ARCHIVE_DIR and drops them (the whole partition on Postgres), so
+the live table only ever holds recent months.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from models import ContactSubmission
+
+logger = logging.getLogger(__name__)
+
+# Months kept in the database; older months are archived to disk
+RETENTION_MONTHS = int(os.environ.get("CONTACT_RETENTION_MONTHS", "12"))
+# Months the admin inbox shows by default
+INBOX_MONTHS = int(os.environ.get("CONTACT_INBOX_MONTHS", "3"))
+PARTITIONS_AHEAD = 3
+ARCHIVE_DIR = Path(os.environ.get("CONTACT_ARCHIVE_DIR", Path(__file__).parent / "archive" / "contacts"))
+MAINTENANCE_INTERVAL = 6 * 60 * 60
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"contacts_p{month.year:04d}_{month.month:02d}"
+
+
+def create_partition_sql(month: datetime) -> str:
+    """DDL for the partition holding `month` (a no-op if it exists)"""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF contacts "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    )
+
+
+def inbox_since(months: int = INBOX_MONTHS, now: Optional[datetime] = None) -> datetime:
+    """Start of the oldest month the inbox covers, aligned to partition bounds"""
+    return add_months(month_start(now or datetime.utcnow()), 1 - max(1, months))
+
+
+def write_archive(directory: Path, month: datetime, submissions: List[ContactSubmission]) -> Path:
+    """Write one month of submissions as gzipped NDJSON, durably, and return the file"""
+    directory.mkdir(parents=True, exist_ok=True)
+    # A new file per run, so a month archived twice (e.g. a late spool
+    # replay) never overwrites what was written before
+    path = directory / f"contacts-{month:%Y-%m}-{datetime.utcnow():%Y%m%dT%H%M%S%f}.ndjson.gz"
+    temporary = path.with_suffix(".tmp")
+    with open(temporary, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as archive:
+            for submission in submissions:
+                archive.write(json.dumps(submission.dict(), default=str).encode() + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(temporary, path)
+    return path
+
+
+def read_archive(path: Path) -> Iterator[ContactSubmission]:
+    """Submissions from an archive file, e.g. to restore them"""
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            if line.strip():
+                yield ContactSubmission(**json.loads(line))
+
+
+class ContactArchiver:
+    """Background task creating upcoming partitions and archiving expired months"""
+
+    def __init__(self, db, retention_months: int = RETENTION_MONTHS, archive_dir: Path = ARCHIVE_DIR,
+                 interval: float = MAINTENANCE_INTERVAL):
+        self.db = db
+        self.retention_months = retention_months
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Create upcoming partitions, then archive every month past retention"""
+        current = month_start(now or datetime.utcnow())
+        await self.db.ensure_contact_partitions(current, PARTITIONS_AHEAD)
+
+        cutoff = add_months(current, -self.retention_months)
+        archived = 0
+        for month in await self.db.get_contact_months_before(cutoff):
+            count = await self.db.archive_contact_month(
+                month, lambda submissions, month=month: write_archive(self.archive_dir, month, submissions)
+            )
+            if count:
+                logger.info(f"Archived {count} contact submissions from {month:%Y-%m}")
+            archived += count
+        return archived
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Error maintaining contact partitions: {str(e)}")
+            await asyncio.sleep(self.interval)
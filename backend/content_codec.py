@@ -0,0 +1,53 @@
+import os
+import zlib
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+# Bodies smaller than this are stored as plain text; compressing them saves
+# too little to be worth the CPU on every read.
+COMPRESSION_THRESHOLD = int(os.environ.get("CONTENT_COMPRESSION_THRESHOLD", "2048"))
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+# One-byte codec tag at the start of every compressed blob so rows written
+# with zstd can still be read on an install that only has zlib, and vice versa.
+_TAG_ZLIB = b"z"
+_TAG_ZSTD = b"s"
+
+if zstandard is not None:
+    _zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+
+
+def compress_content(content: str) -> Optional[bytes]:
+    """Compress a reflection body, or return None if it should stay plain text"""
+    raw = content.encode("utf-8")
+    if len(raw) < COMPRESSION_THRESHOLD:
+        return None
+
+    if zstandard is not None:
+        blob = _TAG_ZSTD + _zstd_compressor.compress(raw)
+    else:
+        blob = _TAG_ZLIB + zlib.compress(raw, ZLIB_LEVEL)
+
+    # Incompressible text (already very dense) is not worth the decode cost
+    if len(blob) >= len(raw):
+        return None
+    return blob
+
+
+def decompress_content(blob: bytes) -> str:
+    """Decompress a blob produced by compress_content"""
+    blob = bytes(blob)
+    tag, payload = blob[:1], blob[1:]
+    if tag == _TAG_ZLIB:
+        return zlib.decompress(payload).decode("utf-8")
+    if tag == _TAG_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this reflection content")
+        return _zstd_decompressor.decompress(payload).decode("utf-8")
+    raise ValueError(f"Unknown content codec tag: {tag!r}")
@@ -1,25 +1,54 @@
 import os
+import asyncio
+import contextlib
+import functools
 import logging
-from typing import List, Optional
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-import databases
 import sqlalchemy
-from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, DateTime, Boolean, Text, JSON
-from models import Reflection, ContactSubmission, AdminSession, ReflectionCategory
+from sqlalchemy import MetaData, Table, Column, Index, Integer, String, DateTime, Boolean, Text, JSON, LargeBinary, Float, BigInteger
+from models import (
+    Reflection, ContactSubmission, ContactStatus, AdminSession, ReflectionCategory,
+    Job, JobQueueStats, RelatedReflection, ImageAsset, IdempotencyRecord,
+    ChangeType, ReflectionChange
+)
+from content_codec import compress_content, decompress_content
+from markdown_render import content_hash, render_markdown
+from analytics import HyperLogLog
+from events import EventBroadcaster
+from catalogue import ReflectionCatalogue
+from singleflight import SingleFlight, make_key
+from breaker import CircuitBreaker, GuardedDatabase
+from local_state import ReflectionSnapshot, UNAVAILABLE
+from invalidation import invalidation_bus_for
+from read_your_writes import current_session
+from contact_partitions import add_months, create_partition_sql, month_start, partition_name
 
 logger = logging.getLogger(__name__)
+# Hot read paths log here so they can be sampled separately
+read_logger = logging.getLogger(f"{__name__}.reads")
 
-# Database connection
-DATABASE_URL = os.environ.get("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is required")
+# After a write, that session's reads stay on the primary this long so replica
+# lag never hides the change from the admin who just made it
+READ_YOUR_WRITES_WINDOW = float(os.environ.get("READ_YOUR_WRITES_WINDOW", "5"))
+# Sessions tracked at once; expired entries are dropped beyond this
+MAX_PINNED_SESSIONS = 1000
+# How long to stop using the replica after it errors
+REPLICA_RETRY_AFTER = float(os.environ.get("REPLICA_RETRY_AFTER", "30"))
+# Ids per IN (...) query, well under SQLite's bound parameter limit
+MAX_IN_IDS = 500
+REFLECTION_CHANGES = "reflections"
+# Valid admin sessions kept in memory (evicted across workers on logout)
+MAX_CACHED_SESSIONS = 1000
+# Postgres advisory lock held while a month of contacts is archived
+CONTACT_ARCHIVE_LOCK = 0x636f6e74
 
-# Create database instance
-database = databases.Database(DATABASE_URL)
 metadata = MetaData()
-engine = create_engine(DATABASE_URL)
 
 # Define tables
+# The schema is managed by the Alembic migrations in migrations/; keep these
+# definitions in step with them.
 reflections_table = Table(
     "reflections",
     metadata,
@@ -27,6 +56,11 @@ reflections_table = Table(
     Column("title", String(200), nullable=False),
     Column("excerpt", String(500), nullable=False),
     Column("content", Text, nullable=False),
+    # Large bodies are stored here compressed, with `content` left empty
+    Column("content_compressed", LargeBinary, nullable=True),
+    # Markdown rendered on write, and the hash of the source it came from
+    Column("content_html", Text, nullable=True),
+    Column("content_html_hash", String(64), nullable=True),
     Column("category", String(50), nullable=False),
     Column("tags", JSON, nullable=False, default=list),
     Column("date", DateTime, nullable=False, default=datetime.utcnow),
@@ -34,8 +68,34 @@ reflections_table = Table(
     Column("published", Boolean, nullable=False, default=True),
     Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
     Column("updated_at", DateTime, nullable=False, default=datetime.utcnow),
+    Column("image_id", String(64), nullable=True),
+    # Position in the change feed, taken from change_counters on every write
+    Column("change_seq", BigInteger, nullable=True),
+    Index("ix_reflections_published_date", "published", "date"),
+    Index("ix_reflections_category_published_date", "category", "published", "date"),
+    Index("ix_reflections_change_seq", "change_seq"),
+)
+
+# Deleted reflections, so the change feed can report them
+reflection_tombstones_table = Table(
+    "reflection_tombstones",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("change_seq", BigInteger, nullable=False, index=True),
+    Column("deleted_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+# Named monotonic counters. Writers increment a row inside their
+# transaction, so numbers become visible in the order they were taken
+change_counters_table = Table(
+    "change_counters",
+    metadata,
+    Column("name", String(50), primary_key=True),
+    Column("value", BigInteger, nullable=False),
 )
 
+# On Postgres this is partitioned by month on submitted_at, with the primary
+# key (id, submitted_at); see migration 0008 and contact_partitions.py
 contacts_table = Table(
     "contacts",
     metadata,
@@ -46,6 +106,7 @@ contacts_table = Table(
     Column("message", Text, nullable=False),
     Column("status", String(20), nullable=False, default="new"),
     Column("submitted_at", DateTime, nullable=False, default=datetime.utcnow),
+    Index("ix_contacts_submitted_at", "submitted_at"),
 )
 
 admin_sessions_table = Table(
@@ -55,39 +116,407 @@ admin_sessions_table = Table(
     Column("session_id", String, nullable=False, unique=True),
     Column("expires_at", DateTime, nullable=False),
     Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
+    Index("ix_admin_sessions_expires_at", "expires_at"),
 )
 
+images_table = Table(
+    "images",
+    metadata,
+    Column("id", String(64), primary_key=True),  # SHA-256 of the original
+    Column("content_type", String(50), nullable=False),
+    Column("extension", String(10), nullable=False),
+    Column("width", Integer, nullable=False),
+    Column("height", Integer, nullable=False),
+    Column("bytes", Integer, nullable=False),
+    Column("variants", JSON, nullable=False, default=list),
+    Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+reflection_related_table = Table(
+    "reflection_related",
+    metadata,
+    Column("reflection_id", String, primary_key=True),
+    Column("rank", Integer, primary_key=True),
+    Column("related_id", String, nullable=False),
+    Column("score", Float, nullable=False),
+    Index("ix_reflection_related_related_id", "related_id"),
+)
+
+reflection_stats_table = Table(
+    "reflection_stats",
+    metadata,
+    Column("reflection_id", String, primary_key=True),
+    Column("bucket_start", DateTime, primary_key=True),
+    Column("views", Integer, nullable=False, default=0),
+    # HyperLogLog registers for approximate unique visitors in the bucket
+    Column("visitors_hll", LargeBinary, nullable=True),
+    Index("ix_reflection_stats_bucket_start", "bucket_start"),
+)
+
+jobs_table = Table(
+    "jobs",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("kind", String(100), nullable=False),
+    Column("payload", JSON, nullable=False, default=dict),
+    Column("status", String(20), nullable=False, default="pending", index=True),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("max_attempts", Integer, nullable=False, default=5),
+    Column("run_after", DateTime, nullable=False, default=datetime.utcnow, index=True),
+    Column("locked_until", DateTime, nullable=True),
+    Column("last_error", Text, nullable=True),
+    Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
+    Column("updated_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+idempotency_keys_table = Table(
+    "idempotency_keys",
+    metadata,
+    # Hash of the route, session and client-supplied Idempotency-Key
+    Column("key", String(64), primary_key=True),
+    Column("request_hash", String(64), nullable=False),
+    Column("status_code", Integer, nullable=True),
+    Column("content_type", String(100), nullable=True),
+    Column("body", LargeBinary, nullable=True),
+    Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
+    Column("expires_at", DateTime, nullable=False, index=True),
+)
+
+def is_sqlite_url(url: str) -> bool:
+    return url.split(":", 1)[0].split("+", 1)[0] == "sqlite"
+
+def _connect_url(url: str):
+    """Build the `databases` pool for a URL, using the tuned backend for SQLite"""
+    if is_sqlite_url(url):
+        from sqlite_backend import SQLiteDatabase
+        return SQLiteDatabase(url)
+    import databases
+    return databases.Database(url)
+
+def serialized_write(method):
+    """Queue writes behind a single writer on backends without concurrent writers"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        try:
+            if self._write_lock is None:
+                return await method(self, *args, **kwargs)
+            async with self._write_lock:
+                return await method(self, *args, **kwargs)
+        finally:
+            # Reads starting now must not join a flight that began before the write
+            self._write_generation += 1
+    return wrapper
+
+def coalesced(method):
+    """Let concurrent identical calls share one in-flight query"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        # Callers pinned to the primary never join a flight reading the replica
+        key = make_key(method.__name__, (self._write_generation, self._use_replica(), *args), kwargs)
+        return await self.single_flight.do(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
+def serve_stale(method):
+    """On a database error, answer from the local snapshot when it can"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        try:
+            return await method(self, *args, **kwargs)
+        except Exception as e:
+            result = getattr(self.snapshot, method.__name__)(*args, **kwargs)
+            if result is UNAVAILABLE:
+                raise
+            logger.warning(f"Serving {method.__name__} from the local snapshot: {str(e)}")
+            self.snapshot.served += 1
+            return result
+    return wrapper
+
 class Database:
-    def __init__(self):
-        self.database = database
+    def __init__(self, database_url: Optional[str] = None, read_url: Optional[str] = None):
+        self.database_url = database_url
+        self.read_url = read_url
+        self._database = None
+        self._read_database = None
+        # Session id -> time of its last write, see read_your_writes.py
+        self._last_writes: Dict[str, float] = {}
+        self._replica_down_until = 0.0
+        # SQLite allows one writer at a time; queueing writes in-process avoids
+        # SQLITE_BUSY errors when a read transaction tries to upgrade
+        self._write_lock = asyncio.Lock() if database_url and is_sqlite_url(database_url) else None
+        # Published reflection changes, streamed to clients over SSE
+        self.reflection_events = EventBroadcaster()
+        # Published reflection metadata, so list filters are resolved in memory
+        self.catalogue = ReflectionCatalogue()
+        # Concurrent identical reads share one query; the generation is part
+        # of the key so nothing read before a write is handed out after it
+        self.single_flight = SingleFlight()
+        self._write_generation = 0
+        # Primary queries time out and fail fast while the database is down;
+        # public reads then come from the last snapshot of published posts
+        self.breaker = CircuitBreaker("database")
+        self.snapshot = ReflectionSnapshot()
+        # Other workers' writes evict or reload what this worker has cached
+        self.invalidation = invalidation_bus_for(database_url)
+        self.invalidation.subscribe(self._apply_invalidation, self._flush_caches)
+        self._sessions: Dict[str, AdminSession] = {}
+
+    # Connection pools are built on first use so importing this module and
+    # constructing Database stay cheap (no driver imports, no env checks)
+    @property
+    def database(self):
+        if self._database is None:
+            if not self.database_url:
+                raise ValueError("DATABASE_URL environment variable is required")
+            self._database = GuardedDatabase(_connect_url(self.database_url), self.breaker)
+        return self._database
+
+    @property
+    def read_database(self):
+        if self._read_database is None and self.read_url:
+            self._read_database = _connect_url(self.read_url)
+        return self._read_database
         
     async def connect(self):
         """Connect to database"""
         await self.database.connect()
+        await self.invalidation.start()
+        if self.read_database is not None:
+            try:
+                await self.read_database.connect()
+            except Exception as e:
+                logger.error(f"Error connecting to read replica, using primary: {str(e)}")
+                self._replica_down_until = time.monotonic() + REPLICA_RETRY_AFTER
         
     async def disconnect(self):
         """Disconnect from database"""
+        await self.invalidation.stop()
         await self.database.disconnect()
+        if self.read_database is not None and self.read_database.is_connected:
+            await self.read_database.disconnect()
+
+    # Cross-worker cache invalidation
+    async def _invalidate(self, *keys: str):
+        """Tell other workers to drop their copies of `keys` (after the write commits)"""
+        try:
+            await self.invalidation.publish(self.database, list(keys))
+        except Exception as e:
+            # The write stands; other workers catch up on their next flush
+            logger.error(f"Error publishing cache invalidation: {str(e)}")
+
+    async def _apply_invalidation(self, keys: List[str]):
+        """Evict or reload keys written by another worker"""
+        # Nothing read before the other worker's write may be handed out after it
+        self._write_generation += 1
+        for key in keys:
+            kind, _, key_id = key.partition(":")
+            if kind == "session":
+                self._sessions.pop(key_id, None)
+            elif kind == "reflection":
+                await self._reload_reflection(key_id)
+
+    async def _reload_reflection(self, reflection_id: str):
+        row = await self.database.fetch_one(reflections_table.select().where(reflections_table.c.id == reflection_id))
+        if row is None:
+            self.reflection_events.publish("reflection.deleted", {"id": reflection_id})
+            await self._unindex_reflection(reflection_id)
+            return
+        reflection = self._row_to_reflection(row)
+        # Also moves the feed cache on, and reaches this worker's event streams
+        self._publish_reflection("reflection.updated", reflection)
+        await self._index_reflection(reflection)
+
+    async def _flush_caches(self):
+        """Reload everything cached, after invalidations may have been missed"""
+        self._write_generation += 1
+        self._sessions.clear()
+        if self.catalogue.loaded:
+            await self.load_catalogue()
+        if self.snapshot.loaded:
+            await self.refresh_snapshot()
+
+    # Health probes
+    async def ping(self, replica: bool = False):
+        """Run a trivial query, raising if the primary (or replica) cannot serve"""
+        # Bypasses the breaker: health should reflect the database itself
+        database = self.read_database if replica else self.database.unguarded
+        await database.fetch_val("SELECT 1")
+
+    @staticmethod
+    def _pool_stats(database) -> Optional[dict]:
+        pool = getattr(getattr(database, "_backend", None), "_pool", None)
+        if pool is None:
+            return None
+        if hasattr(pool, "stats"):
+            return pool.stats()
+        if hasattr(pool, "get_size"):
+            # asyncpg
+            idle = pool.get_idle_size()
+            return {"max_size": pool.get_max_size(), "in_use": pool.get_size() - idle, "idle": idle}
+        return None
+
+    def pool_status(self) -> dict:
+        """Connection state of the primary and replica pools, without any I/O"""
+        status = {"primary": {
+            "connected": self.database.is_connected,
+            "circuit": self.breaker.stats(),
+            "pool": self._pool_stats(self.database.unguarded),
+        }}
+        if self.read_database is not None:
+            status["replica"] = {
+                "connected": self.read_database.is_connected,
+                # False while reads are falling back to the primary after an error
+                "serving_reads": time.monotonic() >= self._replica_down_until,
+                "pool": self._pool_stats(self.read_database),
+            }
+        status["invalidation"] = self.invalidation.stats()
+        return status
+
+    # Read/write routing
+    def _mark_write(self):
+        """Pin the writing session's reads to the primary for a short while"""
+        self._write_generation += 1
+        session = current_session.get()
+        if session is None:
+            return
+        now = time.monotonic()
+        if len(self._last_writes) >= MAX_PINNED_SESSIONS:
+            self._last_writes = {
+                key: at for key, at in self._last_writes.items() if now - at < READ_YOUR_WRITES_WINDOW
+            }
+        self._last_writes[session] = now
+
+    def _use_replica(self) -> bool:
+        if self.read_database is None:
+            return False
+        now = time.monotonic()
+        if now < self._replica_down_until:
+            return False
+        session = current_session.get()
+        if session is not None and now - self._last_writes.get(session, float("-inf")) < READ_YOUR_WRITES_WINDOW:
+            return False
+        return self.read_database.is_connected
+
+    async def _read(self, method: str, query):
+        """Run a read-only query on the replica, falling back to the primary"""
+        if self._use_replica():
+            try:
+                return await getattr(self.read_database, method)(query)
+            except Exception as e:
+                logger.error(f"Read replica query failed, retrying on primary: {str(e)}")
+                self._replica_down_until = time.monotonic() + REPLICA_RETRY_AFTER
+        return await getattr(self.database, method)(query)
         
-    async def create_tables(self):
-        """Create all tables"""
-        metadata.create_all(engine)
-        logger.info("Database tables created")
+    # Content rendering and compression helpers
+    @staticmethod
+    def _render_content(values: dict) -> dict:
+        """Render a new `content` value to HTML (call before compressing it)"""
+        if "content" in values:
+            values["content_html_hash"], values["content_html"] = render_markdown(values["content"])
+        return values
+
+    @staticmethod
+    def _encode_content(values: dict) -> dict:
+        """Move a large `content` value into the compressed column"""
+        if "content" in values:
+            blob = compress_content(values["content"])
+            values["content_compressed"] = blob
+            if blob is not None:
+                values["content"] = ""
+        return values
+
+    @staticmethod
+    def _row_to_reflection(row) -> Reflection:
+        """Build a Reflection from a row, decompressing content if needed"""
+        data = dict(row)
+        rendered_from = data.pop("content_html_hash", None)
+        data.pop("change_seq", None)
+        blob = data.pop("content_compressed", None)
+        if blob is not None:
+            data["content"] = decompress_content(blob)
+        if data.get("content_html") is None or rendered_from != content_hash(data["content"]):
+            # Rows not yet backfilled by migration 0005, or rendered before a
+            # RENDERER_VERSION bump; cached after the first render
+            _, data["content_html"] = render_markdown(data["content"])
+        return Reflection(**data)
+
+    def _publish_reflection(self, event_type: str, reflection: Reflection):
+        """Announce a change to a published reflection (drafts stay private)"""
+        if not reflection.published:
+            # An unpublished post disappears from public listings
+            if event_type == "reflection.updated":
+                self.reflection_events.publish("reflection.deleted", {"id": reflection.id})
+            return
+        self.reflection_events.publish(event_type, reflection.dict(exclude={"content", "content_html", "created_at"}))
 
     # Reflection operations
+    @serialized_write
     async def create_reflection(self, reflection_data: dict) -> Reflection:
         """Create a new reflection"""
         reflection = Reflection(**reflection_data)
         reflection.read_time = reflection.calculate_read_time()
         reflection.updated_at = datetime.utcnow()
         
-        query = reflections_table.insert().values(**reflection.dict())
-        await self.database.execute(query)
+        values = self._render_content(reflection.dict())
+        reflection.content_html = values["content_html"]
+        async with self.database.transaction():
+            values["change_seq"] = await self._next_change_seq()
+            query = reflections_table.insert().values(**self._encode_content(values))
+            await self.database.execute(query)
+            # A re-created id must not still be reported as deleted
+            await self.database.execute(reflection_tombstones_table.delete().where(
+                reflection_tombstones_table.c.id == reflection.id
+            ))
+        self._mark_write()
+        await self._invalidate(f"reflection:{reflection.id}")
+        self._publish_reflection("reflection.created", reflection)
+        await self._index_reflection(reflection)
         logger.info(f"Created reflection: {reflection.title}")
         return reflection
 
-    async def get_reflections(self, category: Optional[str] = None, published_only: bool = True) -> List[Reflection]:
-        """Get all reflections, optionally filtered by category"""
+    async def load_catalogue(self):
+        """Load published reflection metadata into the in-memory catalogue"""
+        c = reflections_table.c
+        query = sqlalchemy.select(c.id, c.date, c.category, c.tags).where(c.published == True)
+        rows = await self.database.fetch_all(query)
+        self.catalogue.load((row["id"], row["date"], row["category"], row["tags"] or []) for row in rows)
+        logger.info(f"Loaded {len(self.catalogue)} published reflections into the catalogue")
+
+    async def refresh_snapshot(self):
+        """Rebuild the local snapshot of published reflections from the database"""
+        self.snapshot.replace(await self.get_reflections())
+        await self.snapshot.save()
+
+    async def _index_reflection(self, reflection: Reflection):
+        """Bring the catalogue and snapshot in line with a written reflection"""
+        if self.catalogue.loaded:
+            self.catalogue.upsert(
+                reflection.id, reflection.date, reflection.category.value, reflection.tags, reflection.published
+            )
+        if self.snapshot.loaded:
+            self.snapshot.upsert(reflection)
+            await self.snapshot.save()
+
+    async def _unindex_reflection(self, reflection_id: str):
+        self.catalogue.remove(reflection_id)
+        if self.snapshot.loaded:
+            self.snapshot.remove(reflection_id)
+            await self.snapshot.save()
+
+    @coalesced
+    @serve_stale
+    async def get_reflections(
+        self, category: Optional[str] = None, published_only: bool = True, tag: Optional[str] = None
+    ) -> List[Reflection]:
+        """Get all reflections, optionally filtered by category and/or tag"""
+        if tag and published_only and self.catalogue.loaded:
+            # Tags live in a JSON column the query cannot filter on, so find
+            # the matching ids in memory and fetch just those rows by key.
+            # Other lists are a single indexed query and go to the database.
+            ids = self.catalogue.ids(category=category, tag=tag)
+            reflections = await self.get_reflections_by_ids(ids) if ids else []
+            read_logger.info("Retrieved %d reflections", len(reflections))
+            return reflections
+
         query = reflections_table.select()
         
         if published_only:
@@ -97,21 +526,60 @@ class Database:
             
         query = query.order_by(reflections_table.c.date.desc())
         
-        rows = await self.database.fetch_all(query)
-        reflections = [Reflection(**dict(row)) for row in rows]
+        rows = await self._read("fetch_all", query)
+        reflections = [self._row_to_reflection(row) for row in rows]
+        if tag:
+            reflections = [reflection for reflection in reflections if tag in reflection.tags]
         
-        logger.info(f"Retrieved {len(reflections)} reflections")
+        read_logger.info("Retrieved %d reflections", len(reflections))
         return reflections
 
+    @coalesced
+    @serve_stale
     async def get_reflection_by_id(self, reflection_id: str) -> Optional[Reflection]:
         """Get a single reflection by ID"""
         query = reflections_table.select().where(reflections_table.c.id == reflection_id)
-        row = await self.database.fetch_one(query)
+        row = await self._read("fetch_one", query)
         
         if row:
-            return Reflection(**dict(row))
+            return self._row_to_reflection(row)
         return None
 
+    @coalesced
+    @serve_stale
+    async def get_reflections_by_ids(self, reflection_ids: List[str], published_only: bool = True) -> List[Reflection]:
+        """Get several reflections by id (one query per 500), in the order requested"""
+        found = {}
+        for start in range(0, len(reflection_ids), MAX_IN_IDS):
+            query = reflections_table.select().where(
+                reflections_table.c.id.in_(reflection_ids[start:start + MAX_IN_IDS])
+            )
+            if published_only:
+                query = query.where(reflections_table.c.published == True)
+            rows = await self._read("fetch_all", query)
+            found.update((row["id"], row) for row in rows)
+        return [self._row_to_reflection(found[rid]) for rid in reflection_ids if rid in found]
+
+    async def get_published_reflection_versions(self) -> Dict[str, int]:
+        """Change number of every published reflection, read from the primary"""
+        c = reflections_table.c
+        rows = await self.database.fetch_all(
+            sqlalchemy.select(c.id, c.change_seq).where(c.published == True)
+        )
+        return {row["id"]: row["change_seq"] for row in rows}
+
+    async def get_reflections_from_primary(self, reflection_ids: List[str]) -> List[Reflection]:
+        """Published reflections by id, read from the primary (never shared or stale)"""
+        reflections = []
+        for start in range(0, len(reflection_ids), MAX_IN_IDS):
+            rows = await self.database.fetch_all(reflections_table.select().where(sqlalchemy.and_(
+                reflections_table.c.id.in_(reflection_ids[start:start + MAX_IN_IDS]),
+                reflections_table.c.published == True,
+            )))
+            reflections.extend(self._row_to_reflection(row) for row in rows)
+        return reflections
+
+    @serialized_write
     async def update_reflection(self, reflection_id: str, update_data: dict) -> Optional[Reflection]:
         """Update a reflection"""
         update_data["updated_at"] = datetime.utcnow()
@@ -121,51 +589,353 @@ class Database:
             words = len(update_data["content"].split())
             minutes = max(1, round(words / 200))
             update_data["read_time"] = f"{minutes} min read"
+            self._render_content(update_data)
+            self._encode_content(update_data)
         
-        query = reflections_table.update().where(
-            reflections_table.c.id == reflection_id
-        ).values(**update_data)
-        
-        await self.database.execute(query)
-        return await self.get_reflection_by_id(reflection_id)
+        async with self.database.transaction():
+            update_data["change_seq"] = await self._next_change_seq()
+            query = reflections_table.update().where(
+                reflections_table.c.id == reflection_id
+            ).values(**update_data)
+            
+            await self.database.execute(query)
+        self._mark_write()
+        await self._invalidate(f"reflection:{reflection_id}")
+        # Straight from the primary, never a shared or replica read that may predate the write
+        row = await self.database.fetch_one(
+            reflections_table.select().where(reflections_table.c.id == reflection_id)
+        )
+        reflection = self._row_to_reflection(row) if row else None
+        if reflection:
+            self._publish_reflection("reflection.updated", reflection)
+            await self._index_reflection(reflection)
+        return reflection
 
+    @serialized_write
     async def delete_reflection(self, reflection_id: str) -> bool:
         """Delete a reflection"""
-        query = reflections_table.delete().where(reflections_table.c.id == reflection_id)
-        result = await self.database.execute(query)
+        tombstones = reflection_tombstones_table
+        async with self.database.transaction():
+            # Counter first, in the same lock order as other reflection writes
+            change_seq = await self._next_change_seq()
+            # RETURNING rather than the rowcount, which asyncpg does not report
+            query = reflections_table.delete().where(
+                reflections_table.c.id == reflection_id
+            ).returning(reflections_table.c.id)
+            deleted = await self.database.fetch_val(query) is not None
+            if deleted:
+                await self.database.execute(tombstones.delete().where(tombstones.c.id == reflection_id))
+                await self.database.execute(tombstones.insert().values(
+                    id=reflection_id, change_seq=change_seq, deleted_at=datetime.utcnow()
+                ))
+        self._mark_write()
+        if deleted:
+            await self._invalidate(f"reflection:{reflection_id}")
+            self.reflection_events.publish("reflection.deleted", {"id": reflection_id})
+            await self._unindex_reflection(reflection_id)
         logger.info(f"Deleted reflection: {reflection_id}")
-        return result > 0
+        return deleted
+
+    # Change feed
+    async def _next_change_seq(self, name: str = REFLECTION_CHANGES) -> int:
+        """Take the next change number (call inside the write's transaction)"""
+        counter = change_counters_table.c
+        await self.database.execute(
+            change_counters_table.update().where(counter.name == name).values(value=counter.value + 1)
+        )
+        return await self.database.fetch_val(sqlalchemy.select(counter.value).where(counter.name == name))
+
+    async def get_reflection_changes(self, since: int, limit: int) -> Tuple[List[ReflectionChange], int, bool]:
+        """
+        Public reflection changes after change number `since`, oldest first.
+        Returns (changes, next_since, has_more); drafts and deleted posts are
+        reported as deletes.
+        """
+        c = reflections_table.c
+        tombstones = reflection_tombstones_table
+        rows = await self._read("fetch_all", reflections_table.select().where(
+            c.change_seq > since
+        ).order_by(c.change_seq).limit(limit + 1))
+        deleted = await self._read("fetch_all", tombstones.select().where(
+            tombstones.c.change_seq > since
+        ).order_by(tombstones.c.change_seq).limit(limit + 1))
+
+        entries = sorted(
+            [(row["change_seq"], row, False) for row in rows] + [(row["change_seq"], row, True) for row in deleted],
+            key=lambda entry: entry[0],
+        )
+        has_more = len(entries) > limit
+        changes = []
+        for seq, row, is_tombstone in entries[:limit]:
+            if is_tombstone or not row["published"]:
+                changes.append(ReflectionChange(seq=seq, id=row["id"], type=ChangeType.DELETE))
+            else:
+                changes.append(ReflectionChange(
+                    seq=seq, id=row["id"], type=ChangeType.UPSERT, reflection=self._row_to_reflection(row)
+                ))
+        return changes, changes[-1].seq if changes else since, has_more
+
+    # Image operations
+    @serialized_write
+    async def save_image(self, image: ImageAsset) -> ImageAsset:
+        """Record an uploaded image; re-uploads of the same bytes are a no-op"""
+        existing = await self.get_image(image.id)
+        if existing:
+            return existing
+        values = image.dict()
+        values["variants"] = [
+            {k: v for k, v in variant.items() if k != "url"} for variant in values["variants"]
+        ]
+        await self.database.execute(images_table.insert().values(**values))
+        return image
+
+    @coalesced
+    async def get_image(self, image_id: str) -> Optional[ImageAsset]:
+        """Get an image's metadata by content hash"""
+        row = await self._read("fetch_one", images_table.select().where(images_table.c.id == image_id))
+        if row:
+            return ImageAsset(**dict(row))
+        return None
+
+    # Related reflection operations
+    @serialized_write
+    async def replace_related_reflections(self, related: Dict[str, List[Tuple[str, float]]], full: bool = False):
+        """Store precomputed related lists, replacing the previous ones"""
+        async with self.database.transaction():
+            if full:
+                await self.database.execute(reflection_related_table.delete())
+            elif related:
+                await self.database.execute(reflection_related_table.delete().where(
+                    reflection_related_table.c.reflection_id.in_(list(related))
+                ))
+            rows = [
+                {"reflection_id": reflection_id, "rank": rank, "related_id": related_id, "score": score}
+                for reflection_id, entries in related.items()
+                for rank, (related_id, score) in enumerate(entries)
+            ]
+            if rows:
+                await self.database.execute_many(reflection_related_table.insert(), rows)
+
+    @coalesced
+    async def get_related_reflections(self, reflection_id: str, limit: int = 5) -> List[RelatedReflection]:
+        """Get the precomputed related reflections for a post"""
+        query = sqlalchemy.select(
+            reflections_table.c.id,
+            reflections_table.c.title,
+            reflections_table.c.excerpt,
+            reflections_table.c.category,
+            reflections_table.c.tags,
+            reflections_table.c.date,
+            reflections_table.c.read_time,
+            reflection_related_table.c.score,
+        ).select_from(
+            reflection_related_table.join(
+                reflections_table, reflections_table.c.id == reflection_related_table.c.related_id
+            )
+        ).where(
+            reflection_related_table.c.reflection_id == reflection_id,
+            reflections_table.c.published == True,
+        ).order_by(reflection_related_table.c.rank).limit(limit)
+        rows = await self.database.fetch_all(query)
+        return [RelatedReflection(**dict(row)) for row in rows]
 
     async def get_reflection_categories(self) -> List[str]:
         """Get all available reflection categories"""
         return [category.value for category in ReflectionCategory]
 
     # Contact operations
+    @serialized_write
     async def create_contact_submission(self, contact_data: dict) -> ContactSubmission:
         """Create a new contact submission"""
         contact = ContactSubmission(**contact_data)
         query = contacts_table.insert().values(**contact.dict())
         await self.database.execute(query)
-        logger.info(f"Created contact submission from: {contact.email}")
+        self._mark_write()
+        logger.info("Created contact submission from: %s", contact.email)
         return contact
 
-    async def get_contact_submissions(self) -> List[ContactSubmission]:
-        """Get all contact submissions"""
-        query = contacts_table.select().order_by(contacts_table.c.submitted_at.desc())
-        rows = await self.database.fetch_all(query)
+    @serialized_write
+    async def restore_contact_submission(self, contact: ContactSubmission) -> bool:
+        """Store a submission spooled during an outage (a no-op if it is already stored)"""
+        query = self._insert_ignoring_conflicts(contacts_table).values(
+            **contact.dict()
+        ).returning(contacts_table.c.id)
+        inserted = await self.database.fetch_val(query) is not None
+        self._mark_write()
+        return inserted
+
+    async def get_contact_submissions(
+        self, include_spam: bool = False, since: Optional[datetime] = None
+    ) -> List[ContactSubmission]:
+        """Get contact submissions (from `since` on), leaving out spam unless asked for"""
+        query = contacts_table.select()
+        if since is not None:
+            # Lets Postgres skip the partitions of older months
+            query = query.where(contacts_table.c.submitted_at >= since)
+        if not include_spam:
+            query = query.where(contacts_table.c.status.notin_(
+                [ContactStatus.SPAM.value, ContactStatus.QUARANTINED.value]
+            ))
+        query = query.order_by(contacts_table.c.submitted_at.desc())
+        rows = await self._read("fetch_all", query)
         return [ContactSubmission(**dict(row)) for row in rows]
 
+    async def get_contact_submission(self, submission_id: str) -> Optional[ContactSubmission]:
+        """Get a single contact submission by ID"""
+        row = await self.database.fetch_one(contacts_table.select().where(contacts_table.c.id == submission_id))
+        if row:
+            return ContactSubmission(**dict(row))
+        return None
+
+    @serialized_write
+    async def update_contact_status(self, submission_id: str, status: ContactStatus):
+        """Set a contact submission's status"""
+        query = contacts_table.update().where(contacts_table.c.id == submission_id).values(status=status.value)
+        await self.database.execute(query)
+        self._mark_write()
+        # Labels train the spam model, which every worker keeps a copy of
+        await self._invalidate(f"contact:{submission_id}")
+
+    async def get_labelled_contact_submissions(self, limit: int) -> List[Tuple[ContactSubmission, bool]]:
+        """Recent submissions an admin has labelled, as (submission, is_spam), read from the primary"""
+        labelled = []
+        for statuses, spam in (
+            ([ContactStatus.SPAM.value], True),
+            ([ContactStatus.READ.value, ContactStatus.REPLIED.value], False),
+        ):
+            query = contacts_table.select().where(
+                contacts_table.c.status.in_(statuses)
+            ).order_by(contacts_table.c.submitted_at.desc()).limit(limit)
+            # Retraining follows a label written moments ago, which a replica may not have yet
+            rows = await self.database.fetch_all(query)
+            labelled.extend((ContactSubmission(**dict(row)), spam) for row in rows)
+        return labelled
+
+    @contextlib.asynccontextmanager
+    async def advisory_lock(self, key: int) -> AsyncIterator[bool]:
+        """
+        Hold a Postgres advisory lock (in a transaction) for the block, so
+        one worker does work all of them would otherwise repeat. Yields
+        False without waiting if another worker holds it; always True on
+        SQLite.
+        """
+        if is_sqlite_url(self.database_url):
+            yield True
+            return
+        async with self.database.transaction():
+            yield bool(await self.database.fetch_val(
+                sqlalchemy.select(sqlalchemy.func.pg_try_advisory_xact_lock(key))
+            ))
+
+    # Contact partitions and archival
+    async def _contacts_partitioned(self) -> bool:
+        if is_sqlite_url(self.database_url):
+            return False
+        kind = await self.database.fetch_val(sqlalchemy.text(
+            "SELECT relkind FROM pg_class WHERE relname = 'contacts' AND pg_table_is_visible(oid)"
+        ))
+        return kind == "p"
+
+    async def _contact_partitions(self) -> List[str]:
+        rows = await self.database.fetch_all(sqlalchemy.text(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " JOIN pg_class parent ON parent.oid = pg_inherits.inhparent"
+            " WHERE parent.relname = 'contacts' AND pg_table_is_visible(parent.oid)"
+        ))
+        return [row[0] for row in rows]
+
+    async def ensure_contact_partitions(self, current_month: datetime, months_ahead: int) -> int:
+        """Create partitions for this month and the next `months_ahead` (Postgres only)"""
+        if not await self._contacts_partitioned():
+            return 0
+        existing = set(await self._contact_partitions())
+        created = 0
+        for offset in range(months_ahead + 1):
+            month = add_months(current_month, offset)
+            if partition_name(month) in existing:
+                continue
+            try:
+                await self.database.execute(sqlalchemy.text(create_partition_sql(month)))
+                created += 1
+                logger.info(f"Created contacts partition {partition_name(month)}")
+            except Exception as e:
+                # e.g. the default partition already holds rows for that month
+                logger.error(f"Error creating contacts partition {partition_name(month)}: {str(e)}")
+        return created
+
+    async def get_contact_months_before(self, cutoff: datetime) -> List[datetime]:
+        """Months before `cutoff` that still hold submissions or a partition"""
+        c = contacts_table.c
+        oldest = await self.database.fetch_val(
+            sqlalchemy.select(sqlalchemy.func.min(c.submitted_at)).where(c.submitted_at < cutoff)
+        )
+        months = set()
+        if oldest is not None:
+            month = month_start(oldest)
+            while month < cutoff:
+                months.add(month)
+                month = add_months(month, 1)
+        if await self._contacts_partitioned():
+            # Empty partitions are dropped too
+            for name in await self._contact_partitions():
+                if name.startswith("contacts_p"):
+                    year, month_number = name[len("contacts_p"):].split("_")
+                    month = datetime(int(year), int(month_number), 1)
+                    if month < cutoff:
+                        months.add(month)
+        return sorted(months)
+
+    @serialized_write
+    async def archive_contact_month(
+        self, month: datetime, write_archive: Callable[[List[ContactSubmission]], object]
+    ) -> int:
+        """
+        Hand a month's submissions to `write_archive` (run in a thread), then
+        remove them: the month's partition is dropped on Postgres, rows are
+        deleted otherwise. Returns how many were archived.
+        """
+        c = contacts_table.c
+        in_month = sqlalchemy.and_(c.submitted_at >= month, c.submitted_at < add_months(month, 1))
+        partitioned = await self._contacts_partitioned()
+        async with self.database.transaction():
+            if partitioned and not await self.database.fetch_val(
+                sqlalchemy.select(sqlalchemy.func.pg_try_advisory_xact_lock(CONTACT_ARCHIVE_LOCK))
+            ):
+                # Another worker is archiving
+                return 0
+            rows = await self.database.fetch_all(contacts_table.select().where(in_month).order_by(c.submitted_at))
+            submissions = [ContactSubmission(**dict(row)) for row in rows]
+            if submissions:
+                # Written and synced before anything is removed
+                await asyncio.to_thread(write_archive, submissions)
+            if partitioned and partition_name(month) in await self._contact_partitions():
+                await self.database.execute(sqlalchemy.text(
+                    f"ALTER TABLE contacts DETACH PARTITION {partition_name(month)}"
+                ))
+                await self.database.execute(sqlalchemy.text(f"DROP TABLE {partition_name(month)}"))
+            # Rows left in the default partition, or the whole month on SQLite
+            await self.database.execute(contacts_table.delete().where(in_month))
+        self._mark_write()
+        return len(submissions)
+
     # Admin session operations
+    @serialized_write
     async def create_admin_session(self, session_data: dict) -> AdminSession:
         """Create a new admin session"""
         session = AdminSession(**session_data)
         query = admin_sessions_table.insert().values(**session.dict())
         await self.database.execute(query)
-        logger.info(f"Created admin session: {session.session_id}")
+        logger.info("Created admin session expiring %s", session.expires_at)
         return session
 
     async def get_admin_session(self, session_id: str) -> Optional[AdminSession]:
         """Get admin session by session ID"""
+        session = self._sessions.get(session_id)
+        if session is not None and session.expires_at > datetime.utcnow():
+            return session
+        
+        generation = self._write_generation
         query = admin_sessions_table.select().where(admin_sessions_table.c.session_id == session_id)
         row = await self.database.fetch_one(query)
         
@@ -173,17 +943,223 @@ class Database:
             session = AdminSession(**dict(row))
             # Check if session is expired
             if session.expires_at > datetime.utcnow():
+                # Unless a logout ran meanwhile
+                if generation == self._write_generation and len(self._sessions) < MAX_CACHED_SESSIONS:
+                    self._sessions[session_id] = session
                 return session
             else:
                 # Clean up expired session
                 await self.delete_admin_session(session_id)
         return None
 
+    @serialized_write
     async def delete_admin_session(self, session_id: str) -> bool:
         """Delete an admin session"""
-        query = admin_sessions_table.delete().where(admin_sessions_table.c.session_id == session_id)
-        result = await self.database.execute(query)
-        return result > 0
+        query = admin_sessions_table.delete().where(
+            admin_sessions_table.c.session_id == session_id
+        ).returning(admin_sessions_table.c.session_id)
+        deleted = await self.database.fetch_val(query) is not None
+        await self._invalidate(f"session:{session_id}")
+        # Evicted last: the write generation moves on straight after, so a
+        # lookup that read the row before the delete cannot cache it again
+        self._sessions.pop(session_id, None)
+        return deleted
+
+    # Analytics operations
+    @serialized_write
+    async def add_reflection_stats(self, deltas: dict):
+        """Add aggregated view deltas keyed by (reflection_id, bucket_start)"""
+        stats = reflection_stats_table
+        async with self.database.transaction():
+            # Sorted, so workers flushing overlapping buckets lock rows in the same order
+            for (reflection_id, bucket), (views, hll) in sorted(deltas.items(), key=lambda item: item[0]):
+                key = sqlalchemy.and_(stats.c.reflection_id == reflection_id, stats.c.bucket_start == bucket)
+                # Make sure the row exists, then lock it: the registers are merged
+                # here, so two workers must not both start from the old ones
+                await self.database.execute(self._insert_ignoring_conflicts(stats).values(
+                    reflection_id=reflection_id, bucket_start=bucket, views=0, visitors_hll=None
+                ))
+                stored = await self.database.fetch_val(
+                    sqlalchemy.select(stats.c.visitors_hll).where(key).with_for_update()
+                )
+
+                values = {"views": stats.c.views + views}
+                if hll is not None:
+                    merged = HyperLogLog(stored) if stored is not None else HyperLogLog()
+                    merged.merge(hll)
+                    values["visitors_hll"] = merged.to_bytes()
+                await self.database.execute(stats.update().where(key).values(**values))
+
+    async def get_reflection_stats(self, since: datetime, reflection_id: Optional[str] = None) -> list:
+        """Get stats rows from `since` onwards, optionally for one reflection"""
+        query = reflection_stats_table.select().where(reflection_stats_table.c.bucket_start >= since)
+        if reflection_id:
+            query = query.where(reflection_stats_table.c.reflection_id == reflection_id)
+        query = query.order_by(reflection_stats_table.c.bucket_start)
+        return await self.database.fetch_all(query)
+
+    async def get_reflection_titles(self, reflection_ids: List[str]) -> Dict[str, str]:
+        """Get titles for a set of reflection ids"""
+        if not reflection_ids:
+            return {}
+        query = sqlalchemy.select(reflections_table.c.id, reflections_table.c.title).where(
+            reflections_table.c.id.in_(reflection_ids)
+        )
+        rows = await self.database.fetch_all(query)
+        return {row["id"]: row["title"] for row in rows}
+
+    # Job queue operations
+    @serialized_write
+    async def enqueue_job(self, kind: str, payload: dict, max_attempts: int = 5) -> Job:
+        """Persist a job for the background runner"""
+        job = Job(kind=kind, payload=payload, max_attempts=max_attempts)
+        query = jobs_table.insert().values(**job.dict())
+        await self.database.execute(query)
+        return job
+
+    @serialized_write
+    async def claim_due_jobs(self, limit: int, lease: timedelta) -> List[Job]:
+        """Atomically mark up to `limit` due jobs as running and return them"""
+        now = datetime.utcnow()
+        # Pending jobs whose backoff has elapsed, plus running jobs whose
+        # worker died before finishing (lease expired)
+        due = sqlalchemy.or_(
+            sqlalchemy.and_(jobs_table.c.status == "pending", jobs_table.c.run_after <= now),
+            sqlalchemy.and_(jobs_table.c.status == "running", jobs_table.c.locked_until < now),
+        )
+        query = sqlalchemy.select(jobs_table.c.id).where(due).order_by(jobs_table.c.run_after).limit(limit)
+        candidates = await self.database.fetch_all(query)
+
+        claimed = []
+        for candidate in candidates:
+            # The conditional UPDATE ... RETURNING means only one worker wins each job
+            claim = jobs_table.update().where(
+                jobs_table.c.id == candidate["id"]
+            ).where(due).values(
+                status="running",
+                attempts=jobs_table.c.attempts + 1,
+                locked_until=now + lease,
+                updated_at=now,
+            ).returning(*jobs_table.c)
+            row = await self.database.fetch_one(claim)
+            if row:
+                claimed.append(Job(**dict(row)))
+        return claimed
+
+    @serialized_write
+    async def complete_job(self, job_id: str):
+        """Mark a job as done"""
+        query = jobs_table.update().where(jobs_table.c.id == job_id).values(
+            status="done", locked_until=None, last_error=None, updated_at=datetime.utcnow()
+        )
+        await self.database.execute(query)
+
+    @serialized_write
+    async def fail_job(self, job: Job, error: str, retry_at: Optional[datetime]):
+        """Record a failed attempt, rescheduling it or giving up"""
+        values = {"last_error": error, "locked_until": None, "updated_at": datetime.utcnow()}
+        if retry_at is None:
+            values["status"] = "failed"
+        else:
+            values["status"] = "pending"
+            values["run_after"] = retry_at
+        query = jobs_table.update().where(jobs_table.c.id == job.id).values(**values)
+        await self.database.execute(query)
+
+    @serialized_write
+    async def purge_finished_jobs(self, finished_before: datetime):
+        """Delete done jobs last updated before `finished_before`"""
+        await self.database.execute(jobs_table.delete().where(sqlalchemy.and_(
+            jobs_table.c.status == "done",
+            jobs_table.c.updated_at < finished_before,
+        )))
+
+    async def get_job_queue_stats(self) -> JobQueueStats:
+        """Count jobs by status and report the age of the oldest due job"""
+        query = sqlalchemy.select(
+            jobs_table.c.status, sqlalchemy.func.count()
+        ).group_by(jobs_table.c.status)
+        rows = await self.database.fetch_all(query)
+        counts = {row[0]: row[1] for row in rows}
+
+        oldest_query = sqlalchemy.select(sqlalchemy.func.min(jobs_table.c.run_after)).where(
+            jobs_table.c.status == "pending"
+        )
+        oldest = await self.database.fetch_val(oldest_query)
+        oldest_age = None
+        if oldest is not None:
+            oldest_age = max(0.0, (datetime.utcnow() - oldest).total_seconds())
+
+        return JobQueueStats(
+            pending=counts.get("pending", 0),
+            running=counts.get("running", 0),
+            done=counts.get("done", 0),
+            failed=counts.get("failed", 0),
+            oldest_pending_seconds=oldest_age,
+        )
+
+    # Idempotency key operations
+    def _insert_ignoring_conflicts(self, table: Table):
+        """INSERT that does nothing when the primary key already exists"""
+        if is_sqlite_url(self.database_url):
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing()
+
+    @serialized_write
+    async def claim_idempotency_key(
+        self, key: str, request_hash: str, ttl: timedelta, stale_after: timedelta
+    ) -> Optional[IdempotencyRecord]:
+        """
+        Claim a key for a new request. Returns None if claimed, otherwise the
+        existing record (completed, or still in progress elsewhere).
+        """
+        now = datetime.utcnow()
+        # Expired keys, and in-progress claims whose worker has gone away,
+        # can be taken over
+        await self.database.execute(idempotency_keys_table.delete().where(
+            idempotency_keys_table.c.key == key
+        ).where(sqlalchemy.or_(
+            idempotency_keys_table.c.expires_at <= now,
+            sqlalchemy.and_(
+                idempotency_keys_table.c.status_code.is_(None),
+                idempotency_keys_table.c.created_at <= now - stale_after,
+            ),
+        )))
+        record = IdempotencyRecord(key=key, request_hash=request_hash, created_at=now, expires_at=now + ttl)
+        claim = self._insert_ignoring_conflicts(idempotency_keys_table).values(
+            **record.dict()
+        ).returning(idempotency_keys_table.c.key)
+        if await self.database.fetch_one(claim):
+            return None
+        row = await self.database.fetch_one(
+            idempotency_keys_table.select().where(idempotency_keys_table.c.key == key)
+        )
+        return IdempotencyRecord(**dict(row)) if row else None
+
+    @serialized_write
+    async def complete_idempotency_key(self, key: str, status_code: int, content_type: Optional[str], body: bytes):
+        """Store the response for a claimed key"""
+        query = idempotency_keys_table.update().where(idempotency_keys_table.c.key == key).values(
+            status_code=status_code, content_type=content_type, body=body
+        )
+        await self.database.execute(query)
+
+    @serialized_write
+    async def release_idempotency_key(self, key: str):
+        """Drop an unfinished claim so the request can be retried"""
+        await self.database.execute(idempotency_keys_table.delete().where(
+            idempotency_keys_table.c.key == key,
+            idempotency_keys_table.c.status_code.is_(None),
+        ))
+
+    @serialized_write
+    async def purge_expired_idempotency_keys(self):
+        """Delete expired keys"""
+        await self.database.execute(idempotency_keys_table.delete().where(
+            idempotency_keys_table.c.expires_at <= datetime.utcnow()
+        ))
 
     # Database seeding
     async def seed_initial_data(self):
@@ -245,8 +1221,11 @@ def get_database() -> Database:
     """Get database instance"""
     return db_instance
 
-def init_database() -> Database:
+def init_database(database_url: Optional[str] = None, read_url: Optional[str] = None) -> Database:
     """Initialize database"""
     global db_instance
-    db_instance = Database()
+    if database_url is None:
+        database_url = os.environ.get("DATABASE_URL")
+        read_url = os.environ.get("DATABASE_READ_URL")
+    db_instance = Database(database_url, read_url)
     return db_instance
@@ -0,0 +1,180 @@
+"""
+Fan-out of reflection change events to Server-Sent Events subscribers.
+
+Every event is encoded once when it is published and the same bytes are
+handed to each subscriber, so an idle connection costs a small deque and
+an asyncio.Event rather than a task or a timer of its own. One heartbeat
+task serves all subscribers.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, List, NamedTuple, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOG_SIZE = int(os.environ.get("SSE_EVENT_LOG_SIZE", "500"))
+HEARTBEAT_INTERVAL = float(os.environ.get("SSE_HEARTBEAT_INTERVAL", "15"))
+MAX_SUBSCRIBERS = int(os.environ.get("SSE_MAX_SUBSCRIBERS", "10000"))
+# Events a subscriber may fall behind by before it is disconnected; it can
+# then reconnect and catch up from the event log
+SUBSCRIBER_BACKLOG = 64
+RETRY_MS = 5000
+
+HEARTBEAT = b": ping\n\n"
+
+
+class Event(NamedTuple):
+    seq: int
+    type: str
+    encoded: bytes
+
+
+def encode_event(event_id: Optional[str], event_type: str, data: dict) -> bytes:
+    """Format one SSE message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class Subscription:
+    """One connected client's pending messages"""
+
+    __slots__ = ("_pending", "_ready", "closed")
+
+    def __init__(self):
+        self._pending: Deque[bytes] = deque()
+        self._ready = asyncio.Event()
+        self.closed = False
+
+    def push(self, message: bytes) -> bool:
+        """Queue a message, returning False if the subscriber fell too far behind"""
+        if self.closed:
+            return False
+        if len(self._pending) >= SUBSCRIBER_BACKLOG:
+            self.close()
+            return False
+        self._pending.append(message)
+        self._ready.set()
+        return True
+
+    def push_all(self, messages: List[bytes]):
+        """Queue a replayed backlog, which is allowed to exceed the usual limit"""
+        self._pending.extend(messages)
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def next_batch(self) -> List[bytes]:
+        """Wait for and take every pending message"""
+        await self._ready.wait()
+        self._ready.clear()
+        batch = list(self._pending)
+        self._pending.clear()
+        return batch
+
+
+class EventBroadcaster:
+    """
+    Publishes events to every subscriber and keeps the last `log_size`
+    for `Last-Event-ID` resume.
+
+    Event ids are `<epoch>-<seq>`; the epoch changes on every restart, so a
+    client resuming from another process (or from an event that has already
+    left the log) is told to reset and refetch instead of silently missing
+    changes.
+    """
+
+    def __init__(self, log_size: int = EVENT_LOG_SIZE, heartbeat_interval: float = HEARTBEAT_INTERVAL):
+        self.epoch = format(int(time.time() * 1000), "x")
+        self.heartbeat_interval = heartbeat_interval
+        self._log: Deque[Event] = deque(maxlen=log_size)
+        self._seq = 0
+        self._subscribers: Set[Subscription] = set()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the latest event; changes whenever a published reflection does"""
+        return self._seq
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def publish(self, event_type: str, data: dict) -> Event:
+        """Record an event and hand it to every subscriber without blocking"""
+        self._seq += 1
+        event = Event(self._seq, event_type, encode_event(self.event_id(self._seq), event_type, data))
+        self._log.append(event)
+        dropped = [sub for sub in self._subscribers if not sub.push(event.encoded)]
+        for sub in dropped:
+            self._subscribers.discard(sub)
+        if dropped:
+            logger.info(f"Disconnected {len(dropped)} slow event stream subscribers")
+        return event
+
+    def _replay(self, last_event_id: str) -> Optional[List[bytes]]:
+        """Events after `last_event_id`, or None if they are no longer available"""
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        oldest = self._log[0].seq if self._log else self._seq + 1
+        if seq > self._seq or seq < oldest - 1:
+            return None
+        return [event.encoded for event in self._log if event.seq > seq]
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """Register a subscriber, queueing any events it missed"""
+        if len(self._subscribers) >= MAX_SUBSCRIBERS:
+            raise OverflowError("Too many event stream subscribers")
+        sub = Subscription()
+        sub.push(f"retry: {RETRY_MS}\n\n".encode())
+        if last_event_id:
+            missed = self._replay(last_event_id)
+            if missed is None:
+                sub.push(encode_event(self.event_id(self._seq), "reset", {}))
+            else:
+                sub.push_all(missed)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        self._subscribers.discard(sub)
+        sub.close()
+
+    def start(self):
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        """Stop heartbeats and end every open stream"""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        for sub in list(self._subscribers):
+            self.unsubscribe(sub)
+
+    async def _heartbeat(self):
+        # Keeps proxies from timing out idle connections
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            for sub in list(self._subscribers):
+                if not sub.push(HEARTBEAT):
+                    self._subscribers.discard(sub)
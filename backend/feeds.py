@@ -0,0 +1,198 @@
+"""
+RSS, Atom, JSON Feed and sitemap documents for published reflections.
+
+Rendered documents are cached with their ETag and Last-Modified and are
+only rebuilt once a published reflection has changed, which the
+database's reflection event sequence tells us without a query.
+"""
+import asyncio
+import hashlib
+import json
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from models import Reflection
+
+FEED_ITEM_LIMIT = 50
+FEED_TITLE = "Pranay Sultania - Reflections"
+FEED_DESCRIPTION = "Reflections on investing, yoga and a life of purpose by Pranay Sultania"
+FEED_AUTHOR = "Pranay Sultania"
+FEED_CACHE_CONTROL = "public, max-age=300"
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+class RenderedFeed(NamedTuple):
+    body: bytes
+    media_type: str
+    etag: str
+    last_modified: datetime
+
+
+def _utc(moment: datetime) -> datetime:
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def _iso(moment: datetime) -> str:
+    return _utc(moment).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+def reflection_url(site_url: str, reflection: Reflection) -> str:
+    """Public link for a post (the site is a single page, so a query parameter)"""
+    return f"{site_url}/?reflection={reflection.id}"
+
+
+def _xml(root: ET.Element) -> bytes:
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+
+def render_rss(reflections: List[Reflection], site_url: str, feed_url: str) -> bytes:
+    rss = ET.Element("rss", {"version": "2.0", "xmlns:atom": ATOM_NS})
+    channel = ET.SubElement(rss, "channel")
+    ET.SubElement(channel, "title").text = FEED_TITLE
+    ET.SubElement(channel, "link").text = site_url
+    ET.SubElement(channel, "description").text = FEED_DESCRIPTION
+    ET.SubElement(channel, "atom:link", {"href": feed_url, "rel": "self", "type": "application/rss+xml"})
+    if reflections:
+        ET.SubElement(channel, "lastBuildDate").text = format_datetime(_utc(reflections[0].updated_at))
+    for reflection in reflections[:FEED_ITEM_LIMIT]:
+        item = ET.SubElement(channel, "item")
+        ET.SubElement(item, "title").text = reflection.title
+        ET.SubElement(item, "link").text = reflection_url(site_url, reflection)
+        ET.SubElement(item, "guid", {"isPermaLink": "false"}).text = reflection.id
+        ET.SubElement(item, "description").text = reflection.excerpt
+        ET.SubElement(item, "category").text = reflection.category
+        ET.SubElement(item, "pubDate").text = format_datetime(_utc(reflection.date))
+    return _xml(rss)
+
+
+def render_atom(reflections: List[Reflection], site_url: str, feed_url: str) -> bytes:
+    feed = ET.Element("feed", {"xmlns": ATOM_NS})
+    ET.SubElement(feed, "title").text = FEED_TITLE
+    ET.SubElement(feed, "subtitle").text = FEED_DESCRIPTION
+    ET.SubElement(feed, "id").text = feed_url
+    ET.SubElement(feed, "link", {"href": site_url})
+    ET.SubElement(feed, "link", {"href": feed_url, "rel": "self"})
+    updated = max((r.updated_at for r in reflections), default=datetime.utcnow())
+    ET.SubElement(feed, "updated").text = _iso(updated)
+    author = ET.SubElement(feed, "author")
+    ET.SubElement(author, "name").text = FEED_AUTHOR
+    for reflection in reflections[:FEED_ITEM_LIMIT]:
+        entry = ET.SubElement(feed, "entry")
+        ET.SubElement(entry, "title").text = reflection.title
+        ET.SubElement(entry, "id").text = f"urn:uuid:{reflection.id}"
+        ET.SubElement(entry, "link", {"href": reflection_url(site_url, reflection)})
+        ET.SubElement(entry, "published").text = _iso(reflection.date)
+        ET.SubElement(entry, "updated").text = _iso(reflection.updated_at)
+        ET.SubElement(entry, "summary").text = reflection.excerpt
+        ET.SubElement(entry, "category", {"term": reflection.category})
+    return _xml(feed)
+
+
+def render_json_feed(reflections: List[Reflection], site_url: str, feed_url: str) -> bytes:
+    feed = {
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": FEED_TITLE,
+        "home_page_url": site_url,
+        "feed_url": feed_url,
+        "description": FEED_DESCRIPTION,
+        "authors": [{"name": FEED_AUTHOR}],
+        "items": [
+            {
+                "id": reflection.id,
+                "url": reflection_url(site_url, reflection),
+                "title": reflection.title,
+                "summary": reflection.excerpt,
+                "content_html": reflection.content_html,
+                "content_text": reflection.content,
+                "date_published": _iso(reflection.date),
+                "date_modified": _iso(reflection.updated_at),
+                "tags": [reflection.category, *reflection.tags],
+            }
+            for reflection in reflections[:FEED_ITEM_LIMIT]
+        ],
+    }
+    return json.dumps(feed, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def render_sitemap(reflections: List[Reflection], site_url: str, feed_url: str) -> bytes:
+    urlset = ET.Element("urlset", {"xmlns": SITEMAP_NS})
+    home = ET.SubElement(urlset, "url")
+    ET.SubElement(home, "loc").text = f"{site_url}/"
+    if reflections:
+        ET.SubElement(home, "lastmod").text = _iso(max(r.updated_at for r in reflections))
+    for reflection in reflections:
+        url = ET.SubElement(urlset, "url")
+        ET.SubElement(url, "loc").text = reflection_url(site_url, reflection)
+        ET.SubElement(url, "lastmod").text = _iso(reflection.updated_at)
+    return _xml(urlset)
+
+
+class FeedFormat(NamedTuple):
+    render: Callable[[List[Reflection], str, str], bytes]
+    media_type: str
+
+
+FEED_FORMATS: Dict[str, FeedFormat] = {
+    "feed.xml": FeedFormat(render_rss, "application/rss+xml; charset=utf-8"),
+    "atom.xml": FeedFormat(render_atom, "application/atom+xml; charset=utf-8"),
+    "feed.json": FeedFormat(render_json_feed, "application/feed+json; charset=utf-8"),
+    "sitemap.xml": FeedFormat(render_sitemap, "application/xml; charset=utf-8"),
+}
+
+
+class FeedCache:
+    """Rendered feeds, rebuilt together when published reflections change"""
+
+    def __init__(self, db, site_url: str):
+        self.db = db
+        self.site_url = site_url.rstrip("/")
+        self._version: Optional[int] = None
+        self._feeds: Dict[str, RenderedFeed] = {}
+        self._lock = asyncio.Lock()
+        self.renders = 0
+
+    async def get(self, name: str) -> RenderedFeed:
+        version = self.db.reflection_events.last_seq
+        if self._version != version:
+            async with self._lock:
+                # Concurrent misses wait here and reuse the first render
+                if self._version != version:
+                    await self._render_all(version)
+        return self._feeds[name]
+
+    async def invalidate(self):
+        """Re-render on next use (after another worker's changes may have been missed)"""
+        self._version = None
+
+    async def _render_all(self, version: int):
+        reflections = await self.db.get_reflections(published_only=True)
+        # Render time rather than the newest updated_at, which would go
+        # backwards when a post is deleted or unpublished
+        last_modified = datetime.utcnow()
+        feeds = {}
+        for name, feed_format in FEED_FORMATS.items():
+            body = feed_format.render(reflections, self.site_url, f"{self.site_url}/{name}")
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            feeds[name] = RenderedFeed(body, feed_format.media_type, etag, _utc(last_modified).replace(microsecond=0))
+        self._feeds = feeds
+        self._version = version
+        self.renders += 1
+
+
+def is_not_modified(feed: RenderedFeed, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    """Evaluate conditional GET headers (If-None-Match takes precedence)"""
+    if if_none_match is not None:
+        # Weak comparison: compression turns our ETag into W/"..."
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or feed.etag in tags
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return feed.last_modified <= _utc(since)
+    return False
@@ -0,0 +1,115 @@
+"""
+Liveness and readiness state for load balancers and container healthchecks.
+
+A background task probes the database every few seconds and caches the
+outcome, so /readyz answers from memory: polling it costs no queries and
+a slow database cannot make the healthcheck itself hang. While the
+database is unreachable but the reflection snapshot is loaded, the
+instance is "degraded": it still serves public reads, so it stays in
+rotation.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL = 5.0
+PROBE_TIMEOUT = 2.0
+# Not ready once the last successful probe is older than this
+STALE_AFTER = 15.0
+
+
+class HealthMonitor:
+    """Periodic database probes and the startup outcome, cached for /readyz"""
+
+    def __init__(self, db, interval: float = PROBE_INTERVAL, timeout: float = PROBE_TIMEOUT,
+                 stale_after: float = STALE_AFTER):
+        self.db = db
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.started_at = time.monotonic()
+        self.startup_complete = False
+        self.startup_error: Optional[str] = None
+        self.last_success: Optional[datetime] = None
+        self._last_success_at = float("-inf")
+        self.last_error: Optional[str] = None
+        self.last_latency_ms: Optional[float] = None
+        self.consecutive_failures = 0
+        self.probes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.interval)
+
+    async def probe(self):
+        """Check the primary can answer a query within the timeout"""
+        self.probes += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.db.ping(), self.timeout)
+        except Exception as e:
+            error = "timed out" if isinstance(e, asyncio.TimeoutError) else str(e) or type(e).__name__
+            if self.consecutive_failures == 0:
+                logger.warning(f"Database health probe failed: {error}")
+            self.consecutive_failures += 1
+            self.last_error = error
+            return
+        self.last_latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        if self.consecutive_failures:
+            logger.info(f"Database health probe recovered after {self.consecutive_failures} failures")
+        self.consecutive_failures = 0
+        self._last_success_at = time.monotonic()
+        self.last_success = datetime.utcnow()
+
+    @property
+    def ready(self) -> bool:
+        return self.startup_complete and time.monotonic() - self._last_success_at <= self.stale_after
+
+    @property
+    def degraded(self) -> bool:
+        """Not ready, but public reads can still be answered from the local snapshot"""
+        return not self.ready and self.db.snapshot.loaded
+
+    @property
+    def state(self) -> str:
+        if self.ready:
+            return "ready"
+        return "degraded" if self.degraded else "unavailable"
+
+    def status(self) -> dict:
+        """Readiness details from the cached probe results (no I/O)"""
+        since_success = time.monotonic() - self._last_success_at
+        return {
+            "status": self.state,
+            "snapshot_loaded": self.db.snapshot.loaded,
+            "startup_complete": self.startup_complete,
+            "startup_error": self.startup_error,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1),
+            "database": {
+                "last_success": self.last_success,
+                "seconds_since_success": round(since_success, 1) if self.last_success else None,
+                "latency_ms": self.last_latency_ms,
+                "consecutive_failures": self.consecutive_failures,
+                "last_error": self.last_error,
+                **self.db.pool_status(),
+            },
+        }
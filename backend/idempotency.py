@@ -0,0 +1,249 @@
+"""
+Idempotency-Key support for write endpoints.
+
+A retried request carrying the same key gets the original response back
+instead of creating another row. Completed responses are kept in memory
+for the fast path and in the `idempotency_keys` table so retries that
+land on another worker (or after a restart) are answered too. Duplicates
+arriving while the original is still running wait for it and share its
+response.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set, Tuple
+
+from models import IdempotencyRecord
+from read_your_writes import session_cookie
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = timedelta(hours=24)
+# An unfinished claim older than this belongs to a worker that died
+STALE_CLAIM_AFTER = timedelta(minutes=1)
+PURGE_INTERVAL = 600.0
+MAX_KEY_LENGTH = 255
+# Larger responses are passed through but not remembered
+MAX_STORED_BODY = 64 * 1024
+MEMORY_ENTRIES = 1024
+
+IDEMPOTENT_ROUTES: Set[Tuple[str, str]] = {
+    ("POST", "/api/contact"),
+    ("POST", "/api/reflections"),
+}
+
+
+class IdempotencyStore:
+    """Completed responses in a memory LRU, backed by the database"""
+
+    def __init__(self, db, ttl: timedelta = IDEMPOTENCY_TTL, max_entries: int = MEMORY_ENTRIES):
+        self.db = db
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._completed: "OrderedDict[str, IdempotencyRecord]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._last_purge = time.monotonic()
+        self.replays = 0
+
+    def _remember(self, record: IdempotencyRecord):
+        self._completed[record.key] = record
+        self._completed.move_to_end(record.key)
+        while len(self._completed) > self.max_entries:
+            self._completed.popitem(last=False)
+
+    def _recall(self, key: str) -> Optional[IdempotencyRecord]:
+        record = self._completed.get(key)
+        if record is not None and record.expires_at <= datetime.utcnow():
+            del self._completed[key]
+            return None
+        return record
+
+    async def begin(self, key: str, request_hash: str) -> Optional[IdempotencyRecord]:
+        """
+        Start handling a keyed request. Returns None if the caller should run
+        it (and then call `finish`), otherwise the record to answer with; a
+        record without a status code means the key is in use on another worker.
+        """
+        record = self._recall(key)
+        if record is not None:
+            return record
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            record = await asyncio.shield(in_flight)
+            if record is not None:
+                return record
+            # The original failed without a stored response; run this one
+            return await self.begin(key, request_hash)
+
+        # Claim locally before the first await so concurrent duplicates in
+        # this process wait on the future instead of racing for the row
+        self._in_flight[key] = asyncio.get_running_loop().create_future()
+        try:
+            await self._purge_if_due()
+            record = await self.db.claim_idempotency_key(key, request_hash, self.ttl, STALE_CLAIM_AFTER)
+        except Exception as e:
+            # Database unavailable: run the request, de-duplicating within
+            # this process only (`finish` still remembers the response)
+            logger.warning(f"Error claiming idempotency key, continuing without it: {str(e)}")
+            return None
+        except BaseException:
+            self._in_flight.pop(key).set_result(None)
+            raise
+        if record is not None:
+            self._in_flight.pop(key).set_result(record if record.status_code is not None else None)
+            if record.status_code is not None:
+                self._remember(record)
+        return record
+
+    async def finish(self, key: str, request_hash: str, response: Optional[Tuple[int, Optional[str], bytes]]):
+        """Store the response for a claimed key, or release it if there is none"""
+        record = None
+        try:
+            if response is None:
+                await self.db.release_idempotency_key(key)
+            else:
+                status_code, content_type, body = response
+                now = datetime.utcnow()
+                record = IdempotencyRecord(
+                    key=key, request_hash=request_hash, status_code=status_code,
+                    content_type=content_type, body=body, created_at=now, expires_at=now + self.ttl,
+                )
+                self._remember(record)
+                await self.db.complete_idempotency_key(key, status_code, content_type, body)
+        except Exception as e:
+            # The response has already been sent; an unsaved claim goes stale
+            logger.error(f"Error saving idempotency key: {str(e)}")
+        finally:
+            in_flight = self._in_flight.pop(key, None)
+            if in_flight is not None and not in_flight.done():
+                in_flight.set_result(record)
+
+    async def _purge_if_due(self):
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            await self.db.purge_expired_idempotency_keys()
+        except Exception as e:
+            logger.error(f"Error purging expired idempotency keys: {str(e)}")
+
+
+def _json_response(status: int, detail: str, extra_headers=()):
+    body = json.dumps({"detail": detail}).encode()
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        *extra_headers,
+    ]
+    return status, headers, body
+
+
+class IdempotencyMiddleware:
+    """
+    Honour `Idempotency-Key` on the configured routes.
+
+    Keys are scoped to the route and the admin session cookie, so one
+    client's key can never replay another client's response. Reusing a key
+    with a different body is rejected with 422; 5xx responses are not
+    stored, so the client can retry them.
+    """
+
+    def __init__(self, app, store: IdempotencyStore, routes: Set[Tuple[str, str]] = IDEMPOTENT_ROUTES):
+        self.app = app
+        self.store = store
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+
+        headers = scope["headers"]
+        client_key = next((v.decode("latin-1") for k, v in headers if k == b"idempotency-key"), None)
+        if client_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not client_key or len(client_key) > MAX_KEY_LENGTH:
+            await self._send(send, *_json_response(400, "Invalid Idempotency-Key"))
+            return
+
+        # Read the whole body so it can be fingerprinted, then replay it
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        key = hashlib.sha256(
+            f"{scope['method']} {scope['path']}\0{session_cookie(headers) or ''}\0{client_key}".encode()
+        ).hexdigest()
+        request_hash = hashlib.sha256(body).hexdigest()
+
+        record = await self.store.begin(key, request_hash)
+        if record is not None:
+            if record.request_hash != request_hash:
+                await self._send(send, *_json_response(422, "Idempotency-Key was already used for a different request"))
+            elif record.status_code is None:
+                await self._send(send, *_json_response(
+                    409, "A request with this Idempotency-Key is still in progress", [(b"retry-after", b"1")]
+                ))
+            else:
+                self.store.replays += 1
+                await self._replay(send, record)
+            return
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        captured = {"status": 500, "content_type": None, "body": [], "size": 0}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        captured["content_type"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                captured["size"] += len(chunk)
+                if captured["size"] <= MAX_STORED_BODY:
+                    captured["body"].append(chunk)
+            await send(message)
+
+        response = None
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            if captured["status"] < 500 and captured["size"] <= MAX_STORED_BODY:
+                response = (captured["status"], captured["content_type"], b"".join(captured["body"]))
+        finally:
+            await self.store.finish(key, request_hash, response)
+
+    @staticmethod
+    async def _send(send, status, headers, body):
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _replay(self, send, record: IdempotencyRecord):
+        body = record.body or b""
+        headers = [
+            (b"content-length", str(len(body)).encode()),
+            (b"idempotent-replayed", b"true"),
+        ]
+        if record.content_type:
+            headers.append((b"content-type", record.content_type.encode("latin-1")))
+        await self._send(send, record.status_code, headers, body)
@@ -0,0 +1,250 @@
+"""
+Cache invalidation between workers.
+
+Each worker keeps in-process copies of database state (the reflection
+catalogue and snapshot, rendered feeds, admin sessions). After a write,
+the worker that made it publishes the affected keys, such as
+"reflection:<id>" or "session:<id>", and every other worker evicts or
+reloads them. Postgres delivers them with LISTEN/NOTIFY; the in-memory
+bus connects the workers of a single process (SQLite, tests).
+
+Notifications sent while a listener is disconnected are lost, so after
+any gap the listener asks for a full flush instead.
+"""
+import abc
+import asyncio
+import json
+import logging
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+# Postgres caps NOTIFY payloads at 8000 bytes
+KEYS_PER_MESSAGE = 100
+RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 30.0
+KEEPALIVE_INTERVAL = 30.0
+# How long startup waits for LISTEN before carrying on (a flush follows later)
+START_TIMEOUT = 5.0
+
+KeysHandler = Callable[[List[str]], Awaitable[None]]
+FlushHandler = Callable[[], Awaitable[None]]
+
+
+class InvalidationBus(abc.ABC):
+    """Publishes invalidated keys and runs local handlers for other workers' keys"""
+
+    # Transport name, reported in /readyz
+    backend: str
+    # Whether this worker is currently receiving other workers' messages
+    connected: bool
+
+    def __init__(self):
+        self.connected = False
+        # Messages from this worker come back to it; the origin skips them
+        self.origin = uuid.uuid4().hex
+        self._key_handlers: List[KeysHandler] = []
+        self._flush_handlers: List[FlushHandler] = []
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._consumer: Optional[asyncio.Task] = None
+        self.received = 0
+        self.flushes = 0
+
+    def subscribe(self, on_keys: Optional[KeysHandler] = None, on_flush: Optional[FlushHandler] = None):
+        if on_keys is not None:
+            self._key_handlers.append(on_keys)
+        if on_flush is not None:
+            self._flush_handlers.append(on_flush)
+
+    def _payloads(self, keys: List[str]) -> List[str]:
+        return [
+            json.dumps({"origin": self.origin, "keys": keys[start:start + KEYS_PER_MESSAGE]})
+            for start in range(0, len(keys), KEYS_PER_MESSAGE)
+        ]
+
+    def _receive(self, payload: str):
+        # Handlers run in order on the consumer task, never on the listener
+        self._queue.put_nowait(payload)
+
+    async def _consume(self):
+        while True:
+            payload = await self._queue.get()
+            try:
+                message = json.loads(payload)
+                if message.get("origin") == self.origin:
+                    continue
+                self.received += 1
+                for handler in self._key_handlers:
+                    await handler(message["keys"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error applying cache invalidation: {str(e)}")
+
+    async def _flush(self):
+        """Drop everything cached, after a gap in which messages may have been missed"""
+        self.flushes += 1
+        logger.warning("Cache invalidations may have been missed; flushing local caches")
+        for handler in self._flush_handlers:
+            try:
+                await handler()
+            except Exception as e:
+                logger.error(f"Error flushing local caches: {str(e)}")
+
+    @abc.abstractmethod
+    async def publish(self, database, keys: List[str]):
+        """Send `keys` to the other workers (call after the write has committed)"""
+
+    async def start(self):
+        if self._consumer is None:
+            self._consumer = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        if self._consumer is not None:
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+            self._consumer = None
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "connected": self.connected, "received": self.received, "flushes": self.flushes}
+
+
+class MemoryHub:
+    """The buses of one process, standing in for a Postgres channel"""
+
+    def __init__(self):
+        self.buses: List["MemoryInvalidationBus"] = []
+
+
+# One hub per database URL, so apps on different databases stay apart
+_memory_hubs: Dict[str, MemoryHub] = {}
+
+
+def memory_hub(name: str = "") -> MemoryHub:
+    return _memory_hubs.setdefault(name, MemoryHub())
+
+
+class MemoryInvalidationBus(InvalidationBus):
+    backend = "memory"
+
+    def __init__(self, hub: Optional[MemoryHub] = None):
+        super().__init__()
+        self.hub = hub or memory_hub()
+
+    async def publish(self, database, keys: List[str]):
+        for payload in self._payloads(keys):
+            for bus in self.hub.buses:
+                bus._receive(payload)
+
+    async def start(self):
+        await super().start()
+        self.reconnect()
+
+    async def stop(self):
+        self.disconnect()
+        await super().stop()
+
+    # Let tests simulate a dropped listener
+    def disconnect(self):
+        if self in self.hub.buses:
+            self.hub.buses.remove(self)
+        self.connected = False
+
+    def reconnect(self, flush: bool = False):
+        if self not in self.hub.buses:
+            self.hub.buses.append(self)
+        self.connected = True
+        if flush:
+            asyncio.create_task(self._flush())
+
+
+def _asyncpg_dsn(url: str) -> str:
+    """A `databases` URL as an asyncpg DSN (no driver suffix or pool options)"""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k not in ("min_size", "max_size")]
+    return urlunsplit(("postgresql", parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+class PostgresInvalidationBus(InvalidationBus):
+    backend = "postgres"
+
+    def __init__(self, database_url: str):
+        super().__init__()
+        self.dsn = _asyncpg_dsn(database_url)
+        self._listener: Optional[asyncio.Task] = None
+        self._listening = asyncio.Event()
+        # True once notifications may have been missed
+        self._gap = False
+
+    async def publish(self, database, keys: List[str]):
+        import sqlalchemy
+        for payload in self._payloads(keys):
+            await database.fetch_val(sqlalchemy.select(sqlalchemy.func.pg_notify(CHANNEL, payload)))
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._receive(payload)
+
+    async def start(self):
+        await super().start()
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+            # Listen before the caches are first loaded, so no change slips between
+            try:
+                await asyncio.wait_for(self._listening.wait(), START_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.error("Cache invalidation listener not connected yet; will flush once it is")
+                self._gap = True
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await super().stop()
+
+    async def _listen(self):
+        import asyncpg
+
+        delay = RECONNECT_DELAY
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                await connection.add_listener(CHANNEL, self._on_notify)
+                self.connected = True
+                self._listening.set()
+                delay = RECONNECT_DELAY
+                if self._gap:
+                    self._gap = False
+                    await self._flush()
+                # A dead connection only shows up when used
+                while True:
+                    await asyncio.sleep(KEEPALIVE_INTERVAL)
+                    await asyncio.wait_for(connection.fetchval("SELECT 1"), KEEPALIVE_INTERVAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener disconnected: {str(e)}")
+            finally:
+                self.connected = False
+                self._gap = True
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+
+def invalidation_bus_for(database_url: Optional[str]) -> InvalidationBus:
+    """LISTEN/NOTIFY on Postgres, otherwise the in-process bus"""
+    if database_url and database_url.split(":", 1)[0].split("+", 1)[0] in ("postgres", "postgresql"):
+        return PostgresInvalidationBus(database_url)
+    return MemoryInvalidationBus(memory_hub(database_url or ""))
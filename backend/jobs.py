@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+# Done jobs are kept this long (for the queue stats and debugging), then deleted;
+# failed ones are kept until someone looks at them
+JOB_RETENTION = timedelta(days=float(os.environ.get("JOB_RETENTION_DAYS", "7")))
+PURGE_INTERVAL = 3600.0
+
+# Handlers receive the runner's Database and the job payload
+JobHandler = Callable[[Any, dict], Awaitable[None]]
+
+# Registry of job kinds to handlers, filled in with @job_handler
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str):
+    """Register an async handler for a job kind"""
+    def decorator(func: JobHandler) -> JobHandler:
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+class JobRunner:
+    """
+    In-process worker for the persistent `jobs` table.
+
+    Request handlers call `enqueue()` and return immediately; the runner polls
+    for due jobs, runs at most `concurrency` of them at a time and retries
+    failures with exponential backoff. Several workers can share one table
+    because jobs are claimed atomically.
+    """
+
+    def __init__(
+        self,
+        db,
+        concurrency: int = 4,
+        poll_interval: float = 1.0,
+        lease: timedelta = timedelta(minutes=5),
+        backoff_base: float = 2.0,
+        backoff_max: float = 600.0,
+        retention: timedelta = JOB_RETENTION,
+    ):
+        self.db = db
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retention = retention
+        self._last_purge = 0.0
+        self._wakeup = asyncio.Event()
+        self._tasks: Set[asyncio.Task] = set()
+        self._loop_task: Optional[asyncio.Task] = None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def enqueue(self, kind: str, payload: dict, max_attempts: int = 5) -> Job:
+        """Persist a job and nudge the runner so it starts without waiting a poll"""
+        if kind not in _handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job = await self.db.enqueue_job(kind, payload, max_attempts=max_attempts)
+        self._wakeup.set()
+        return job
+
+    def start(self):
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+            logger.info(f"Job runner started (concurrency={self.concurrency})")
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop polling and give running jobs a chance to finish"""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        if self._tasks:
+            # Unfinished jobs keep their lease and are retried after it expires
+            await asyncio.wait(self._tasks, timeout=timeout)
+        logger.info("Job runner stopped")
+
+    async def _run(self):
+        while True:
+            try:
+                free = self.concurrency - len(self._tasks)
+                if free > 0:
+                    for job in await self.db.claim_due_jobs(free, self.lease):
+                        task = asyncio.create_task(self._execute(job))
+                        self._tasks.add(task)
+                        task.add_done_callback(self._tasks.discard)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error polling job queue: {str(e)}")
+            await self._purge_if_due()
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, job: Job):
+        handler = _handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind: {job.kind}")
+            await handler(self.db, job.payload)
+        except Exception as e:
+            retry_at = None
+            if job.attempts < job.max_attempts:
+                retry_at = datetime.utcnow() + timedelta(seconds=self._backoff(job.attempts))
+            logger.error(f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}: {str(e)}")
+            try:
+                await self.db.fail_job(job, str(e), retry_at)
+            except Exception as db_error:
+                logger.error(f"Error recording failure of job {job.id}: {str(db_error)}")
+        else:
+            try:
+                await self.db.complete_job(job.id)
+            except Exception as db_error:
+                logger.error(f"Error completing job {job.id}: {str(db_error)}")
+        finally:
+            # A slot freed up, so check for more work straight away
+            self._wakeup.set()
+
+    async def _purge_if_due(self):
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            await self.db.purge_finished_jobs(datetime.utcnow() - self.retention)
+        except Exception as e:
+            logger.error(f"Error purging finished jobs: {str(e)}")
+
+    def _backoff(self, attempts: int) -> float:
+        """Exponential backoff with jitter, capped at backoff_max"""
+        delay = min(self.backoff_max, self.backoff_base ** attempts)
+        return random.uniform(delay / 2, delay)
+
+
+# ============================================================================
+# JOB HANDLERS
+# ============================================================================
+
+def contact_webhook_url() -> Optional[str]:
+    """Where new contact submissions are POSTed; None turns notifications off"""
+    # Read when used rather than at import, so backend/.env has been loaded
+    return os.environ.get("CONTACT_WEBHOOK_URL") or None
+
+
+@job_handler("contact.notify")
+async def notify_contact_submission(db, payload: dict):
+    """POST a new contact submission to the configured webhook (Slack, Zapier, a mail relay, ...)"""
+    import requests
+
+    url = contact_webhook_url()
+    if url is None:
+        logger.info(f"Contact webhook not configured, skipping notification for {payload['submission_id']}")
+        return
+    submission = await db.get_contact_submission(payload["submission_id"])
+    if submission is None:
+        logger.info(f"Contact submission {payload['submission_id']} is gone, nothing to notify")
+        return
+
+    body = {
+        "text": f"New contact submission from {submission.name} <{submission.email}> ({submission.reason.value})",
+        "submission": submission.dict(),
+    }
+    # Raising makes the runner retry with backoff
+    response = await asyncio.to_thread(
+        requests.post, url, data=json.dumps(body, default=str),
+        headers={"Content-Type": "application/json"}, timeout=10,
+    )
+    response.raise_for_status()
+    logger.info(f"Sent notification for contact submission {submission.id}")
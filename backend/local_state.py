@@ -0,0 +1,224 @@
+"""
+Local copies that keep the site answering while the database is down.
+
+ReflectionSnapshot holds the published reflections (in memory, mirrored to
+a JSON file so a restart during an outage still has them) and answers
+public reads when a query fails. ContactSpool appends contact submissions
+that could not be stored to a JSON-lines file and replays them once the
+database is back.
+"""
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from breaker import CircuitState
+from models import ContactSubmission, Reflection
+
+logger = logging.getLogger(__name__)
+
+LOCAL_STATE_DIR = Path(os.environ.get("LOCAL_STATE_DIR", Path(__file__).parent / "local_state"))
+SPOOL_REPLAY_INTERVAL = 10.0
+
+# Returned by snapshot lookups that cannot answer (so None can mean "not found")
+UNAVAILABLE = object()
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(path.suffix + ".tmp")
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+
+
+@contextlib.contextmanager
+def _file_lock(path: Path, blocking: bool = True):
+    """Exclusive flock on `path` across worker processes; yields False if busy and not blocking"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class ReflectionSnapshot:
+    """Last known published reflections, for serving reads during an outage"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or LOCAL_STATE_DIR / "reflections_snapshot.json"
+        self._reflections: Dict[str, Reflection] = {}
+        self.loaded = False
+        self.served = 0
+
+    def load(self):
+        """Read the snapshot left by a previous run, if any"""
+        try:
+            data = json.loads(self.path.read_bytes())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading reflection snapshot: {str(e)}")
+            return
+        self._reflections = {item["id"]: Reflection(**item) for item in data}
+        self.loaded = True
+
+    def replace(self, reflections: List[Reflection]):
+        self._reflections = {reflection.id: reflection for reflection in reflections if reflection.published}
+        self.loaded = True
+
+    def upsert(self, reflection: Reflection):
+        if reflection.published:
+            self._reflections[reflection.id] = reflection
+        else:
+            self._reflections.pop(reflection.id, None)
+
+    def remove(self, reflection_id: str):
+        self._reflections.pop(reflection_id, None)
+
+    async def save(self):
+        """Write the snapshot to disk (off the event loop)"""
+        data = json.dumps([reflection.dict() for reflection in self._reflections.values()], default=str).encode()
+        try:
+            await asyncio.to_thread(_write_atomic, self.path, data)
+        except OSError as e:
+            logger.error(f"Error saving reflection snapshot: {str(e)}")
+
+    # Fallbacks mirroring the Database read methods
+    def get_reflections(self, category: Optional[str] = None, published_only: bool = True,
+                        tag: Optional[str] = None):
+        if not self.loaded or not published_only:
+            return UNAVAILABLE
+        reflections = [
+            reflection for reflection in self._reflections.values()
+            if (category is None or reflection.category == category) and (tag is None or tag in reflection.tags)
+        ]
+        return sorted(reflections, key=lambda reflection: reflection.date, reverse=True)
+
+    def get_reflection_by_id(self, reflection_id: str):
+        if not self.loaded:
+            return UNAVAILABLE
+        return self._reflections.get(reflection_id)
+
+    def get_reflections_by_ids(self, reflection_ids: List[str], published_only: bool = True):
+        if not self.loaded or not published_only:
+            return UNAVAILABLE
+        return [self._reflections[rid] for rid in reflection_ids if rid in self._reflections]
+
+
+class ContactSpool:
+    """
+    Contact submissions waiting for the database, one JSON object per line.
+    Every worker appends to the same file; one worker at a time replays it.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or LOCAL_STATE_DIR / "contact_spool.jsonl"
+        self._task: Optional[asyncio.Task] = None
+        self.spooled = 0
+        self.replayed = 0
+
+    @property
+    def _replaying_path(self) -> Path:
+        return self.path.with_suffix(".replaying")
+
+    @property
+    def _append_lock_path(self) -> Path:
+        # Held briefly, so a line is never written to a file mid-rename
+        return self.path.with_suffix(".lock")
+
+    @property
+    def _replay_lock_path(self) -> Path:
+        # Held for a whole replay, so workers do not store the same lines twice
+        return self.path.with_suffix(".replay.lock")
+
+    def _write_lines(self, lines: List[str]):
+        with _file_lock(self._append_lock_path):
+            with open(self.path, "a", encoding="utf-8") as spool:
+                spool.writelines(line + "\n" for line in lines)
+                spool.flush()
+                os.fsync(spool.fileno())
+
+    def append(self, submission: ContactSubmission, notify: bool):
+        line = json.dumps({"submission": submission.dict(), "notify": notify}, default=str)
+        self._write_lines([line])
+        self.spooled += 1
+
+    def pending(self) -> bool:
+        return self.path.exists() or self._replaying_path.exists()
+
+    async def replay(self, db, job_runner) -> int:
+        """Store spooled submissions; anything that fails stays spooled"""
+        with _file_lock(self._replay_lock_path, blocking=False) as locked:
+            if not locked:
+                # Another worker is replaying
+                return 0
+            return await self._replay(db, job_runner)
+
+    async def _replay(self, db, job_runner) -> int:
+        if not self._replaying_path.exists():
+            with _file_lock(self._append_lock_path):
+                if not self.path.exists():
+                    return 0
+                # New submissions keep going to a fresh spool file meanwhile
+                os.replace(self.path, self._replaying_path)
+
+        entries = self._replaying_path.read_text(encoding="utf-8").splitlines()
+        stored = 0
+        for index, line in enumerate(entries):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.error("Skipping unreadable line in the contact spool")
+                continue
+            submission = ContactSubmission(**entry["submission"])
+            try:
+                # Already stored means an earlier replay got this far and enqueued it
+                if await db.restore_contact_submission(submission) and entry["notify"]:
+                    await job_runner.enqueue("contact.notify", {
+                        "submission_id": submission.id,
+                        "reason": submission.reason.value,
+                    })
+            except Exception as e:
+                logger.warning(f"Contact spool replay stopped, database still unavailable: {str(e)}")
+                self._write_lines(entries[index:])
+                break
+            stored += 1
+        self._replaying_path.unlink(missing_ok=True)
+        self.replayed += stored
+        if stored:
+            logger.info(f"Replayed {stored} spooled contact submissions")
+        return stored
+
+    def start(self, db, job_runner, interval: float = SPOOL_REPLAY_INTERVAL):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db, job_runner, interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, db, job_runner, interval: float):
+        while True:
+            if self.pending() and db.breaker.state != CircuitState.OPEN:
+                try:
+                    await self.replay(db, job_runner)
+                except Exception as e:
+                    logger.error(f"Error replaying contact spool: {str(e)}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,168 @@
+"""
+Structured logging that stays off the request path.
+
+Handlers on the root logger are replaced with a QueueHandler, so a log
+call only builds a LogRecord and appends it to a queue. A listener thread
+does the expensive part: formatting the message, redacting email
+addresses and IPs, serialising JSON and writing to stdout. Chatty
+INFO-level loggers on hot read paths can be sampled down per logger.
+"""
+import atexit
+import itertools
+import json
+import logging
+import queue
+import re
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# INFO and below from these loggers is kept 1-in-N; warnings always pass
+DEFAULT_SAMPLE_RATES: Dict[str, float] = {
+    "database.reads": 0.01,
+    "uvicorn.access": 0.1,
+}
+
+EMAIL_RE = re.compile(r"([A-Za-z0-9._%+-])[A-Za-z0-9._%+-]*@([A-Za-z0-9.-]+\.[A-Za-z]{2,})")
+IPV4_RE = re.compile(r"\b(\d{1,3}\.\d{1,3})\.\d{1,3}\.\d{1,3}\b")
+
+# LogRecord attributes that are not `extra=` fields (color_message is
+# uvicorn's and databases' ANSI copy of the message)
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "color_message",
+}
+
+_listener: Optional[QueueListener] = None
+
+
+def redact(text: str) -> str:
+    """Mask email addresses (keeping the domain) and the host half of IPv4 addresses"""
+    if "@" in text:
+        text = EMAIL_RE.sub(r"\1***@\2", text)
+    if "." in text:
+        text = IPV4_RE.sub(r"\1.x.x", text)
+    return text
+
+
+class SamplingFilter(logging.Filter):
+    """Keep every Nth INFO-or-lower record from the configured loggers"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.every = {name: max(1, round(1 / rate)) for name, rate in rates.items() if 0 < rate < 1}
+        self.dropped = {name for name, rate in rates.items() if rate <= 0}
+        self._counters = {name: itertools.count() for name in rates}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        name = record.name
+        if name in self.dropped:
+            return False
+        every = self.every.get(name)
+        if every is None:
+            return True
+        # itertools.count is atomic under the GIL, so no lock is needed
+        return next(self._counters[name]) % every == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Enqueue records without formatting them.
+
+    The stock `prepare` renders the message in the calling thread; here the
+    record goes onto the queue as is and the listener formats it later.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra=` fields and PII redacted"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = redact(value) if isinstance(value, str) else value
+        if record.exc_info:
+            entry["exception"] = redact(self.formatException(record.exc_info))
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RedactingFormatter(logging.Formatter):
+    """The plain text format, with PII redacted"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parse "logger=rate,logger=rate" (e.g. LOG_SAMPLE_RATES="database.reads=0.05")"""
+    rates = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def configure_logging(
+    level: str = "INFO",
+    json_format: bool = True,
+    sample_rates: Optional[Dict[str, float]] = None,
+    stream=None,
+) -> QueueListener:
+    """
+    Route all logging through a queue to a background writer thread.
+
+    Safe to call more than once (e.g. one app per test); the first call's
+    configuration is kept. The listener is stopped, flushing what is
+    queued, at interpreter exit.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    if json_format:
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(RedactingFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(DEFAULT_SAMPLE_RATES if sample_rates is None else sample_rates))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    # uvicorn installs its own synchronous handlers; send its records
+    # through the queue as well
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,81 @@
+"""
+Markdown rendering for reflection bodies.
+
+Bodies are rendered once, when a reflection is written, and the HTML is
+stored alongside a hash of the source it came from. Raw HTML in the
+source is escaped rather than passed through, and the parser drops
+unsafe link schemes (javascript:, vbscript:, non-image data:), so the
+output can be inserted into the page as is.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Part of every content hash; bump it when rendering options change so
+# stored HTML can be told apart from what the current renderer produces
+RENDERER_VERSION = "1"
+RENDER_CACHE_SIZE = int(os.environ.get("MARKDOWN_RENDER_CACHE_SIZE", "256"))
+
+_parser = None
+
+
+def _markdown():
+    # markdown-it builds its rule chains on construction, so build it once
+    # and only when the first body is rendered
+    global _parser
+    if _parser is None:
+        from markdown_it import MarkdownIt
+        # breaks=True keeps single line breaks from plain-text posts (poems,
+        # lists typed without Markdown) as they were written
+        _parser = MarkdownIt("commonmark", {"html": False, "breaks": True}).enable(
+            ["table", "strikethrough"]
+        )
+    return _parser
+
+
+def content_hash(content: str) -> str:
+    """Hash of a body and the renderer version, used as the render cache key"""
+    return hashlib.blake2b(f"{RENDERER_VERSION}\0{content}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+class RenderCache:
+    """LRU of rendered HTML keyed by content hash"""
+
+    def __init__(self, max_entries: int = RENDER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key: str, html: str):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+render_cache = RenderCache()
+
+
+def render_markdown(content: str) -> Tuple[str, str]:
+    """Render a body to sanitised HTML, returning (content hash, html)"""
+    key = content_hash(content)
+    html = render_cache.get(key)
+    if html is None:
+        html = _markdown().render(content)
+        render_cache.put(key, html)
+    return key, html
@@ -0,0 +1,236 @@
+"""
+Artwork image storage and responsive derivatives.
+
+Originals are stored content-addressed (by SHA-256) under MEDIA_ROOT, so
+re-uploading the same file is free and every URL is immutable. Resized
+WebP/AVIF derivatives are generated once, in a process pool so the
+CPU-heavy encoding never runs on the event loop.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+MEDIA_ROOT = Path(os.environ.get("MEDIA_ROOT", Path(__file__).parent / "media"))
+MEDIA_WORKERS = int(os.environ.get("MEDIA_WORKERS", str(min(2, os.cpu_count() or 1))))
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_IMAGE_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+DERIVATIVE_WIDTHS = (320, 640, 960, 1280, 1920)
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+# Refuse decompression bombs well before they exhaust memory
+MAX_IMAGE_PIXELS = 80_000_000
+
+ACCEPTED_TYPES = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp", "image/gif": "gif"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CONTENT_TYPES = {
+    "webp": "image/webp",
+    "avif": "image/avif",
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+}
+
+IMAGE_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+VARIANT_RE = re.compile(r"^(\d+)\.(webp|avif)$")
+CHUNK_SIZE = 256 * 1024
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=MEDIA_WORKERS)
+    return _executor
+
+
+def shutdown_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def original_path(image_id: str, extension: str) -> Path:
+    return MEDIA_ROOT / "originals" / image_id[:2] / f"{image_id}.{extension}"
+
+
+def variant_path(image_id: str, width: int, fmt: str) -> Path:
+    return MEDIA_ROOT / "derivatives" / image_id[:2] / image_id / f"{width}.{fmt}"
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write via a temp file and rename, so readers never see partial files"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + f".{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def process_image(data: bytes, image_id: str, extension: str) -> dict:
+    """
+    Store an original and encode its derivatives.
+
+    Runs in a worker process, so it only takes and returns plain data.
+    """
+    from PIL import Image, ImageOps, features
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+    with Image.open(io.BytesIO(data)) as source:
+        # Pillow only refuses images over twice its limit (and merely warns
+        # below that), so check the header's size before decoding anything
+        if source.width * source.height > MAX_IMAGE_PIXELS:
+            raise ValueError(f"Image is too large: {source.width}x{source.height}")
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ("RGB", "RGBA"):
+            # LA and PA carry an alpha band; palette and grey images may use a transparent colour
+            keep_alpha = "A" in source.getbands() or "transparency" in source.info
+            source = source.convert("RGBA" if keep_alpha else "RGB")
+        width, height = source.size
+
+        formats = ["webp"] + (["avif"] if features.check("avif") else [])
+        # Always provide at least one derivative, even for small originals
+        widths = [w for w in DERIVATIVE_WIDTHS if w < width] or [width]
+        if width <= DERIVATIVE_WIDTHS[-1] and width not in widths:
+            widths.append(width)
+
+        variants = []
+        for target_width in widths:
+            target_height = max(1, round(height * target_width / width))
+            resized = source if target_width == width else source.resize(
+                (target_width, target_height), Image.LANCZOS
+            )
+            for fmt in formats:
+                out = variant_path(image_id, target_width, fmt)
+                if not out.exists():
+                    buffer = io.BytesIO()
+                    if fmt == "webp":
+                        resized.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+                    else:
+                        resized.save(buffer, "AVIF", quality=AVIF_QUALITY)
+                    _write_atomic(out, buffer.getvalue())
+                variants.append({
+                    "width": target_width,
+                    "height": target_height,
+                    "format": fmt,
+                    "bytes": out.stat().st_size,
+                })
+
+    # Only keep the original once it has decoded cleanly
+    path = original_path(image_id, extension)
+    if not path.exists():
+        _write_atomic(path, data)
+
+    return {"width": width, "height": height, "variants": variants}
+
+
+async def ingest_image(data: bytes, content_type: str) -> Tuple[str, str, dict]:
+    """Hash, store and derive an uploaded image, returning (id, extension, info)"""
+    extension = ACCEPTED_TYPES.get(content_type)
+    if extension is None:
+        raise ValueError(f"Unsupported image type: {content_type}")
+    image_id = hashlib.sha256(data).hexdigest()
+    loop = asyncio.get_running_loop()
+    info = await loop.run_in_executor(_pool(), process_image, data, image_id, extension)
+    return image_id, extension, info
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range into an inclusive (start, end), or None if unsatisfiable"""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(0, size - int(end_text))
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+class MediaFileResponse(Response):
+    """
+    Serve an immutable media file with single-range support.
+
+    Uses the ASGI zero-copy send extension (sendfile) when the server offers
+    it; otherwise streams the file from a worker thread in chunks.
+    """
+
+    def __init__(self, path: Path, content_type: str, etag: str):
+        self.path = path
+        self.content_type = content_type
+        self.etag = f'"{etag}"'
+        self.status_code = 200
+        self.background = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        request_headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        size = (await anyio.to_thread.run_sync(os.stat, self.path)).st_size
+        headers = [
+            (b"content-type", self.content_type.encode()),
+            (b"cache-control", IMMUTABLE_CACHE_CONTROL.encode()),
+            (b"etag", self.etag.encode()),
+            (b"accept-ranges", b"bytes"),
+        ]
+
+        if request_headers.get("if-none-match") == self.etag:
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        status, start, end = 200, 0, size - 1
+        range_header = request_headers.get("range")
+        if range_header and request_headers.get("if-range", self.etag) == self.etag:
+            byte_range = _parse_range(range_header, size)
+            if byte_range is None:
+                headers.append((b"content-range", f"bytes */{size}".encode()))
+                await send({"type": "http.response.start", "status": 416, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            status, (start, end) = 206, byte_range
+            headers.append((b"content-range", f"bytes {start}-{end}/{size}".encode()))
+
+        count = end - start + 1
+        headers.append((b"content-length", str(count).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": start,
+                    "count": count,
+                })
+            return
+
+        async with await anyio.open_file(self.path, "rb") as file:
+            await file.seek(start)
+            remaining = count
+            while remaining > 0:
+                chunk = await file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
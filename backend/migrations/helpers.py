@@ -0,0 +1,77 @@
+"""Shared helpers for migrations that must not lock busy tables"""
+import logging
+from typing import Callable, Optional
+
+import sqlalchemy as sa
+from alembic import op
+
+logger = logging.getLogger("alembic.helpers")
+
+
+def has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def has_column(table: str, column: str) -> bool:
+    return any(c["name"] == column for c in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def has_index(table: str, name: str) -> bool:
+    return any(i["name"] == name for i in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def create_index_online(name: str, table: str, columns: list, **kwargs):
+    """
+    Create an index without blocking writes.
+
+    On Postgres this is CREATE INDEX CONCURRENTLY, which cannot run inside a
+    transaction, so it is issued from an autocommit block. Other backends
+    get a plain CREATE INDEX.
+    """
+    if has_index(table, name):
+        return
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, postgresql_concurrently=True, **kwargs)
+    else:
+        op.create_index(name, table, columns, **kwargs)
+
+
+def drop_index_online(name: str, table: str):
+    if not has_index(table, name):
+        return
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def batched_backfill(
+    select_batch: Callable[[Optional[str]], sa.sql.Select],
+    process_row: Callable[[sa.engine.Connection, sa.engine.Row], bool],
+    key: str = "id",
+):
+    """
+    Walk a table by primary key in small batches outside the migration
+    transaction.
+
+    `select_batch(last_key)` returns the query for the next batch after
+    `last_key` (None for the first), ordered by `key` and limited. Every
+    statement autocommits, so row locks are held only briefly and a failed
+    run resumes from where it stopped when re-run.
+    """
+    last_key = None
+    processed = 0
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            rows = bind.execute(select_batch(last_key)).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                if process_row(bind, row):
+                    processed += 1
+            last_key = getattr(rows[-1], key)
+    logger.info(f"Backfilled {processed} rows")
+    return processed
@@ -0,0 +1,101 @@
+"""baseline schema
+
+Creates the tables previously created by metadata.create_all at boot.
+Every step is guarded so existing databases can be upgraded in place.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_column, has_table
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table("reflections"):
+        op.create_table(
+            "reflections",
+            sa.Column("id", sa.String, primary_key=True),
+            sa.Column("title", sa.String(200), nullable=False),
+            sa.Column("excerpt", sa.String(500), nullable=False),
+            sa.Column("content", sa.Text, nullable=False),
+            sa.Column("content_compressed", sa.LargeBinary, nullable=True),
+            sa.Column("category", sa.String(50), nullable=False),
+            sa.Column("tags", sa.JSON, nullable=False),
+            sa.Column("date", sa.DateTime, nullable=False),
+            sa.Column("read_time", sa.String(50), nullable=False),
+            sa.Column("published", sa.Boolean, nullable=False),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+            sa.Column("updated_at", sa.DateTime, nullable=False),
+        )
+    elif not has_column("reflections", "content_compressed"):
+        op.add_column("reflections", sa.Column("content_compressed", sa.LargeBinary, nullable=True))
+
+    if not has_table("contacts"):
+        op.create_table(
+            "contacts",
+            sa.Column("id", sa.String, primary_key=True),
+            sa.Column("name", sa.String(100), nullable=False),
+            sa.Column("email", sa.String(255), nullable=False),
+            sa.Column("reason", sa.String(50), nullable=False),
+            sa.Column("message", sa.Text, nullable=False),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("submitted_at", sa.DateTime, nullable=False),
+        )
+
+    if not has_table("admin_sessions"):
+        op.create_table(
+            "admin_sessions",
+            sa.Column("id", sa.String, primary_key=True),
+            sa.Column("session_id", sa.String, nullable=False, unique=True),
+            sa.Column("expires_at", sa.DateTime, nullable=False),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+        )
+
+    if not has_table("reflection_related"):
+        op.create_table(
+            "reflection_related",
+            sa.Column("reflection_id", sa.String, primary_key=True),
+            sa.Column("rank", sa.Integer, primary_key=True),
+            sa.Column("related_id", sa.String, nullable=False),
+            sa.Column("score", sa.Float, nullable=False),
+        )
+
+    if not has_table("reflection_stats"):
+        op.create_table(
+            "reflection_stats",
+            sa.Column("reflection_id", sa.String, primary_key=True),
+            sa.Column("bucket_start", sa.DateTime, primary_key=True),
+            sa.Column("views", sa.Integer, nullable=False),
+            sa.Column("visitors_hll", sa.LargeBinary, nullable=True),
+        )
+
+    if not has_table("jobs"):
+        op.create_table(
+            "jobs",
+            sa.Column("id", sa.String, primary_key=True),
+            sa.Column("kind", sa.String(100), nullable=False),
+            sa.Column("payload", sa.JSON, nullable=False),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("attempts", sa.Integer, nullable=False),
+            sa.Column("max_attempts", sa.Integer, nullable=False),
+            sa.Column("run_after", sa.DateTime, nullable=False),
+            sa.Column("locked_until", sa.DateTime, nullable=True),
+            sa.Column("last_error", sa.Text, nullable=True),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+            sa.Column("updated_at", sa.DateTime, nullable=False),
+        )
+        op.create_index("ix_jobs_status", "jobs", ["status"])
+        op.create_index("ix_jobs_run_after", "jobs", ["run_after"])
+
+
+def downgrade():
+    for table in ("jobs", "reflection_stats", "reflection_related", "admin_sessions", "contacts", "reflections"):
+        op.drop_table(table)
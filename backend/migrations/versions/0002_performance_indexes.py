@@ -0,0 +1,36 @@
+"""performance indexes
+
+Indexes for the hot read paths: the public reflections list (published,
+newest first, optionally by category), the contacts inbox, session
+expiry cleanup and reverse related-reflection lookups. Built with
+CREATE INDEX CONCURRENTLY on Postgres so writes are not blocked.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from migrations.helpers import create_index_online, drop_index_online
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_reflections_published_date", "reflections", ["published", "date"]),
+    ("ix_reflections_category_published_date", "reflections", ["category", "published", "date"]),
+    ("ix_contacts_submitted_at", "contacts", ["submitted_at"]),
+    ("ix_admin_sessions_expires_at", "admin_sessions", ["expires_at"]),
+    ("ix_reflection_related_related_id", "reflection_related", ["related_id"]),
+    ("ix_reflection_stats_bucket_start", "reflection_stats", ["bucket_start"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        create_index_online(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        drop_index_online(name, table)
@@ -0,0 +1,70 @@
+"""compress existing reflection content
+
+Backfills content_compressed for rows written before compression was
+enabled, in small autocommitted batches.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+import sqlalchemy as sa
+
+from content_codec import compress_content, decompress_content
+from migrations.helpers import batched_backfill
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 200
+
+reflections = sa.table(
+    "reflections",
+    sa.column("id", sa.String),
+    sa.column("content", sa.Text),
+    sa.column("content_compressed", sa.LargeBinary),
+)
+
+
+def upgrade():
+    def select_batch(last_id):
+        query = sa.select(reflections.c.id, reflections.c.content).where(
+            reflections.c.content_compressed.is_(None)
+        )
+        if last_id is not None:
+            query = query.where(reflections.c.id > last_id)
+        return query.order_by(reflections.c.id).limit(BATCH_SIZE)
+
+    def compress_row(bind, row):
+        blob = compress_content(row.content)
+        if blob is None:
+            return False
+        bind.execute(
+            reflections.update()
+            .where(reflections.c.id == row.id, reflections.c.content_compressed.is_(None))
+            .values(content="", content_compressed=blob)
+        )
+        return True
+
+    batched_backfill(select_batch, compress_row)
+
+
+def downgrade():
+    def select_batch(last_id):
+        query = sa.select(reflections.c.id, reflections.c.content_compressed).where(
+            reflections.c.content_compressed.isnot(None)
+        )
+        if last_id is not None:
+            query = query.where(reflections.c.id > last_id)
+        return query.order_by(reflections.c.id).limit(BATCH_SIZE)
+
+    def decompress_row(bind, row):
+        bind.execute(
+            reflections.update()
+            .where(reflections.c.id == row.id)
+            .values(content=decompress_content(row.content_compressed), content_compressed=None)
+        )
+        return True
+
+    batched_backfill(select_batch, decompress_row)
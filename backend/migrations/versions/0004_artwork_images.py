@@ -0,0 +1,42 @@
+"""artwork images
+
+Adds the images table for uploaded artwork and a reflections.image_id
+column pointing at it.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_column, has_table
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table("images"):
+        op.create_table(
+            "images",
+            sa.Column("id", sa.String(64), primary_key=True),
+            sa.Column("content_type", sa.String(50), nullable=False),
+            sa.Column("extension", sa.String(10), nullable=False),
+            sa.Column("width", sa.Integer, nullable=False),
+            sa.Column("height", sa.Integer, nullable=False),
+            sa.Column("bytes", sa.Integer, nullable=False),
+            sa.Column("variants", sa.JSON, nullable=False),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+        )
+    if not has_column("reflections", "image_id"):
+        # Nullable with no default: a metadata-only change on Postgres
+        op.add_column("reflections", sa.Column("image_id", sa.String(64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("reflections") as batch:
+        batch.drop_column("image_id")
+    op.drop_table("images")
@@ -0,0 +1,64 @@
+"""rendered content html
+
+Adds reflections.content_html and content_html_hash, and renders the
+Markdown for existing rows in small autocommitted batches.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from content_codec import decompress_content
+from markdown_render import render_markdown
+from migrations.helpers import batched_backfill, has_column
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 200
+
+reflections = sa.table(
+    "reflections",
+    sa.column("id", sa.String),
+    sa.column("content", sa.Text),
+    sa.column("content_compressed", sa.LargeBinary),
+    sa.column("content_html", sa.Text),
+    sa.column("content_html_hash", sa.String),
+)
+
+
+def upgrade():
+    if not has_column("reflections", "content_html"):
+        op.add_column("reflections", sa.Column("content_html", sa.Text, nullable=True))
+    if not has_column("reflections", "content_html_hash"):
+        op.add_column("reflections", sa.Column("content_html_hash", sa.String(64), nullable=True))
+
+    def select_batch(last_id):
+        query = sa.select(
+            reflections.c.id, reflections.c.content, reflections.c.content_compressed
+        ).where(reflections.c.content_html.is_(None))
+        if last_id is not None:
+            query = query.where(reflections.c.id > last_id)
+        return query.order_by(reflections.c.id).limit(BATCH_SIZE)
+
+    def render_row(bind, row):
+        content = decompress_content(row.content_compressed) if row.content_compressed is not None else row.content
+        key, html = render_markdown(content)
+        bind.execute(
+            reflections.update()
+            .where(reflections.c.id == row.id, reflections.c.content_html.is_(None))
+            .values(content_html=html, content_html_hash=key)
+        )
+        return True
+
+    batched_backfill(select_batch, render_row)
+
+
+def downgrade():
+    with op.batch_alter_table("reflections") as batch:
+        batch.drop_column("content_html_hash")
+        batch.drop_column("content_html")
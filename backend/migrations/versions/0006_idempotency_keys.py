@@ -0,0 +1,38 @@
+"""idempotency keys
+
+Adds the idempotency_keys table backing Idempotency-Key support on
+write endpoints.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_table
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not has_table("idempotency_keys"):
+        op.create_table(
+            "idempotency_keys",
+            sa.Column("key", sa.String(64), primary_key=True),
+            sa.Column("request_hash", sa.String(64), nullable=False),
+            sa.Column("status_code", sa.Integer, nullable=True),
+            sa.Column("content_type", sa.String(100), nullable=True),
+            sa.Column("body", sa.LargeBinary, nullable=True),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+            sa.Column("expires_at", sa.DateTime, nullable=False),
+        )
+        op.create_index("ix_idempotency_keys_expires_at", "idempotency_keys", ["expires_at"])
+
+
+def downgrade():
+    op.drop_index("ix_idempotency_keys_expires_at", table_name="idempotency_keys")
+    op.drop_table("idempotency_keys")
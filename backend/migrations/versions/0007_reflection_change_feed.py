@@ -0,0 +1,92 @@
+"""reflection change feed
+
+Adds reflections.change_seq (numbered from the change_counters table on
+every write) and reflection_tombstones for deleted posts, backing
+/api/reflections/changes. Existing rows are numbered in small
+autocommitted batches.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import batched_backfill, create_index_online, drop_index_online, has_column, has_table
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 200
+
+reflections = sa.table(
+    "reflections",
+    sa.column("id", sa.String),
+    sa.column("change_seq", sa.BigInteger),
+)
+
+change_counters = sa.table(
+    "change_counters",
+    sa.column("name", sa.String),
+    sa.column("value", sa.BigInteger),
+)
+
+
+def upgrade():
+    if not has_column("reflections", "change_seq"):
+        op.add_column("reflections", sa.Column("change_seq", sa.BigInteger, nullable=True))
+
+    if not has_table("reflection_tombstones"):
+        op.create_table(
+            "reflection_tombstones",
+            sa.Column("id", sa.String, primary_key=True),
+            sa.Column("change_seq", sa.BigInteger, nullable=False),
+            sa.Column("deleted_at", sa.DateTime, nullable=False),
+        )
+        op.create_index("ix_reflection_tombstones_change_seq", "reflection_tombstones", ["change_seq"])
+
+    if not has_table("change_counters"):
+        op.create_table(
+            "change_counters",
+            sa.Column("name", sa.String(50), primary_key=True),
+            sa.Column("value", sa.BigInteger, nullable=False),
+        )
+
+    # Number existing rows, carrying on from any earlier partial run
+    last_seq = [op.get_bind().execute(sa.select(sa.func.max(reflections.c.change_seq))).scalar() or 0]
+
+    def select_batch(last_id):
+        query = sa.select(reflections.c.id).where(reflections.c.change_seq.is_(None))
+        if last_id is not None:
+            query = query.where(reflections.c.id > last_id)
+        return query.order_by(reflections.c.id).limit(BATCH_SIZE)
+
+    def number_row(bind, row):
+        last_seq[0] += 1
+        bind.execute(
+            reflections.update()
+            .where(reflections.c.id == row.id, reflections.c.change_seq.is_(None))
+            .values(change_seq=last_seq[0])
+        )
+        return True
+
+    batched_backfill(select_batch, number_row)
+    create_index_online("ix_reflections_change_seq", "reflections", ["change_seq"])
+
+    bind = op.get_bind()
+    exists = bind.execute(
+        sa.select(change_counters.c.name).where(change_counters.c.name == "reflections")
+    ).first()
+    if exists is None:
+        op.execute(change_counters.insert().values(name="reflections", value=last_seq[0]))
+
+
+def downgrade():
+    drop_index_online("ix_reflections_change_seq", "reflections")
+    op.drop_table("change_counters")
+    op.drop_index("ix_reflection_tombstones_change_seq", table_name="reflection_tombstones")
+    op.drop_table("reflection_tombstones")
+    with op.batch_alter_table("reflections") as batch:
+        batch.drop_column("change_seq")
@@ -0,0 +1,80 @@
+"""partition contacts by month
+
+On Postgres, rebuilds contacts as a table range-partitioned by month on
+submitted_at (primary key (id, submitted_at), plus a default partition
+for anything outside the monthly ones) and copies the existing rows
+across. SQLite keeps the plain table. Later months are created, and
+expired ones archived, by ContactArchiver at runtime.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from contact_partitions import PARTITIONS_AHEAD, add_months, create_partition_sql, month_start
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+COLUMNS = """
+    id VARCHAR NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    reason VARCHAR(50) NOT NULL,
+    message TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    submitted_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+"""
+COLUMN_NAMES = "id, name, email, reason, message, status, submitted_at"
+
+
+def _relkind(bind, name: str):
+    return bind.execute(
+        sa.text("SELECT relkind FROM pg_class WHERE relname = :name AND pg_table_is_visible(oid)"),
+        {"name": name},
+    ).scalar()
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or _relkind(bind, "contacts") == "p":
+        return
+
+    op.execute("ALTER TABLE contacts RENAME TO contacts_unpartitioned")
+    op.execute("ALTER TABLE contacts_unpartitioned RENAME CONSTRAINT contacts_pkey TO contacts_unpartitioned_pkey")
+    op.execute("ALTER INDEX IF EXISTS ix_contacts_submitted_at RENAME TO ix_contacts_unpartitioned_submitted_at")
+
+    op.execute(f"CREATE TABLE contacts ({COLUMNS}, PRIMARY KEY (id, submitted_at)) PARTITION BY RANGE (submitted_at)")
+    op.execute("CREATE INDEX ix_contacts_submitted_at ON contacts (submitted_at)")
+    op.execute("CREATE TABLE contacts_default PARTITION OF contacts DEFAULT")
+
+    current = month_start(datetime.utcnow())
+    oldest = bind.execute(sa.text("SELECT MIN(submitted_at) FROM contacts_unpartitioned")).scalar()
+    month = min(month_start(oldest), current) if oldest is not None else current
+    while month <= add_months(current, PARTITIONS_AHEAD):
+        op.execute(create_partition_sql(month))
+        month = add_months(month, 1)
+
+    op.execute(f"INSERT INTO contacts ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM contacts_unpartitioned")
+    op.execute("DROP TABLE contacts_unpartitioned")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or _relkind(bind, "contacts") != "p":
+        return
+
+    op.execute("ALTER TABLE contacts RENAME TO contacts_partitioned")
+    op.execute("ALTER TABLE contacts_partitioned RENAME CONSTRAINT contacts_pkey TO contacts_partitioned_pkey")
+    op.execute("ALTER INDEX ix_contacts_submitted_at RENAME TO ix_contacts_partitioned_submitted_at")
+    op.execute(f"CREATE TABLE contacts ({COLUMNS}, PRIMARY KEY (id))")
+    op.execute("CREATE INDEX ix_contacts_submitted_at ON contacts (submitted_at)")
+    op.execute(f"INSERT INTO contacts ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM contacts_partitioned")
+    # Dropping the parent drops every partition with it
+    op.execute("DROP TABLE contacts_partitioned")
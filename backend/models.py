@@ -22,6 +22,9 @@ class ContactStatus(str, Enum):
     NEW = "new"
     READ = "read"
     REPLIED = "replied"
+    # Held back by the spam filter, or marked as spam by an admin
+    QUARANTINED = "quarantined"
+    SPAM = "spam"
 
 
 # Reflection Models
@@ -32,6 +35,8 @@ class ReflectionBase(BaseModel):
     category: ReflectionCategory
     tags: List[str] = Field(default_factory=list)
     published: bool = Field(default=True)
+    # Content hash of an uploaded image (artwork posts), see /api/images
+    image_id: Optional[str] = Field(None, pattern=r'^[0-9a-f]{64}$')
 
 
 class ReflectionCreate(ReflectionBase):
@@ -45,6 +50,7 @@ class ReflectionUpdate(BaseModel):
     category: Optional[ReflectionCategory] = None
     tags: Optional[List[str]] = None
     published: Optional[bool] = None
+    image_id: Optional[str] = Field(None, pattern=r'^[0-9a-f]{64}$')
 
 
 class Reflection(ReflectionBase):
@@ -53,6 +59,8 @@ class Reflection(ReflectionBase):
     read_time: str = Field(default="")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Sanitised HTML rendered from the Markdown in `content`
+    content_html: Optional[str] = None
 
     def calculate_read_time(self) -> str:
         """Calculate estimated reading time based on content length"""
@@ -103,8 +111,9 @@ class ContactSubmission(ContactSubmissionCreate):
 
 # Admin Models
 class AdminLogin(BaseModel):
-    username: str
-    password: str
+    username: str = Field(..., max_length=100)
+    # Bounded so a huge body cannot make hashing expensive
+    password: str = Field(..., max_length=1024)
 
 
 class AdminSession(BaseModel):
@@ -127,6 +136,58 @@ class AdminSession(BaseModel):
         return cls(**data)
 
 
+# Image Models
+class ImageVariant(BaseModel):
+    width: int
+    height: int
+    format: str
+    bytes: int
+    url: str = ""
+
+
+class ImageAsset(BaseModel):
+    id: str
+    content_type: str
+    extension: str
+    width: int
+    height: int
+    bytes: int
+    variants: List[ImageVariant] = Field(default_factory=list)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    def with_urls(self, base: str = "/api/media") -> "ImageAsset":
+        """Fill in the public URL of every variant"""
+        for variant in self.variants:
+            variant.url = f"{base}/{self.id}/{variant.width}.{variant.format}"
+        return self
+
+
+# Job Models
+class Job(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    kind: str
+    payload: dict = Field(default_factory=dict)
+    status: str = Field(default="pending")
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    run_after: datetime = Field(default_factory=datetime.utcnow)
+    locked_until: Optional[datetime] = None
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class IdempotencyRecord(BaseModel):
+    key: str
+    request_hash: str
+    # None while the original request is still being processed
+    status_code: Optional[int] = None
+    content_type: Optional[str] = None
+    body: Optional[bytes] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+
+
 # Response Models
 class ReflectionsResponse(BaseModel):
     reflections: List[Reflection]
@@ -134,6 +195,80 @@ class ReflectionsResponse(BaseModel):
     categories: List[str]
 
 
+class ReflectionBatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=100)
+
+
+class ReflectionBatchResponse(BaseModel):
+    # In the order requested, duplicates removed
+    reflections: List[Reflection]
+    # Requested ids that do not exist or are not published
+    missing: List[str]
+
+
+class ChangeType(str, Enum):
+    UPSERT = "upsert"
+    # Deleted, or no longer published
+    DELETE = "delete"
+
+
+class ReflectionChange(BaseModel):
+    seq: int
+    id: str
+    type: ChangeType
+    # The current published reflection, for upserts
+    reflection: Optional[Reflection] = None
+
+
+class ReflectionChangesResponse(BaseModel):
+    # In change order; each id appears at most once, at its latest change
+    changes: List[ReflectionChange]
+    # Pass back as `since` to continue from here
+    next_since: int
+    has_more: bool
+
+
+class RelatedReflection(BaseModel):
+    id: str
+    title: str
+    excerpt: str
+    category: ReflectionCategory
+    tags: List[str]
+    date: datetime
+    read_time: str
+    score: float
+
+
+class RelatedReflectionsResponse(BaseModel):
+    reflection_id: str
+    related: List[RelatedReflection]
+
+
+class ReflectionViewStats(BaseModel):
+    reflection_id: str
+    title: Optional[str] = None
+    views: int
+    unique_visitors: int
+
+
+class TopReflectionsResponse(BaseModel):
+    since: datetime
+    reflections: List[ReflectionViewStats]
+
+
+class ViewBucket(BaseModel):
+    bucket_start: datetime
+    views: int
+    unique_visitors: int
+
+
+class ReflectionViewSeries(BaseModel):
+    reflection_id: str
+    bucket: str
+    since: datetime
+    buckets: List[ViewBucket]
+
+
 class ContactResponse(BaseModel):
     success: bool
     message: str
@@ -147,4 +282,19 @@ class AdminLoginResponse(BaseModel):
 
 class AdminVerifyResponse(BaseModel):
     valid: bool
-    message: str
\ No newline at end of file
+    message: str
+
+
+class JobQueueStats(BaseModel):
+    pending: int
+    running: int
+    done: int
+    failed: int
+    oldest_pending_seconds: Optional[float] = None
+    in_flight: int = 0
+
+
+class ReadCoalescingStats(BaseModel):
+    calls: int  # queries actually run
+    coalesced: int  # calls that shared another call's query
+    in_flight: int
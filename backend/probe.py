@@ -0,0 +1,35 @@
+"""
+Container healthcheck: exit 0 if /readyz answers 200 (ready or degraded),
+else 1.
+
+Only the socket module is used so the check stays cheap to start; run it
+as `python -I -S probe.py` to skip site-packages entirely.
+
+Usage: python -I -S probe.py [path]
+
+PORT must match the server's (Settings.port reads the same variable,
+both default to 8001).
+"""
+import os
+import socket
+import sys
+
+TIMEOUT = 3.0
+
+
+def main() -> int:
+    path = sys.argv[1] if len(sys.argv) > 1 else "/readyz"
+    port = int(os.environ.get("PORT", "8001"))
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=TIMEOUT) as sock:
+            sock.sendall(f"HEAD {path} HTTP/1.0\r\nHost: localhost\r\n\r\n".encode())
+            status_line = sock.recv(64).split(b"\r\n", 1)[0]
+    except OSError as e:
+        print(f"probe failed: {e}", file=sys.stderr)
+        return 1
+    parts = status_line.split()
+    return 0 if len(parts) >= 2 and parts[1] == b"200" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
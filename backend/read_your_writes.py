@@ -0,0 +1,45 @@
+"""
+Which client a database write belongs to, for read-your-writes routing.
+
+After a write, the client that made it should not read a lagging replica
+and miss its own change; everyone else can keep reading the replica.
+ReadYourWritesMiddleware tags each request with its session cookie, and
+Database pins reads to the primary per session rather than for the whole
+process. Requests without a session (anonymous contact posts, view
+counts) never pin anything.
+"""
+import contextvars
+from http.cookies import SimpleCookie
+from typing import Optional
+
+# Session cookie of the request being handled, None outside one
+current_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "read_your_writes_session", default=None
+)
+
+
+def session_cookie(headers) -> Optional[str]:
+    """The `session_id` cookie from raw ASGI headers, or None without one"""
+    for name, value in headers:
+        if name == b"cookie":
+            morsel = SimpleCookie(value.decode("latin-1")).get("session_id")
+            if morsel is not None and morsel.value:
+                return morsel.value
+    return None
+
+
+class ReadYourWritesMiddleware:
+    """Expose the request's session cookie to Database for replica routing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_session.set(session_cookie(scope["headers"]))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_session.reset(token)
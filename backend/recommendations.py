@@ -0,0 +1,266 @@
+import logging
+import re
+import weakref
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from jobs import job_handler
+from models import Reflection
+
+logger = logging.getLogger(__name__)
+
+RELATED_LIMIT = 5
+# Postgres advisory lock held while the whole index is rebuilt
+RELATED_REBUILD_LOCK = 0x72656c61
+TEXT_WEIGHT = 0.7
+TAG_WEIGHT = 0.3
+# Title and excerpt say more about a post than any one sentence of the body
+TITLE_BOOST = 3
+EXCERPT_BOOST = 2
+
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9']+")
+STOP_WORDS = frozenset("""
+    about after also and are but can for from had has have her his how into its
+    just more not one our out over she that the their them then there these they
+    this those through was were what when where which while who will with would
+    you your been being both each than very only even such
+""".split())
+
+RelatedList = List[Tuple[str, float]]
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def _document_terms(reflection: Reflection) -> Counter:
+    terms = Counter(tokenize(reflection.content))
+    for token in tokenize(reflection.title):
+        terms[token] += TITLE_BOOST
+    for token in tokenize(reflection.excerpt):
+        terms[token] += EXCERPT_BOOST
+    return terms
+
+
+class RelatedIndex:
+    """
+    TF-IDF + tag-overlap similarity over published reflections.
+
+    Each post keeps its raw term counts so a single create/update only
+    re-tokenises that post; scoring is one sparse matrix-vector product
+    against the whole archive.
+    """
+
+    def __init__(self, limit: int = RELATED_LIMIT):
+        self.limit = limit
+        self._terms: Dict[str, Counter] = {}
+        self._tags: Dict[str, frozenset] = {}
+        self._related: Dict[str, RelatedList] = {}
+        # Change number each post was indexed at, to spot posts changed elsewhere
+        self._versions: Dict[str, int] = {}
+        self._matrices = None
+        self.built = False
+
+    def __len__(self):
+        return len(self._terms)
+
+    def rebuild(self, reflections: List[Reflection], versions: Dict[str, int]) -> Dict[str, RelatedList]:
+        """Recompute related lists for every published reflection"""
+        self._terms.clear()
+        self._tags.clear()
+        self._versions = dict(versions)
+        for reflection in reflections:
+            if reflection.published:
+                self._add(reflection)
+        self._matrices = None
+        self._related = {rid: self._score(rid, self.limit) for rid in self._terms}
+        self.built = True
+        return dict(self._related)
+
+    def out_of_date(self, versions: Dict[str, int]) -> Tuple[List[str], List[str]]:
+        """Posts to (re)index and posts to drop, to match the published `versions`"""
+        stale = [rid for rid, version in versions.items() if self._versions.get(rid) != version]
+        gone = [rid for rid in self._terms if rid not in versions]
+        return stale, gone
+
+    def sync(self, reflections: List[Reflection], gone: List[str],
+             versions: Dict[str, int]) -> Dict[str, RelatedList]:
+        """Apply posts changed since this index last saw them; returns every related list that changed"""
+        changed: Dict[str, RelatedList] = {}
+        for reflection_id in gone:
+            changed.update(self.remove(reflection_id))
+            self._versions.pop(reflection_id, None)
+        for reflection in reflections:
+            changed.update(self.upsert(reflection))
+            self._versions[reflection.id] = versions[reflection.id]
+        return changed
+
+    def upsert(self, reflection: Reflection) -> Dict[str, RelatedList]:
+        """Re-index one post and return every related list that changed"""
+        if not reflection.published:
+            return self.remove(reflection.id)
+        self._add(reflection)
+        self._matrices = None
+        return self._refresh_around(reflection.id)
+
+    def remove(self, reflection_id: str) -> Dict[str, RelatedList]:
+        """Drop one post and return every related list that changed"""
+        if reflection_id not in self._terms:
+            return {}
+        del self._terms[reflection_id]
+        del self._tags[reflection_id]
+        self._related.pop(reflection_id, None)
+        self._matrices = None
+        changed = self._refresh_around(reflection_id)
+        changed[reflection_id] = []
+        return changed
+
+    def related(self, reflection_id: str) -> RelatedList:
+        return self._related.get(reflection_id, [])
+
+    def _add(self, reflection: Reflection):
+        self._terms[reflection.id] = _document_terms(reflection)
+        self._tags[reflection.id] = frozenset(t.lower() for t in reflection.tags)
+
+    def _refresh_around(self, reflection_id: str) -> Dict[str, RelatedList]:
+        """
+        Recompute the changed post's own list, plus the lists of posts that
+        either pointed at it or would now rank it above their weakest entry.
+        """
+        changed = {}
+        if reflection_id in self._terms:
+            own = self._score(reflection_id, self.limit)
+            self._related[reflection_id] = own
+            changed[reflection_id] = own
+            scores_to_changed = dict(self._score(reflection_id, limit=None))
+        else:
+            scores_to_changed = {}
+
+        for other_id, current in self._related.items():
+            if other_id == reflection_id:
+                continue
+            points_at_changed = any(rid == reflection_id for rid, _ in current)
+            score = scores_to_changed.get(other_id, 0.0)
+            beats_weakest = score > 0 and (
+                len(current) < self.limit or score > current[-1][1]
+            )
+            if points_at_changed or beats_weakest:
+                updated = self._score(other_id, self.limit)
+                if updated != current:
+                    changed[other_id] = updated
+
+        self._related.update(changed)
+        return changed
+
+    def _build_matrices(self):
+        # NumPy/SciPy cost ~200ms to import, so load them on first use
+        # rather than on every cold start
+        import numpy as np
+        from scipy import sparse
+
+        ids = list(self._terms)
+        vocabulary: Dict[str, int] = {}
+        rows, cols, values = [], [], []
+        for row, rid in enumerate(ids):
+            for term, count in self._terms[rid].items():
+                rows.append(row)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+                values.append(count)
+
+        shape = (len(ids), max(1, len(vocabulary)))
+        tf = sparse.csr_matrix((np.array(values, dtype=np.float32), (rows, cols)), shape=shape)
+        # Sublinear tf and smoothed idf, as in most IR baselines
+        tf.data = 1.0 + np.log(tf.data)
+        df = np.bincount(cols, minlength=shape[1]).astype(np.float32)
+        idf = np.log((1.0 + len(ids)) / (1.0 + df)) + 1.0
+        tfidf = tf.multiply(idf).tocsr()
+        norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        tfidf = sparse.diags(1.0 / norms) @ tfidf
+
+        tag_vocabulary: Dict[str, int] = {}
+        tag_rows, tag_cols = [], []
+        for row, rid in enumerate(ids):
+            for tag in self._tags[rid]:
+                tag_rows.append(row)
+                tag_cols.append(tag_vocabulary.setdefault(tag, len(tag_vocabulary)))
+        tags = sparse.csr_matrix(
+            (np.ones(len(tag_rows), dtype=np.float32), (tag_rows, tag_cols)),
+            shape=(len(ids), max(1, len(tag_vocabulary))),
+        )
+        tag_counts = np.asarray(tags.sum(axis=1)).ravel()
+
+        self._matrices = (ids, {rid: i for i, rid in enumerate(ids)}, tfidf.tocsr(), tags, tag_counts)
+
+    def _score(self, reflection_id: str, limit: Optional[int]) -> RelatedList:
+        import numpy as np
+
+        if self._matrices is None:
+            self._build_matrices()
+        ids, positions, tfidf, tags, tag_counts = self._matrices
+        row = positions[reflection_id]
+
+        text_scores = (tfidf @ tfidf[row].T).toarray().ravel()
+        overlap = (tags @ tags[row].T).toarray().ravel()
+        union = tag_counts + tag_counts[row] - overlap
+        tag_scores = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+
+        scores = TEXT_WEIGHT * text_scores + TAG_WEIGHT * tag_scores
+        scores[row] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if limit is not None and len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(ids[i], round(float(scores[i]), 6)) for i in candidates]
+
+
+# One index per Database, built at startup (or by the job below, in workers
+# that did not do the startup rebuild) and brought up to date by that job
+_indexes: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def related_index_for(db) -> RelatedIndex:
+    index = _indexes.get(db)
+    if index is None:
+        index = _indexes[db] = RelatedIndex()
+    return index
+
+
+async def rebuild_related_index(db) -> bool:
+    """
+    Rebuild the index from the primary and persist every related list.
+    Returns False, doing nothing, while another worker is rebuilding.
+    """
+    async with db.advisory_lock(RELATED_REBUILD_LOCK) as locked:
+        if not locked:
+            logger.info("Another worker is rebuilding related reflections")
+            return False
+        versions = await db.get_published_reflection_versions()
+        reflections = await db.get_reflections_from_primary(list(versions))
+        related = related_index_for(db).rebuild(reflections, versions)
+        await db.replace_related_reflections(related, full=True)
+    logger.info(f"Built related reflections for {len(related)} posts")
+    return True
+
+
+@job_handler("reflections.related")
+async def refresh_related_reflections(db, payload: dict):
+    """
+    Refresh related lists after a reflection changes. Each worker has its own
+    index and only sees the jobs it claims, so it first catches up with every
+    post changed since it last ran (by change number, read from the primary)
+    rather than trusting its in-memory copy.
+    """
+    index = related_index_for(db)
+    if not index.built:
+        # Only one worker rebuilds at startup; the others build theirs on first use
+        if not await rebuild_related_index(db):
+            raise RuntimeError("Related reflections are being rebuilt, retrying later")
+        return
+    versions = await db.get_published_reflection_versions()
+    stale, gone = index.out_of_date(versions)
+    reflections = await db.get_reflections_from_primary(stale)
+    changed = index.sync(reflections, gone, versions)
+    if changed:
+        await db.replace_related_reflections(changed)
@@ -1,54 +1,69 @@
-
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Cookie
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Cookie, Header, Request, UploadFile, File
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
-import os
+import asyncio
 import logging
-from pathlib import Path
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+from email.utils import format_datetime
 
 # Import our modules
 from models import (
     Reflection, ReflectionCreate, ReflectionUpdate,
-    ContactSubmissionCreate, ContactSubmission,
+    ContactSubmissionCreate, ContactSubmission, ContactStatus,
     AdminLogin, AdminLoginResponse, AdminVerifyResponse,
-    ReflectionsResponse, ContactResponse
+    ReflectionsResponse, ContactResponse, JobQueueStats, ReadCoalescingStats,
+    RelatedReflectionsResponse, ReflectionViewStats, TopReflectionsResponse,
+    ViewBucket, ReflectionViewSeries, ImageAsset,
+    ReflectionBatchRequest, ReflectionBatchResponse, ReflectionChangesResponse
 )
-from database import init_database, get_database
-from auth import authenticate_admin, verify_admin_session, logout_admin
-
-ROOT_DIR = Path(__file__).parent
-from dotenv import load_dotenv
-load_dotenv(ROOT_DIR / '.env')
-
-# Initialize database
-db = init_database()
+from database import Database, init_database
+from auth import authenticate_admin, verify_admin_session, logout_admin, AuthBusyError, shutdown_hash_executor
+from compression import CompressionMiddleware
+from idempotency import IdempotencyMiddleware, IdempotencyStore
+from read_your_writes import ReadYourWritesMiddleware
+from jobs import JobRunner, contact_webhook_url
+from logging_config import configure_logging
+from recommendations import rebuild_related_index
+from analytics import ViewCounter, AnalyticsFlusher, summarise_top, summarise_series
+from spam import SpamFilter, SpamAction
+from feeds import FeedCache, FEED_CACHE_CONTROL, is_not_modified
+from health import HealthMonitor
+from local_state import ContactSpool
+from contact_partitions import ContactArchiver, INBOX_MONTHS, RETENTION_MONTHS, inbox_since
+from settings import Settings
+import media
 
-# Create the main app
-app = FastAPI(title="Pranay Portfolio API", version="1.0.0")
+logger = logging.getLogger(__name__)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
+# Feeds and the sitemap live at the conventional root paths
+feeds_router = APIRouter()
+# Liveness/readiness probes for load balancers and container healthchecks
+health_router = APIRouter()
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=[
-        "https://pranay-portfolio-v3.vercel.app",
-        "http://localhost:3000"  # For local development
-    ],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Per-app resources live on app.state, built by create_app()
+def get_db(request: Request) -> Database:
+    return request.app.state.db
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+def get_job_runner(request: Request) -> JobRunner:
+    return request.app.state.job_runner
+
+def get_view_counter(request: Request) -> ViewCounter:
+    return request.app.state.view_counter
+
+def get_feed_cache(request: Request) -> FeedCache:
+    return request.app.state.feed_cache
+
+def get_spam_filter(request: Request) -> SpamFilter:
+    return request.app.state.spam_filter
+
+def get_health_monitor(request: Request) -> HealthMonitor:
+    return request.app.state.health_monitor
+
+def get_contact_spool(request: Request) -> ContactSpool:
+    return request.app.state.contact_spool
 
 # Health check endpoint
 @api_router.get("/")
@@ -59,11 +74,18 @@ async def root():
 # REFLECTIONS ENDPOINTS
 # ============================================================================
 
-@api_router.get("/reflections", response_model=ReflectionsResponse)
-async def get_reflections(category: Optional[str] = None):
-    """Get all published reflections, optionally filtered by category"""
+# Lists leave out the rendered body; clients fetch a single reflection for it
+LIST_EXCLUDE = {"reflections": {"__all__": {"content_html"}}}
+
+@api_router.get("/reflections", response_model=ReflectionsResponse, response_model_exclude=LIST_EXCLUDE)
+async def get_reflections(
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    db: Database = Depends(get_db)
+):
+    """Get all published reflections, optionally filtered by category and/or tag"""
     try:
-        reflections = await db.get_reflections(category=category, published_only=True)
+        reflections = await db.get_reflections(category=category, published_only=True, tag=tag)
         categories = await db.get_reflection_categories()
         
         return ReflectionsResponse(
@@ -75,8 +97,102 @@ async def get_reflections(category: Optional[str] = None):
         logger.error(f"Error getting reflections: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve reflections")
 
+MAX_BATCH_IDS = 100
+
+async def _get_reflection_batch(ids: List[str], db: Database) -> ReflectionBatchResponse:
+    """Resolve ids with one query, keeping request order and reporting misses"""
+    ids = list(dict.fromkeys(i for i in ids if i))
+    if not ids:
+        raise HTTPException(status_code=400, detail="No reflection ids provided")
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    
+    try:
+        reflections = await db.get_reflections_by_ids(ids, published_only=True)
+        found = {reflection.id for reflection in reflections}
+        return ReflectionBatchResponse(
+            reflections=reflections,
+            missing=[i for i in ids if i not in found]
+        )
+    except Exception as e:
+        logger.error(f"Error getting reflection batch: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve reflections")
+
+@api_router.get("/reflections/batch", response_model=ReflectionBatchResponse, response_model_exclude=LIST_EXCLUDE)
+async def get_reflection_batch(
+    ids: str,
+    db: Database = Depends(get_db)
+):
+    """Get several published reflections by comma-separated ids"""
+    return await _get_reflection_batch([i.strip() for i in ids.split(",")], db)
+
+@api_router.post("/reflections/batch", response_model=ReflectionBatchResponse, response_model_exclude=LIST_EXCLUDE)
+async def post_reflection_batch(
+    request: ReflectionBatchRequest,
+    db: Database = Depends(get_db)
+):
+    """Get several published reflections by id (for lists too long for a URL)"""
+    return await _get_reflection_batch(request.ids, db)
+
+MAX_CHANGES = 500
+
+@api_router.get("/reflections/changes", response_model=ReflectionChangesResponse)
+async def get_reflection_changes(
+    since: int = 0,
+    limit: int = 100,
+    db: Database = Depends(get_db)
+):
+    """Published reflection changes after `since` (a previous `next_since`), deletions included"""
+    try:
+        changes, next_since, has_more = await db.get_reflection_changes(
+            max(0, since), limit=max(1, min(limit, MAX_CHANGES))
+        )
+        return ReflectionChangesResponse(changes=changes, next_since=next_since, has_more=has_more)
+    except Exception as e:
+        logger.error(f"Error getting reflection changes since {since}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve reflection changes")
+
+@api_router.get("/reflections/stream")
+async def stream_reflection_changes(
+    last_event_id: Optional[str] = Header(None),
+    db: Database = Depends(get_db)
+):
+    """Server-Sent Events stream of published reflection changes"""
+    events = db.reflection_events
+    try:
+        subscription = events.subscribe(last_event_id)
+    except OverflowError:
+        raise HTTPException(status_code=503, detail="Too many open event streams")
+    
+    async def event_stream():
+        try:
+            while not subscription.closed:
+                batch = await subscription.next_batch()
+                if batch:
+                    yield b"".join(batch)
+        finally:
+            events.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Stop proxies (nginx) buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _visitor_key(request: Request) -> str:
+    """Identify a visitor for unique counts (hashed, never stored as is)"""
+    forwarded = request.headers.get("x-forwarded-for")
+    client = forwarded.split(",")[0].strip() if forwarded else (request.client.host if request.client else "")
+    return f"{client}|{request.headers.get('user-agent', '')}"
+
 @api_router.get("/reflections/{reflection_id}", response_model=Reflection)
-async def get_reflection(reflection_id: str):
+async def get_reflection(
+    reflection_id: str,
+    request: Request,
+    db: Database = Depends(get_db),
+    view_counter: ViewCounter = Depends(get_view_counter)
+):
     """Get a single reflection by ID"""
     try:
         reflection = await db.get_reflection_by_id(reflection_id)
@@ -86,6 +202,7 @@ async def get_reflection(reflection_id: str):
         if not reflection.published:
             raise HTTPException(status_code=404, detail="Reflection not found")
         
+        view_counter.record_view(reflection_id, _visitor_key(request))
         return reflection
     except HTTPException:
         raise
@@ -93,31 +210,58 @@ async def get_reflection(reflection_id: str):
         logger.error(f"Error getting reflection {reflection_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve reflection")
 
+@api_router.get("/reflections/{reflection_id}/related", response_model=RelatedReflectionsResponse)
+async def get_related_reflections(
+    reflection_id: str,
+    limit: int = 5,
+    db: Database = Depends(get_db)
+):
+    """Get precomputed "read next" reflections for a post"""
+    try:
+        related = await db.get_related_reflections(reflection_id, limit=max(1, min(limit, 20)))
+        return RelatedReflectionsResponse(reflection_id=reflection_id, related=related)
+    except Exception as e:
+        logger.error(f"Error getting related reflections for {reflection_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve related reflections")
+
+async def _refresh_related_later(job_runner: JobRunner, reflection_id: str):
+    """Queue a related-reflections refresh; the write itself has already succeeded"""
+    try:
+        await job_runner.enqueue("reflections.related", {"reflection_id": reflection_id})
+    except Exception as e:
+        # Picked up by the next full rebuild at startup
+        logger.error(f"Error queueing related refresh for reflection {reflection_id}: {str(e)}")
+
 @api_router.post("/reflections", response_model=Reflection)
 async def create_reflection(
     reflection: ReflectionCreate,
-    session_id: Optional[str] = Cookie(None)
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db),
+    job_runner: JobRunner = Depends(get_job_runner)
 ):
     """Create a new reflection (admin only)"""
-    if not await verify_admin_session(session_id):
+    if not await verify_admin_session(session_id, db):
         raise HTTPException(status_code=401, detail="Admin authentication required")
     
     try:
         new_reflection = await db.create_reflection(reflection.dict())
         logger.info(f"Created reflection: {new_reflection.title}")
-        return new_reflection
     except Exception as e:
         logger.error(f"Error creating reflection: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create reflection")
+    await _refresh_related_later(job_runner, new_reflection.id)
+    return new_reflection
 
 @api_router.put("/reflections/{reflection_id}", response_model=Reflection)
 async def update_reflection(
     reflection_id: str,
     reflection_update: ReflectionUpdate,
-    session_id: Optional[str] = Cookie(None)
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db),
+    job_runner: JobRunner = Depends(get_job_runner)
 ):
     """Update a reflection (admin only)"""
-    if not await verify_admin_session(session_id):
+    if not await verify_admin_session(session_id, db):
         raise HTTPException(status_code=401, detail="Admin authentication required")
     
     try:
@@ -132,20 +276,23 @@ async def update_reflection(
             raise HTTPException(status_code=404, detail="Reflection not found")
         
         logger.info(f"Updated reflection: {reflection_id}")
-        return updated_reflection
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error updating reflection {reflection_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to update reflection")
+    await _refresh_related_later(job_runner, reflection_id)
+    return updated_reflection
 
 @api_router.delete("/reflections/{reflection_id}")
 async def delete_reflection(
     reflection_id: str,
-    session_id: Optional[str] = Cookie(None)
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db),
+    job_runner: JobRunner = Depends(get_job_runner)
 ):
     """Delete a reflection (admin only)"""
-    if not await verify_admin_session(session_id):
+    if not await verify_admin_session(session_id, db):
         raise HTTPException(status_code=401, detail="Admin authentication required")
     
     try:
@@ -154,17 +301,21 @@ async def delete_reflection(
             raise HTTPException(status_code=404, detail="Reflection not found")
         
         logger.info(f"Deleted reflection: {reflection_id}")
-        return {"message": "Reflection deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error deleting reflection {reflection_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to delete reflection")
+    await _refresh_related_later(job_runner, reflection_id)
+    return {"message": "Reflection deleted successfully"}
 
-@api_router.get("/reflections-admin", response_model=ReflectionsResponse)
-async def get_all_reflections_admin(session_id: Optional[str] = Cookie(None)):
+@api_router.get("/reflections-admin", response_model=ReflectionsResponse, response_model_exclude=LIST_EXCLUDE)
+async def get_all_reflections_admin(
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db)
+):
     """Get all reflections including unpublished (admin only)"""
-    if not await verify_admin_session(session_id):
+    if not await verify_admin_session(session_id, db):
         raise HTTPException(status_code=401, detail="Admin authentication required")
     
     try:
@@ -180,16 +331,132 @@ async def get_all_reflections_admin(session_id: Optional[str] = Cookie(None)):
         logger.error(f"Error getting admin reflections: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve reflections")
 
+# ============================================================================
+# IMAGE ENDPOINTS
+# ============================================================================
+
+@api_router.post("/images", response_model=ImageAsset)
+async def upload_image(
+    file: UploadFile = File(...),
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db)
+):
+    """Upload an artwork image and generate its responsive derivatives (admin only)"""
+    if not await verify_admin_session(session_id, db):
+        raise HTTPException(status_code=401, detail="Admin authentication required")
+    
+    data = await file.read(media.MAX_UPLOAD_BYTES + 1)
+    if len(data) > media.MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    if file.content_type not in media.ACCEPTED_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    
+    try:
+        image_id, extension, info = await media.ingest_image(data, file.content_type)
+    except Exception as e:
+        logger.error(f"Error processing uploaded image: {str(e)}")
+        raise HTTPException(status_code=400, detail="Could not process image")
+    
+    try:
+        image = await db.save_image(ImageAsset(
+            id=image_id,
+            content_type=file.content_type,
+            extension=extension,
+            bytes=len(data),
+            **info
+        ))
+        logger.info(f"Stored image {image_id} with {len(image.variants)} variants")
+        return image.with_urls()
+    except Exception as e:
+        logger.error(f"Error saving image {image_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to save image")
+
+@api_router.get("/images/{image_id}", response_model=ImageAsset)
+async def get_image(
+    image_id: str,
+    db: Database = Depends(get_db)
+):
+    """Get an image's dimensions and derivative URLs"""
+    image = await db.get_image(image_id) if media.IMAGE_ID_RE.match(image_id) else None
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return image.with_urls()
+
+@api_router.api_route("/media/{image_id}/{variant}", methods=["GET", "HEAD"])
+async def get_media(
+    image_id: str,
+    variant: str,
+    db: Database = Depends(get_db)
+):
+    """Serve an image derivative (e.g. 640.webp) or the original"""
+    if not media.IMAGE_ID_RE.match(image_id):
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    match = media.VARIANT_RE.match(variant)
+    if match:
+        width, fmt = int(match.group(1)), match.group(2)
+        path = media.variant_path(image_id, width, fmt)
+        content_type = media.CONTENT_TYPES[fmt]
+    elif variant == "original":
+        image = await db.get_image(image_id)
+        if not image:
+            raise HTTPException(status_code=404, detail="Image not found")
+        path = media.original_path(image_id, image.extension)
+        content_type = image.content_type
+    else:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Image not found")
+    # Content-addressed paths never change, so the path itself is the validator
+    return media.MediaFileResponse(path, content_type, etag=f"{image_id[:16]}-{variant}")
+
 # ============================================================================
 # CONTACT ENDPOINTS
 # ============================================================================
 
+async def _store_contact_submission(
+    contact_data: dict, notify: bool, db: Database, job_runner: JobRunner, contact_spool: ContactSpool
+) -> ContactSubmission:
+    """Store a submission and queue its notification, spooling it locally if the database is down"""
+    submission = ContactSubmission(**contact_data)
+    try:
+        await db.create_contact_submission(submission.dict())
+        if notify:
+            await job_runner.enqueue("contact.notify", {
+                "submission_id": submission.id,
+                "reason": submission.reason.value,
+            })
+    except Exception as e:
+        # Replayed (with the same id) once the database is back
+        logger.warning(f"Spooling contact submission {submission.id}: {str(e)}")
+        await asyncio.to_thread(contact_spool.append, submission, notify)
+    return submission
+
 @api_router.post("/contact", response_model=ContactResponse)
-async def submit_contact(contact: ContactSubmissionCreate):
+async def submit_contact(
+    contact: ContactSubmissionCreate,
+    db: Database = Depends(get_db),
+    job_runner: JobRunner = Depends(get_job_runner),
+    spam_filter: SpamFilter = Depends(get_spam_filter),
+    contact_spool: ContactSpool = Depends(get_contact_spool)
+):
     """Submit a contact form"""
     try:
-        submission = await db.create_contact_submission(contact.dict())
-        logger.info(f"Contact form submitted by: {contact.email}")
+        contact_data = contact.dict()
+        verdict = spam_filter.classify(contact_data)
+        
+        # Spam gets the same response, so senders learn nothing from it
+        if verdict.action == SpamAction.DROP:
+            logger.info(f"Dropped spam contact submission (score {verdict.score}: {', '.join(verdict.reasons)})")
+        elif verdict.action == SpamAction.QUARANTINE:
+            contact_data["status"] = ContactStatus.QUARANTINED
+            submission = await _store_contact_submission(contact_data, False, db, job_runner, contact_spool)
+            logger.info(f"Quarantined contact submission {submission.id} (score {verdict.score}: {', '.join(verdict.reasons)})")
+        else:
+            notify = contact_webhook_url() is not None
+            await _store_contact_submission(contact_data, notify, db, job_runner, contact_spool)
+            logger.info("Contact form submitted by: %s", contact.email)
         
         return ContactResponse(
             success=True,
@@ -200,27 +467,107 @@ async def submit_contact(contact: ContactSubmissionCreate):
         raise HTTPException(status_code=500, detail="Failed to submit contact form")
 
 @api_router.get("/contact-submissions", response_model=List[ContactSubmission])
-async def get_contact_submissions(session_id: Optional[str] = Cookie(None)):
-    """Get all contact submissions (admin only)"""
-    if not await verify_admin_session(session_id):
+async def get_contact_submissions(
+    include_spam: bool = False,
+    months: int = INBOX_MONTHS,
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db)
+):
+    """Get the last `months` months of contact submissions, optionally including spam (admin only)"""
+    if not await verify_admin_session(session_id, db):
         raise HTTPException(status_code=401, detail="Admin authentication required")
     
     try:
-        submissions = await db.get_contact_submissions()
+        # Older months are archived to disk, see contact_partitions.py
+        since = inbox_since(max(1, min(months, RETENTION_MONTHS)))
+        submissions = await db.get_contact_submissions(include_spam=include_spam, since=since)
         return submissions
     except Exception as e:
         logger.error(f"Error getting contact submissions: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve contact submissions")
 
+async def _label_contact_submission(
+    submission_id: str,
+    spam: bool,
+    db: Database,
+    spam_filter: SpamFilter
+) -> ContactSubmission:
+    """Relabel a submission and train the spam model on the correction"""
+    submission = await db.get_contact_submission(submission_id)
+    if not submission:
+        raise HTTPException(status_code=404, detail="Contact submission not found")
+    
+    data = submission.dict()
+    was_spam = submission.status == ContactStatus.SPAM
+    # Only read/replied submissions count as ham when the model is rebuilt
+    was_ham = submission.status in (ContactStatus.READ, ContactStatus.REPLIED)
+    if spam and not was_spam:
+        if was_ham:
+            spam_filter.learn(data, spam=False, weight=-1)
+        spam_filter.learn(data, spam=True)
+        submission.status = ContactStatus.SPAM
+    elif not spam and not was_ham:
+        if was_spam:
+            spam_filter.learn(data, spam=True, weight=-1)
+        spam_filter.learn(data, spam=False)
+        submission.status = ContactStatus.READ
+    else:
+        return submission
+    
+    await db.update_contact_status(submission_id, submission.status)
+    logger.info(f"Marked contact submission {submission_id} as {submission.status.value}")
+    return submission
+
+@api_router.post("/contact-submissions/{submission_id}/spam", response_model=ContactSubmission)
+async def mark_contact_spam(
+    submission_id: str,
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db),
+    spam_filter: SpamFilter = Depends(get_spam_filter)
+):
+    """Mark a submission as spam and train the filter on it (admin only)"""
+    if not await verify_admin_session(session_id, db):
+        raise HTTPException(status_code=401, detail="Admin authentication required")
+    
+    try:
+        return await _label_contact_submission(submission_id, True, db, spam_filter)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error marking contact submission {submission_id} as spam: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to update contact submission")
+
+@api_router.post("/contact-submissions/{submission_id}/not-spam", response_model=ContactSubmission)
+async def mark_contact_not_spam(
+    submission_id: str,
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db),
+    spam_filter: SpamFilter = Depends(get_spam_filter)
+):
+    """Release a quarantined or spam submission to the inbox (admin only)"""
+    if not await verify_admin_session(session_id, db):
+        raise HTTPException(status_code=401, detail="Admin authentication required")
+    
+    try:
+        return await _label_contact_submission(submission_id, False, db, spam_filter)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error marking contact submission {submission_id} as not spam: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to update contact submission")
+
 # ============================================================================
 # ADMIN ENDPOINTS
 # ============================================================================
 
 @api_router.post("/admin/login", response_model=AdminLoginResponse)
-async def admin_login(credentials: AdminLogin):
+async def admin_login(
+    credentials: AdminLogin,
+    db: Database = Depends(get_db)
+):
     """Admin login"""
     try:
-        session_id = await authenticate_admin(credentials.username, credentials.password)
+        session_id = await authenticate_admin(credentials.username, credentials.password, db)
         
         if session_id:
             response = JSONResponse(
@@ -246,15 +593,21 @@ async def admin_login(credentials: AdminLogin):
                 success=False,
                 message="Invalid credentials"
             )
+    except AuthBusyError:
+        raise HTTPException(status_code=429, detail="Too many login attempts, try again shortly",
+                            headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Error during admin login: {str(e)}")
         raise HTTPException(status_code=500, detail="Login failed")
 
 @api_router.get("/admin/verify", response_model=AdminVerifyResponse)
-async def verify_admin(session_id: Optional[str] = Cookie(None)):
+async def verify_admin(
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db)
+):
     """Verify admin session"""
     try:
-        is_valid = await verify_admin_session(session_id)
+        is_valid = await verify_admin_session(session_id, db)
         return AdminVerifyResponse(
             valid=is_valid,
             message="Session valid" if is_valid else "Session invalid"
@@ -264,11 +617,14 @@ async def verify_admin(session_id: Optional[str] = Cookie(None)):
         return AdminVerifyResponse(valid=False, message="Verification failed")
 
 @api_router.post("/admin/logout")
-async def admin_logout(session_id: Optional[str] = Cookie(None)):
+async def admin_logout(
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db)
+):
     """Admin logout"""
     try:
         if session_id:
-            await logout_admin(session_id)
+            await logout_admin(session_id, db)
         
         response = JSONResponse(content={"message": "Logged out successfully"})
         response.delete_cookie(key="session_id")
@@ -277,37 +633,308 @@ async def admin_logout(session_id: Optional[str] = Cookie(None)):
         logger.error(f"Error during admin logout: {str(e)}")
         raise HTTPException(status_code=500, detail="Logout failed")
 
-# Include the router in the main app
-app.include_router(api_router)
+@api_router.get("/admin/jobs", response_model=JobQueueStats)
+async def get_job_queue_stats(
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db),
+    job_runner: JobRunner = Depends(get_job_runner)
+):
+    """Get background job queue depth (admin only)"""
+    if not await verify_admin_session(session_id, db):
+        raise HTTPException(status_code=401, detail="Admin authentication required")
+    
+    try:
+        stats = await db.get_job_queue_stats()
+        stats.in_flight = job_runner.in_flight
+        return stats
+    except Exception as e:
+        logger.error(f"Error getting job queue stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve job queue stats")
 
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database and seed data on startup"""
+@api_router.get("/admin/reads", response_model=ReadCoalescingStats)
+async def get_read_coalescing_stats(
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db)
+):
+    """How many reads shared an in-flight query instead of running their own (admin only)"""
+    if not await verify_admin_session(session_id, db):
+        raise HTTPException(status_code=401, detail="Admin authentication required")
+    
+    return ReadCoalescingStats(**db.single_flight.stats())
+
+@api_router.get("/admin/analytics/top", response_model=TopReflectionsResponse)
+async def get_top_reflections(
+    limit: int = 10,
+    days: int = 7,
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db)
+):
+    """Get the most viewed reflections over the last `days` days (admin only)"""
+    if not await verify_admin_session(session_id, db):
+        raise HTTPException(status_code=401, detail="Admin authentication required")
+    
     try:
-        # Connect to database
-        await db.connect()
-        
-        # Create tables
-        await db.create_tables()
-        
-        # Seed initial data
-        await db.seed_initial_data()
-        
-        logger.info("Application startup completed successfully")
+        since = datetime.utcnow() - timedelta(days=max(1, days))
+        rows = await db.get_reflection_stats(since)
+        top = summarise_top(rows, max(1, min(limit, 100)))
+        titles = await db.get_reflection_titles([reflection_id for reflection_id, _, _ in top])
+        return TopReflectionsResponse(
+            since=since,
+            reflections=[
+                ReflectionViewStats(
+                    reflection_id=reflection_id,
+                    title=titles.get(reflection_id),
+                    views=views,
+                    unique_visitors=unique_visitors,
+                )
+                for reflection_id, views, unique_visitors in top
+            ]
+        )
     except Exception as e:
-        logger.error(f"Error during startup: {str(e)}")
+        logger.error(f"Error getting top reflections: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve analytics")
 
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Close database connection on shutdown"""
+@api_router.get("/admin/analytics/reflections/{reflection_id}", response_model=ReflectionViewSeries)
+async def get_reflection_views(
+    reflection_id: str,
+    bucket: str = "day",
+    days: int = 7,
+    session_id: Optional[str] = Cookie(None),
+    db: Database = Depends(get_db)
+):
+    """Get views of one reflection bucketed by hour or day (admin only)"""
+    if not await verify_admin_session(session_id, db):
+        raise HTTPException(status_code=401, detail="Admin authentication required")
+    if bucket not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="bucket must be 'hour' or 'day'")
+    
+    try:
+        since = datetime.utcnow() - timedelta(days=max(1, days))
+        rows = await db.get_reflection_stats(since, reflection_id=reflection_id)
+        return ReflectionViewSeries(
+            reflection_id=reflection_id,
+            bucket=bucket,
+            since=since,
+            buckets=[
+                ViewBucket(bucket_start=start, views=views, unique_visitors=unique_visitors)
+                for start, views, unique_visitors in summarise_series(rows, bucket)
+            ]
+        )
+    except Exception as e:
+        logger.error(f"Error getting views for reflection {reflection_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve analytics")
+
+# ============================================================================
+# FEED ENDPOINTS
+# ============================================================================
+
+async def _feed_response(
+    name: str,
+    request: Request,
+    feed_cache: FeedCache
+) -> Response:
+    """Serve a cached feed, answering conditional requests with 304"""
     try:
-        await db.disconnect()
-        logger.info("Database connection closed")
+        feed = await feed_cache.get(name)
     except Exception as e:
-        logger.error(f"Error during shutdown: {str(e)}")
+        logger.error(f"Error rendering {name}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to generate feed")
+    
+    headers = {
+        "ETag": feed.etag,
+        "Last-Modified": format_datetime(feed.last_modified, usegmt=True),
+        "Cache-Control": FEED_CACHE_CONTROL,
+    }
+    if is_not_modified(feed, request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=feed.body, media_type=feed.media_type, headers=headers)
+
+@feeds_router.get("/feed.xml", include_in_schema=False)
+async def rss_feed(request: Request, feed_cache: FeedCache = Depends(get_feed_cache)):
+    """RSS 2.0 feed of published reflections"""
+    return await _feed_response("feed.xml", request, feed_cache)
+
+@feeds_router.get("/atom.xml", include_in_schema=False)
+async def atom_feed(request: Request, feed_cache: FeedCache = Depends(get_feed_cache)):
+    """Atom feed of published reflections"""
+    return await _feed_response("atom.xml", request, feed_cache)
+
+@feeds_router.get("/feed.json", include_in_schema=False)
+async def json_feed(request: Request, feed_cache: FeedCache = Depends(get_feed_cache)):
+    """JSON Feed of published reflections"""
+    return await _feed_response("feed.json", request, feed_cache)
+
+@feeds_router.get("/sitemap.xml", include_in_schema=False)
+async def sitemap(request: Request, feed_cache: FeedCache = Depends(get_feed_cache)):
+    """Sitemap of the site and its published reflections"""
+    return await _feed_response("sitemap.xml", request, feed_cache)
+
+# ============================================================================
+# HEALTH ENDPOINTS
+# ============================================================================
+
+@health_router.api_route("/livez", methods=["GET", "HEAD"], include_in_schema=False)
+async def livez(response: Response):
+    """The process is up and its event loop is answering (no I/O)"""
+    response.headers["Cache-Control"] = "no-store"
+    return {"status": "ok"}
+
+@health_router.api_route("/readyz", methods=["GET", "HEAD"], include_in_schema=False)
+async def readyz(response: Response, health: HealthMonitor = Depends(get_health_monitor)):
+    """Whether this instance can serve traffic, from the cached database probes"""
+    response.headers["Cache-Control"] = "no-store"
+    # Degraded still takes traffic: public reads are answered from the snapshot
+    if not (health.ready or health.degraded):
+        response.status_code = 503
+    return health.status()
+
+# ============================================================================
+# APP FACTORY
+# ============================================================================
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Build an app instance with its own database, job runner and analytics.
+
+    Nothing here connects or does I/O; connections are opened in the startup
+    event, so building an app (e.g. one per test) is cheap.
+    """
+    settings = settings or Settings.from_env()
+
+    # Log records are formatted and written by a background thread
+    configure_logging(
+        level=settings.log_level,
+        json_format=settings.log_format == "json",
+        sample_rates=settings.log_sample_rates,
+    )
+
+    # Create the main app
+    app = FastAPI(title="Pranay Portfolio API", version="1.0.0")
+    app.state.settings = settings
+    app.state.db = db = init_database(settings.database_url, settings.database_read_url)
+    # Background runner for side effects that should not block requests
+    app.state.job_runner = job_runner = JobRunner(db, concurrency=settings.job_concurrency)
+    # View counts are aggregated in memory and written out periodically
+    app.state.view_counter = view_counter = ViewCounter()
+    analytics_flusher = AnalyticsFlusher(view_counter, db, interval=settings.analytics_flush_interval)
+    # Creates upcoming contacts partitions and archives expired months
+    contact_archiver = ContactArchiver(db)
+    # Rendered feeds, rebuilt only after published reflections change
+    app.state.feed_cache = feed_cache = FeedCache(db, settings.site_url)
+    db.invalidation.subscribe(on_flush=feed_cache.invalidate)
+    # Scores contact submissions before they are stored
+    app.state.spam_filter = spam_filter = SpamFilter()
+    spam_filter.follow(db)
+    # Background database probes behind /readyz
+    app.state.health_monitor = health_monitor = HealthMonitor(db)
+    # Contact submissions that arrive while the database is down
+    app.state.contact_spool = contact_spool = ContactSpool()
+
+    # Replay responses to retried writes that carry an Idempotency-Key
+    # (added first so it sits innermost and stores uncompressed bodies)
+    app.state.idempotency_store = idempotency_store = IdempotencyStore(db)
+    app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+    # Tags requests with their session, so only the writer's reads skip the replica
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=settings.cors_origins,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Compress JSON responses (brotli when available, otherwise gzip)
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
+
+    # Include the router in the main app
+    app.include_router(api_router)
+    app.include_router(feeds_router)
+    app.include_router(health_router)
+
+    # Startup event
+    @app.on_event("startup")
+    async def startup_event():
+        """Connect to the database and seed data on startup (run `alembic upgrade head` first)"""
+        # Loaded first, so a restart during an outage can still serve reads
+        db.snapshot.load()
+        try:
+            # Connect to database
+            await db.connect()
+            
+            # Seed initial data
+            if settings.seed_initial_data:
+                await db.seed_initial_data()
+            
+            # Published metadata for in-memory list filtering
+            await db.load_catalogue()
+            await db.refresh_snapshot()
+            
+            # Learn from submissions already labelled by an admin
+            await spam_filter.train_from(db)
+            
+            if settings.run_background_tasks:
+                # Start processing queued side effects
+                job_runner.start()
+                analytics_flusher.start()
+                contact_archiver.start()
+            
+            # Heartbeats for open reflection event streams
+            db.reflection_events.start()
+            
+            health_monitor.startup_complete = True
+            logger.info("Application startup completed successfully")
+        except Exception as e:
+            health_monitor.startup_error = str(e)
+            logger.error(f"Error during startup: {str(e)}")
+        # Probed even after a failed startup, so /readyz reports the state
+        health_monitor.start()
+        if settings.run_background_tasks:
+            contact_spool.start(db, job_runner)
+        if settings.run_background_tasks and health_monitor.startup_complete:
+            # Precompute "read next" lists for the whole archive, in one worker;
+            # a failure only leaves the previous lists in place
+            try:
+                await rebuild_related_index(db)
+            except Exception as e:
+                logger.error(f"Error rebuilding related reflections: {str(e)}")
+
+    # Shutdown event
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        """Close database connection on shutdown"""
+        try:
+            await health_monitor.stop()
+            await contact_spool.stop()
+            await db.reflection_events.stop()
+            await job_runner.stop()
+            await analytics_flusher.stop()
+            await contact_archiver.stop()
+            await db.disconnect()
+            media.shutdown_pool()
+            shutdown_hash_executor()
+            logger.info("Database connection closed")
+        except Exception as e:
+            logger.error(f"Error during shutdown: {str(e)}")
+
+    return app
+
+
+_app = None
+
+def __getattr__(name):
+    """Build the default app on first access, so `uvicorn server:app` keeps working"""
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    settings = Settings.from_env()
+    # log_config=None leaves logging to configure_logging
+    uvicorn.run(create_app(settings), host="0.0.0.0", port=settings.port, log_config=None)
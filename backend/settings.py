@@ -0,0 +1,59 @@
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from logging_config import parse_sample_rates
+
+ROOT_DIR = Path(__file__).parent
+
+DEFAULT_SITE_URL = "https://pranay-portfolio-v3.vercel.app"
+
+DEFAULT_CORS_ORIGINS = [
+    "https://pranay-portfolio-v3.vercel.app",
+    "http://localhost:3000",  # For local development
+]
+
+
+@dataclass
+class Settings:
+    """Runtime configuration for one app instance"""
+    database_url: Optional[str] = None
+    # Listening port; probe.py reads the same PORT variable
+    port: int = 8001
+    database_read_url: Optional[str] = None
+    cors_origins: List[str] = field(default_factory=lambda: list(DEFAULT_CORS_ORIGINS))
+    # Public site that feed and sitemap links point at
+    site_url: str = DEFAULT_SITE_URL
+    job_concurrency: int = 4
+    analytics_flush_interval: float = 30.0
+    compression_minimum_size: int = 500
+    log_level: str = "INFO"
+    # JSON lines for log shippers; "text" for reading locally
+    log_format: str = "json"
+    # Per-logger sampling for INFO records, None for the defaults
+    log_sample_rates: Optional[Dict[str, float]] = None
+    # Background work that tests usually do not want running
+    run_background_tasks: bool = True
+    seed_initial_data: bool = True
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build settings from the environment (and backend/.env if present)"""
+        from dotenv import load_dotenv
+        load_dotenv(ROOT_DIR / '.env')
+
+        cors_origins = os.environ.get("CORS_ORIGINS")
+        sample_rates = os.environ.get("LOG_SAMPLE_RATES")
+        return cls(
+            database_url=os.environ.get("DATABASE_URL"),
+            port=int(os.environ.get("PORT", "8001")),
+            database_read_url=os.environ.get("DATABASE_READ_URL"),
+            cors_origins=cors_origins.split(",") if cors_origins else list(DEFAULT_CORS_ORIGINS),
+            site_url=os.environ.get("SITE_URL", DEFAULT_SITE_URL),
+            job_concurrency=int(os.environ.get("JOB_CONCURRENCY", "4")),
+            analytics_flush_interval=float(os.environ.get("ANALYTICS_FLUSH_INTERVAL", "30")),
+            log_level=os.environ.get("LOG_LEVEL", "INFO"),
+            log_format=os.environ.get("LOG_FORMAT", "json"),
+            log_sample_rates=parse_sample_rates(sample_rates) if sample_rates is not None else None,
+        )
@@ -0,0 +1,114 @@
+"""
+Tuned SQLite support for single-node deployments.
+
+The stock `databases` SQLite backend opens a fresh aiosqlite connection
+(and thread) for every connection it hands out and leaves SQLite in its
+rollback-journal defaults. This backend keeps a small pool of connections
+opened once with WAL journaling and performance pragmas, so readers run
+concurrently alongside the single writer.
+"""
+import asyncio
+import logging
+import os
+from typing import List
+
+import aiosqlite
+import databases
+from databases.backends.sqlite import SQLiteBackend, SQLitePool
+
+logger = logging.getLogger(__name__)
+
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "8"))
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB, so this is a 64 MiB page cache per connection
+SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+    f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+    f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+class PooledSQLitePool(SQLitePool):
+    """
+    Bounded pool of tuned aiosqlite connections.
+
+    Each aiosqlite connection runs on its own thread, so up to `max_size`
+    queries execute in parallel; further callers wait for a free connection
+    instead of paying to open (and close) a new one.
+    """
+
+    def __init__(self, url, max_size: int = SQLITE_POOL_SIZE, **options):
+        super().__init__(url, **options)
+        self.max_size = max_size
+        self.in_use = 0
+        self._slots = asyncio.Semaphore(max_size)
+        self._idle: List[aiosqlite.Connection] = []
+        self._wal_checked = False
+
+    async def acquire(self) -> aiosqlite.Connection:
+        await self._slots.acquire()
+        try:
+            connection = self._idle.pop() if self._idle else await self._open()
+        except BaseException:
+            self._slots.release()
+            raise
+        self.in_use += 1
+        return connection
+
+    async def _open(self) -> aiosqlite.Connection:
+        connection = await super().acquire()
+        if not self._wal_checked:
+            # journal_mode is persistent in the database file, so once is enough
+            async with connection.execute("PRAGMA journal_mode=WAL") as cursor:
+                mode = (await cursor.fetchone())[0]
+            if mode.lower() != "wal":
+                logger.warning(f"SQLite journal_mode is {mode}, WAL unavailable for this database")
+            self._wal_checked = True
+        for pragma in CONNECTION_PRAGMAS:
+            await connection.execute(pragma)
+        return connection
+
+    async def release(self, connection: aiosqlite.Connection) -> None:
+        try:
+            if connection.in_transaction:
+                # Never hand out a connection with a half-finished transaction
+                await connection.rollback()
+            self._idle.append(connection)
+        except Exception:
+            await super().release(connection)
+        finally:
+            self.in_use -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {"max_size": self.max_size, "in_use": self.in_use, "idle": len(self._idle)}
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(connection.close() for connection in idle), return_exceptions=True)
+
+
+class PooledSQLiteBackend(SQLiteBackend):
+    def __init__(self, database_url, **options):
+        super().__init__(database_url, **options)
+        self._pool = PooledSQLitePool(self._database_url, **self._options)
+
+    async def disconnect(self) -> None:
+        await self._pool.close()
+        await super().disconnect()
+
+
+class SQLiteDatabase(databases.Database):
+    """databases.Database using PooledSQLiteBackend for sqlite:// URLs"""
+
+    SUPPORTED_BACKENDS = {
+        **databases.Database.SUPPORTED_BACKENDS,
+        "sqlite": "sqlite_backend:PooledSQLiteBackend",
+        "sqlite+aiosqlite": "sqlite_backend:PooledSQLiteBackend",
+    }
@@ -70,6 +70,17 @@ export const reflectionApi = {
     }
   },
 
+  // Get several reflections in one request; ids not found are listed in `missing`
+  getByIds: async (ids) => {
+    try {
+      const response = await api.post('/reflections/batch', { ids });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching reflections:', error);
+      throw error;
+    }
+  },
+
   // Admin: Get all reflections (including unpublished)
   getAllAdmin: async () => {
     try {
@@ -0,0 +1,110 @@
+"""
+Shared fixtures for the backend tests.
+
+Every test gets a freshly migrated SQLite database. Set TEST_POSTGRES_URL
+to an empty scratch database to run the database-backed tests against
+Postgres as well (its tables are dropped after each test).
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Read at import time by the backend modules, so set before importing them
+_state_dir = tempfile.mkdtemp(prefix="portfolio-tests-")
+os.environ.setdefault("LOCAL_STATE_DIR", f"{_state_dir}/local_state")
+os.environ.setdefault("CONTACT_ARCHIVE_DIR", f"{_state_dir}/archive")
+
+import httpx
+import pytest
+
+ADMIN_PASSWORD = "test-password"
+os.environ["ADMIN_PASSWORD"] = ADMIN_PASSWORD
+os.environ.pop("ADMIN_PASSWORD_HASH", None)
+
+
+def _alembic(url: str, action: str, revision: str):
+    from alembic import command
+    from alembic.config import Config
+
+    previous = os.environ.get("DATABASE_URL")
+    os.environ["DATABASE_URL"] = url
+    try:
+        getattr(command, action)(Config(str(BACKEND_DIR / "alembic.ini")), revision)
+    finally:
+        if previous is None:
+            os.environ.pop("DATABASE_URL", None)
+        else:
+            os.environ["DATABASE_URL"] = previous
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def database_url(request, tmp_path):
+    if request.param == "sqlite":
+        url = f"sqlite:///{tmp_path}/test.db"
+    else:
+        url = os.environ.get("TEST_POSTGRES_URL")
+        if not url:
+            pytest.skip("TEST_POSTGRES_URL is not set")
+    _alembic(url, "upgrade", "head")
+    yield url
+    if request.param == "postgres":
+        _alembic(url, "downgrade", "base")
+
+
+@pytest.fixture
+async def db(database_url):
+    from database import Database
+
+    database = Database(database_url)
+    await database.connect()
+    yield database
+    await database.disconnect()
+
+
+@pytest.fixture
+async def app(database_url):
+    from server import create_app
+    from settings import Settings
+
+    application = create_app(Settings(
+        database_url=database_url, run_background_tasks=False, seed_initial_data=False, log_format="text"
+    ))
+    await application.router.startup()
+    yield application
+    await application.router.shutdown()
+
+
+@pytest.fixture
+async def client(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as test_client:
+        yield test_client
+
+
+@pytest.fixture
+async def admin_client(client):
+    response = await client.post("/api/admin/login", json={"username": "admin", "password": ADMIN_PASSWORD})
+    # The login cookie is Secure, which httpx will not send to the plain-http test server
+    client.cookies.clear()
+    client.cookies.set("session_id", response.json()["session_id"])
+    return client
+
+
+def reflection_body(**overrides) -> dict:
+    body = {
+        "title": "A reflection",
+        "excerpt": "An excerpt",
+        "content": "Some words about balance.",
+        "category": "blog",
+        "tags": ["balance"],
+    }
+    body.update(overrides)
+    return body
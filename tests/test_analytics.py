@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from tests.conftest import reflection_body
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_counters_flushing_into_the_same_bucket_keep_every_visitor(db, database_url):
+    from analytics import HyperLogLog, ViewCounter
+    from database import Database
+    from models import ReflectionCreate
+
+    reflection = await db.create_reflection(ReflectionCreate(**reflection_body()).dict())
+    other_worker = Database(database_url)
+    await other_worker.connect()
+    try:
+        first, second = ViewCounter(), ViewCounter()
+        for i in range(200):
+            first.record_view(reflection.id, f"first-{i}")
+            second.record_view(reflection.id, f"second-{i}")
+        second.record_view(reflection.id, "second-0")
+
+        # Both buckets are new, so both workers race to create the row
+        await asyncio.gather(first.flush(db), second.flush(other_worker))
+    finally:
+        await other_worker.disconnect()
+
+    rows = await db.get_reflection_stats(first._current_bucket, reflection.id)
+    assert len(rows) == 1
+    assert rows[0]["views"] == 401
+    assert HyperLogLog(rows[0]["visitors_hll"]).count() == pytest.approx(400, rel=0.05)
+
+
+async def test_flushing_views_without_visitors_keeps_stored_visitors(db):
+    from analytics import HyperLogLog, ViewCounter
+    from models import ReflectionCreate
+
+    reflection = await db.create_reflection(ReflectionCreate(**reflection_body()).dict())
+    counter = ViewCounter()
+    for i in range(50):
+        counter.record_view(reflection.id, f"visitor-{i}")
+    await counter.flush(db)
+    counter.record_view(reflection.id)
+    await counter.flush(db)
+
+    rows = await db.get_reflection_stats(counter._current_bucket, reflection.id)
+    assert rows[0]["views"] == 51
+    assert HyperLogLog(rows[0]["visitors_hll"]).count() == pytest.approx(50, rel=0.05)
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+import pytest
+
+from tests.conftest import ADMIN_PASSWORD
+
+pytestmark = pytest.mark.anyio
+
+
+async def login(client, username="admin", password=ADMIN_PASSWORD):
+    return await client.post("/api/admin/login", json={"username": username, "password": password})
+
+
+async def test_login_with_the_right_password(client):
+    response = await login(client)
+    assert response.status_code == 200 and response.json()["success"]
+    assert (await login(client, password="wrong")).json()["success"] is False
+
+
+async def test_wrong_username_is_still_checked_against_a_hash(client, monkeypatch):
+    import auth
+
+    checked = []
+    verify = auth.verify_password
+
+    def spy(password, hashed):
+        checked.append(hashed)
+        return verify(password, hashed)
+
+    monkeypatch.setattr(auth, "verify_password", spy)
+    # Even the right password fails for the wrong user, after a full verification
+    response = await login(client, username="someone", password=ADMIN_PASSWORD)
+
+    assert response.json()["success"] is False
+    assert checked == [auth._dummy_hash]
+    assert checked[0].startswith("$argon2") and checked[0] != auth._admin_password_hash
+
+
+async def test_logins_beyond_the_pending_limit_get_a_429(client, monkeypatch):
+    import auth
+
+    await login(client)  # hash ADMIN_PASSWORD up front
+    release = threading.Event()
+    verify = auth.verify_password
+
+    def slow_verify(password, hashed):
+        release.wait(5)
+        return verify(password, hashed)
+
+    monkeypatch.setattr(auth, "verify_password", slow_verify)
+    monkeypatch.setattr(auth, "MAX_PENDING_HASHES", 2)
+    waiting = [asyncio.create_task(login(client)) for _ in range(2)]
+    try:
+        while auth._pending_hashes < 2:
+            await asyncio.sleep(0.01)
+        response = await login(client)
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+    finally:
+        release.set()
+    assert [(await task).json()["success"] for task in waiting] == [True, True]
+    assert auth._pending_hashes == 0
+    assert (await login(client)).status_code == 200
+
+
+def test_current_argon2_hashes_do_not_need_an_update():
+    from auth import hash_password, password_context, verify_password
+
+    hashed = hash_password("secret")
+    assert hashed.startswith("$argon2id$")
+    assert verify_password("secret", hashed) and not verify_password("other", hashed)
+    assert not password_context().needs_update(hashed)
+
+
+def test_weaker_argon2_hashes_need_an_update():
+    from passlib.hash import argon2
+
+    from auth import ARGON2_MEMORY_COST, password_context, verify_password
+
+    weaker = argon2.using(memory_cost=ARGON2_MEMORY_COST // 2).hash("secret")
+    assert verify_password("secret", weaker)
+    assert password_context().needs_update(weaker)
+
+
+def test_bcrypt_hashes_verify_but_need_an_update():
+    pytest.importorskip("bcrypt")
+    from passlib.hash import bcrypt
+
+    from auth import password_context, verify_password
+
+    hashed = bcrypt.using(rounds=4).hash("secret")
+    assert verify_password("secret", hashed) and not verify_password("other", hashed)
+    assert password_context().needs_update(hashed)
+
+
+def test_malformed_hashes_do_not_verify():
+    from auth import verify_password
+
+    assert not verify_password("secret", "not-a-hash")
+    assert not verify_password("secret", "")
@@ -0,0 +1,68 @@
+import pytest
+
+from tests.conftest import reflection_body
+
+pytestmark = pytest.mark.anyio
+
+
+async def create(client, **overrides):
+    return (await client.post("/api/reflections", json=reflection_body(**overrides))).json()["id"]
+
+
+async def get_batch(client, ids):
+    return await client.get("/api/reflections/batch", params={"ids": ",".join(ids)})
+
+
+async def post_batch(client, ids):
+    return await client.post("/api/reflections/batch", json={"ids": ids})
+
+
+@pytest.fixture(params=["get", "post"])
+def batch(request):
+    return get_batch if request.param == "get" else post_batch
+
+
+async def test_reflections_come_back_in_the_order_requested(admin_client, batch):
+    ids = [await create(admin_client, title=f"Post {i}") for i in range(3)]
+    requested = [ids[2], ids[0], ids[1]]
+
+    response = await batch(admin_client, requested)
+    assert response.status_code == 200
+    assert [r["id"] for r in response.json()["reflections"]] == requested
+    assert response.json()["missing"] == []
+
+
+async def test_missing_and_unpublished_ids_are_reported(admin_client, batch):
+    published = await create(admin_client)
+    draft = await create(admin_client, published=False)
+
+    response = await batch(admin_client, ["nope", published, draft])
+    assert response.status_code == 200
+    assert [r["id"] for r in response.json()["reflections"]] == [published]
+    assert response.json()["missing"] == ["nope", draft]
+
+
+async def test_duplicate_ids_are_returned_once(admin_client, batch):
+    first, second = await create(admin_client), await create(admin_client)
+
+    response = await batch(admin_client, [second, first, second, "gone", "gone"])
+    assert [r["id"] for r in response.json()["reflections"]] == [second, first]
+    assert response.json()["missing"] == ["gone"]
+
+
+async def test_get_caps_the_number_of_ids(admin_client):
+    assert (await get_batch(admin_client, [f"id-{i}" for i in range(100)])).status_code == 200
+    response = await get_batch(admin_client, [f"id-{i}" for i in range(101)])
+    assert response.status_code == 400
+    # Duplicates and blanks do not count towards the cap
+    assert (await get_batch(admin_client, ["a"] * 150 + [""] * 10)).status_code == 200
+
+
+async def test_post_caps_the_number_of_ids(admin_client):
+    assert (await post_batch(admin_client, [f"id-{i}" for i in range(100)])).status_code == 200
+    assert (await post_batch(admin_client, [f"id-{i}" for i in range(101)])).status_code == 422
+    assert (await post_batch(admin_client, [])).status_code == 422
+
+
+async def test_no_ids_is_a_400(client):
+    assert (await client.get("/api/reflections/batch", params={"ids": " , ,"})).status_code == 400
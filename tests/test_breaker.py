@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from breaker import CircuitBreaker, CircuitOpenError, CircuitState, GuardedDatabase
+
+pytestmark = pytest.mark.anyio
+
+
+async def ok():
+    return "ok"
+
+
+async def boom():
+    raise RuntimeError("connection refused")
+
+
+async def hang():
+    await asyncio.sleep(10)
+
+
+def breaker(**overrides):
+    options = {"timeout": 0.05, "window": 10, "failure_rate": 0.5, "min_calls": 4, "open_seconds": 0.05}
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+async def fail(circuit, times, func=boom):
+    for _ in range(times):
+        with pytest.raises((RuntimeError, TimeoutError)):
+            await circuit.call(func)
+
+
+async def test_opens_once_the_failure_rate_is_reached():
+    circuit = breaker()
+    await circuit.call(ok)
+    await circuit.call(ok)
+    await fail(circuit, 1)
+    assert circuit.state == CircuitState.CLOSED  # 1 of 3 calls, below min_calls
+    await fail(circuit, 1)
+    assert circuit.state == CircuitState.OPEN
+    assert circuit.trips == 1
+
+
+async def test_fails_fast_while_open():
+    circuit = breaker(open_seconds=60)
+    await fail(circuit, 4)
+    calls = []
+
+    async def counted():
+        calls.append(1)
+
+    with pytest.raises(CircuitOpenError):
+        await circuit.call(counted)
+    assert calls == [] and circuit.rejected == 1
+
+
+async def test_timeouts_count_as_failures():
+    circuit = breaker()
+    await fail(circuit, 4, func=hang)
+    assert circuit.state == CircuitState.OPEN
+
+
+async def test_half_open_trial_closes_the_circuit():
+    circuit = breaker()
+    await fail(circuit, 4)
+    await asyncio.sleep(0.06)
+    assert await circuit.call(ok) == "ok"
+    assert circuit.state == CircuitState.CLOSED
+
+
+async def test_half_open_trial_failure_reopens_it():
+    circuit = breaker()
+    await fail(circuit, 4)
+    await asyncio.sleep(0.06)
+    await fail(circuit, 1)
+    assert circuit.state == CircuitState.OPEN
+    assert circuit.trips == 2
+
+
+async def test_only_one_trial_call_at_a_time():
+    circuit = breaker(timeout=1.0)
+    await fail(circuit, 4)
+    await asyncio.sleep(0.06)
+    release = asyncio.Event()
+
+    async def trial():
+        await release.wait()
+        return "ok"
+
+    first = asyncio.ensure_future(circuit.call(trial))
+    await asyncio.sleep(0)
+    assert circuit.state == CircuitState.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        await circuit.call(ok)
+    release.set()
+    assert await first == "ok"
+    assert circuit.state == CircuitState.CLOSED
+
+
+class FakeTransaction:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeDatabase:
+    def transaction(self):
+        return FakeTransaction()
+
+    async def execute(self, query, values=None):
+        if query == "bad":
+            raise RuntimeError("connection refused")
+        return 1
+
+
+async def test_a_transaction_counts_as_one_call():
+    circuit = breaker()
+    database = GuardedDatabase(FakeDatabase(), circuit)
+    async with database.transaction():
+        for _ in range(5):
+            await database.execute("good")
+    assert list(circuit._results) == [True]
+
+    with pytest.raises(RuntimeError):
+        async with database.transaction():
+            await database.execute("good")
+            await database.execute("bad")
+    assert list(circuit._results) == [True, False]
+
+
+async def test_transactions_are_refused_while_open():
+    circuit = breaker(open_seconds=60)
+    database = GuardedDatabase(FakeDatabase(), circuit)
+    await fail(circuit, 4)
+    with pytest.raises(CircuitOpenError):
+        async with database.transaction():
+            pass
+
+
+async def test_a_caller_error_inside_a_transaction_is_not_a_database_failure():
+    circuit = breaker()
+    database = GuardedDatabase(FakeDatabase(), circuit)
+    with pytest.raises(ValueError):
+        async with database.transaction():
+            await database.execute("good")
+            raise ValueError("bad input")
+    assert list(circuit._results) == [True]
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import ReflectionCreate
+
+pytestmark = pytest.mark.anyio
+
+CATEGORIES = ["blog", "journal", "artwork"]
+TAGS = ["yoga", "markets", "breath"]
+
+
+async def create(db, i, **overrides):
+    values = ReflectionCreate(
+        title=f"Post {i}", excerpt="An excerpt", content="Some words", category=CATEGORIES[i % 3],
+        tags=[TAGS[i % 3], TAGS[(i + 1) % 3]] if i % 2 else [TAGS[i % 3]],
+    ).dict()
+    values["date"] = datetime(2024, 1, 1) + timedelta(days=i)
+    values.update(overrides)
+    return await db.create_reflection(values)
+
+
+async def assert_catalogue_matches_database(db):
+    every = await db.get_reflections(published_only=False)
+    published = [r for r in every if r.published]
+    for category in [None, *CATEGORIES]:
+        for tag in [None, *TAGS, "unknown"]:
+            expected = [
+                r.id for r in sorted(published, key=lambda r: r.date, reverse=True)
+                if (category is None or r.category.value == category) and (tag is None or tag in r.tags)
+            ]
+            assert db.catalogue.ids(category=category, tag=tag) == expected, (category, tag)
+            assert db.catalogue.count(category=category, tag=tag) == len(expected)
+            assert [r.id for r in await db.get_reflections(category=category, tag=tag)] == expected
+
+
+async def test_catalogue_follows_creates_updates_and_deletes(db):
+    await db.load_catalogue()
+    posts = [await create(db, i) for i in range(9)]
+    await create(db, 9, published=False)
+    await assert_catalogue_matches_database(db)
+
+    await db.update_reflection(posts[0].id, {"tags": ["markets", "new-tag"], "category": "journal"})
+    await db.update_reflection(posts[1].id, {"published": False})
+    await db.update_reflection(posts[2].id, {"date": datetime(2030, 1, 1)})
+    await db.delete_reflection(posts[3].id)
+    await assert_catalogue_matches_database(db)
+    assert db.catalogue.ids(tag="new-tag") == [posts[0].id]
+
+    await db.update_reflection(posts[1].id, {"published": True})
+    await assert_catalogue_matches_database(db)
+
+
+async def test_reload_matches_incremental_updates(db):
+    await db.load_catalogue()
+    posts = [await create(db, i) for i in range(6)]
+    await db.update_reflection(posts[4].id, {"tags": ["breath"]})
+    await db.delete_reflection(posts[5].id)
+    incremental = {(c, t): db.catalogue.ids(category=c, tag=t) for c in [None, *CATEGORIES] for t in [None, *TAGS]}
+
+    await db.load_catalogue()
+    assert {(c, t): db.catalogue.ids(category=c, tag=t) for c in [None, *CATEGORIES] for t in [None, *TAGS]} == incremental
+
+
+async def test_tag_lists_work_before_the_catalogue_loads(db):
+    posts = [await create(db, i) for i in range(4)]
+    assert not db.catalogue.loaded
+    assert [r.id for r in await db.get_reflections(tag="yoga")] == [
+        p.id for p in sorted(posts, key=lambda p: p.date, reverse=True) if "yoga" in p.tags
+    ]
+
+
+def test_ids_that_are_not_uuids_and_shared_prefixes():
+    from catalogue import ReflectionCatalogue
+
+    catalogue = ReflectionCatalogue()
+    same_prefix = ["12345678-9abc-def0-0000-000000000001", "12345678-9abc-def0-0000-000000000002"]
+    catalogue.load([
+        (same_prefix[0], datetime(2024, 1, 3), "blog", ["a"]),
+        (same_prefix[1], datetime(2024, 1, 2), "blog", ["b"]),
+        ("legacy-id", datetime(2024, 1, 1), "journal", ["a"]),
+    ])
+    assert catalogue.ids() == [*same_prefix, "legacy-id"]
+    assert catalogue.remove(same_prefix[1])
+    assert not catalogue.remove(same_prefix[1])
+    assert catalogue.remove("legacy-id")
+    assert catalogue.ids() == [same_prefix[0]]
+    assert catalogue.tag_counts() == {"a": 1}
+
+
+def test_compaction_keeps_live_posts(monkeypatch):
+    import catalogue as catalogue_module
+    from catalogue import ReflectionCatalogue
+
+    monkeypatch.setattr(catalogue_module, "COMPACT_MIN_DEAD", 4)
+    catalogue = ReflectionCatalogue()
+    catalogue.load([])
+    for i in range(10):
+        catalogue.upsert(f"00000000-0000-0000-0000-{i:012d}", datetime(2024, 1, 1 + i), "blog", ["a"], True)
+    for i in range(7):
+        catalogue.remove(f"00000000-0000-0000-0000-{i:012d}")
+
+    assert len(catalogue._dates) < 10
+    assert catalogue.ids(tag="a") == [f"00000000-0000-0000-0000-{i:012d}" for i in (9, 8, 7)]
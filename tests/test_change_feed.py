@@ -0,0 +1,66 @@
+import pytest
+
+from tests.conftest import reflection_body
+
+pytestmark = pytest.mark.anyio
+
+
+async def changes(client, since=0, limit=100):
+    response = await client.get("/api/reflections/changes", params={"since": since, "limit": limit})
+    assert response.status_code == 200
+    return response.json()
+
+
+async def test_delete_leaves_a_tombstone(admin_client):
+    created = (await admin_client.post("/api/reflections", json=reflection_body())).json()
+    start = await changes(admin_client)
+    assert [(c["id"], c["type"]) for c in start["changes"]] == [(created["id"], "upsert")]
+
+    response = await admin_client.delete(f"/api/reflections/{created['id']}")
+    assert response.status_code == 200
+
+    after = await changes(admin_client, since=start["next_since"])
+    assert [(c["id"], c["type"], c["reflection"]) for c in after["changes"]] == [(created["id"], "delete", None)]
+    assert after["next_since"] > start["next_since"]
+    # From the beginning, the row only shows at its latest change
+    assert [c["type"] for c in (await changes(admin_client))["changes"]] == ["delete"]
+
+
+async def test_deleting_a_missing_reflection_is_a_404(admin_client):
+    start = await changes(admin_client)
+    response = await admin_client.delete("/api/reflections/does-not-exist")
+    assert response.status_code == 404
+    assert (await changes(admin_client, since=start["next_since"]))["changes"] == []
+
+
+async def test_unpublishing_reports_a_delete_and_republishing_an_upsert(admin_client):
+    created = (await admin_client.post("/api/reflections", json=reflection_body())).json()
+    cursor = (await changes(admin_client))["next_since"]
+
+    await admin_client.put(f"/api/reflections/{created['id']}", json={"published": False})
+    page = await changes(admin_client, since=cursor)
+    assert [(c["type"], c["reflection"]) for c in page["changes"]] == [("delete", None)]
+
+    await admin_client.put(f"/api/reflections/{created['id']}", json={"published": True, "title": "Back"})
+    page = await changes(admin_client, since=page["next_since"])
+    assert [(c["type"], c["reflection"]["title"]) for c in page["changes"]] == [("upsert", "Back")]
+
+
+async def test_cursor_pages_through_changes_in_order(admin_client):
+    ids = [(await admin_client.post("/api/reflections", json=reflection_body(title=f"Post {i}"))).json()["id"]
+           for i in range(5)]
+    await admin_client.delete(f"/api/reflections/{ids[1]}")
+
+    seen, cursor, has_more = [], 0, True
+    while has_more:
+        page = await changes(admin_client, since=cursor, limit=2)
+        assert len(page["changes"]) <= 2
+        seen.extend(page["changes"])
+        cursor, has_more = page["next_since"], page["has_more"]
+
+    sequence = [c["seq"] for c in seen]
+    assert sequence == sorted(sequence) and len(set(sequence)) == len(sequence)
+    assert [(c["id"], c["type"]) for c in seen] == (
+        [(i, "upsert") for i in ids if i != ids[1]] + [(ids[1], "delete")]
+    )
+    assert (await changes(admin_client, since=cursor)) == {"changes": [], "next_since": cursor, "has_more": False}
@@ -0,0 +1,165 @@
+import gzip
+
+import httpx
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+BODY = b'{"words":"' + b"balance " * 200 + b'"}'
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip", "gzip"),
+    ("gzip, deflate", "gzip"),
+    ("identity", None),
+    ("gzip;q=0", None),
+    ("*", "gzip"),
+    ("*;q=0.5, gzip;q=0", None),
+    ("deflate;q=1, gzip;q=0.1", "gzip"),
+    ("GZIP", "gzip"),
+    ("gzip;q=bad", None),
+])
+def test_choose_encoding_without_brotli(accept, expected, monkeypatch):
+    import compression
+
+    monkeypatch.setattr(compression, "brotli", None)
+    assert compression.choose_encoding(accept) == expected
+    assert compression.choose_encoding("br") is None
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("br;q=0, *", "gzip"),
+    ("*", "br"),
+])
+def test_choose_encoding_with_brotli(accept, expected):
+    import compression
+
+    pytest.importorskip("brotli")
+    assert compression.choose_encoding(accept) == expected
+
+
+def make_app(responses, calls=None):
+    """ASGI app answering each path with a fixed (status, headers, body chunks)"""
+
+    async def app(scope, receive, send):
+        if calls is not None:
+            calls.append(scope["path"])
+        status, headers, chunks = responses[scope["path"]]
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(k.encode(), v.encode()) for k, v in headers.items()]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+
+    return app
+
+
+async def fetch(middleware, path, accept="gzip", method="GET"):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test") as client:
+        return await client.request(method, path, headers={"Accept-Encoding": accept})
+
+
+def json_response(body=BODY, **headers):
+    return 200, {"content-type": "application/json", **headers}, [body]
+
+
+async def test_large_json_is_gzipped_with_a_weak_etag():
+    from compression import CompressionMiddleware
+
+    middleware = CompressionMiddleware(make_app({"/a": json_response(etag='"v1"', vary="Cookie")}))
+    response = await fetch(middleware, "/a")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == BODY
+    assert response.headers["etag"] == 'W/"v1"'
+    assert response.headers["vary"] == "Cookie, Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BODY)
+
+
+@pytest.mark.parametrize("path, response", [
+    ("/small", json_response(b'{"ok":true}')),
+    ("/image", (200, {"content-type": "image/webp"}, [BODY])),
+    ("/encoded", json_response(**{"content-encoding": "br"})),
+    ("/events", (200, {"content-type": "text/event-stream"}, [BODY, BODY])),
+    ("/not-modified", (304, {"content-type": "application/json", "etag": '"v1"'}, [b""])),
+])
+async def test_responses_left_alone(path, response):
+    from compression import CompressionMiddleware
+
+    middleware = CompressionMiddleware(make_app({path: response}))
+    result = await fetch(middleware, path)
+    assert "vary" not in result.headers or "Accept-Encoding" not in result.headers["vary"]
+    assert result.headers.get("content-encoding") == response[1].get("content-encoding")
+
+
+async def test_no_accept_encoding_means_no_compression():
+    from compression import CompressionMiddleware
+
+    middleware = CompressionMiddleware(make_app({"/a": json_response()}))
+    response = await fetch(middleware, "/a", accept="identity")
+    assert "content-encoding" not in response.headers
+    assert response.content == BODY
+
+
+async def test_streamed_responses_are_compressed_chunk_by_chunk():
+    from compression import CompressionMiddleware
+
+    chunks = [b"line %d\n" % i * 50 for i in range(5)]
+    middleware = CompressionMiddleware(make_app({"/stream": (200, {"content-type": "text/plain"}, chunks)}))
+    response = await fetch(middleware, "/stream")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == b"".join(chunks)
+
+
+async def test_repeated_responses_are_compressed_once():
+    from compression import CompressionMiddleware
+
+    middleware = CompressionMiddleware(make_app({"/a": json_response(etag='"v1"')}))
+    for _ in range(3):
+        assert (await fetch(middleware, "/a")).content == BODY
+    assert (middleware.cache.misses, middleware.cache.hits) == (1, 2)
+
+
+async def test_same_etag_on_different_paths_is_cached_separately():
+    from compression import CompressionMiddleware
+
+    other = b'{"other":"' + b"yoga " * 200 + b'"}'
+    middleware = CompressionMiddleware(make_app({
+        "/a": json_response(etag='"same"'),
+        "/b": json_response(other, etag='"same"'),
+    }))
+    assert (await fetch(middleware, "/a")).content == BODY
+    assert (await fetch(middleware, "/b")).content == other
+    assert gzip.decompress(middleware.cache.get("/b", '"same"', "gzip")) == other
+
+
+async def test_uncacheable_responses_skip_the_cache():
+    from compression import CompressionMiddleware
+
+    middleware = CompressionMiddleware(make_app({
+        "/private": json_response(**{"cache-control": "private"}),
+        "/no-store": json_response(**{"cache-control": "no-store"}),
+    }))
+    for path in ("/private", "/no-store"):
+        response = await fetch(middleware, path)
+        assert response.content == BODY and "etag" not in response.headers
+    assert (await fetch(middleware, "/private", method="POST")).content == BODY
+    assert middleware.cache.hits == middleware.cache.misses == 0
+
+
+def test_cache_evicts_least_recently_used():
+    from compression import CompressedBodyCache
+
+    cache = CompressedBodyCache(max_entries=2, max_bytes=10)
+    cache.put("/a", "e", "gzip", b"aaaa")
+    cache.put("/b", "e", "gzip", b"bbbb")
+    assert cache.get("/a", "e", "gzip") == b"aaaa"
+    cache.put("/c", "e", "gzip", b"cccc")
+    assert cache.get("/b", "e", "gzip") is None
+    # Over the byte budget on its own, so never stored
+    cache.put("/d", "e", "gzip", b"d" * 11)
+    assert cache.get("/d", "e", "gzip") is None
+    assert cache.get("/a", "e", "gzip") == b"aaaa" and cache.get("/c", "e", "gzip") == b"cccc"
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pytest
+
+from contact_partitions import ContactArchiver, add_months, inbox_since, month_start, read_archive
+from database import CONTACT_ARCHIVE_LOCK
+from models import ContactSubmission
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+async def store(db, submitted_at, name="Asha"):
+    submission = ContactSubmission(
+        name=name, email="asha@example.com", reason="yoga", message="Weekend classes?", submitted_at=submitted_at
+    )
+    await db.restore_contact_submission(submission)
+    return submission
+
+
+def archived_ids(directory):
+    return sorted(s.id for path in sorted(directory.glob("*.ndjson.gz")) for s in read_archive(path))
+
+
+def test_month_arithmetic():
+    assert month_start(NOW) == datetime(2026, 10, 1)
+    assert add_months(datetime(2026, 11, 1), 2) == datetime(2027, 1, 1)
+    assert add_months(datetime(2026, 1, 1), -13) == datetime(2024, 12, 1)
+    assert inbox_since(3, NOW) == datetime(2026, 8, 1)
+
+
+async def test_months_past_retention_are_archived_and_removed(db, tmp_path):
+    expired = [await store(db, datetime(2025, 8, 3)), await store(db, datetime(2025, 9, 30, 23, 59))]
+    kept = await store(db, datetime(2025, 10, 1))
+    archiver = ContactArchiver(db, retention_months=12, archive_dir=tmp_path)
+
+    assert await archiver.run_once(NOW) == 2
+
+    assert archived_ids(tmp_path) == sorted(s.id for s in expired)
+    assert [s.id for s in await db.get_contact_submissions()] == [kept.id]
+    # Nothing left to archive, and no empty files written
+    assert await archiver.run_once(NOW) == 0
+    assert len(list(tmp_path.glob("*.ndjson.gz"))) == 2
+
+
+async def test_archive_round_trips_every_field(db, tmp_path):
+    original = await store(db, datetime(2024, 2, 29, 8, 30))
+    await ContactArchiver(db, retention_months=12, archive_dir=tmp_path).run_once(NOW)
+    [path] = tmp_path.glob("contacts-2024-02-*.ndjson.gz")
+    assert list(read_archive(path)) == [original]
+
+
+async def test_archiving_is_skipped_while_another_worker_holds_the_lock(db, database_url, tmp_path):
+    if database_url.startswith("sqlite"):
+        pytest.skip("advisory locks are Postgres only")
+    expired = await store(db, datetime(2025, 1, 15))
+    other = type(db)(database_url)
+    await other.connect()
+    try:
+        async with other.advisory_lock(CONTACT_ARCHIVE_LOCK) as locked:
+            assert locked
+            assert await ContactArchiver(db, retention_months=12, archive_dir=tmp_path).run_once(NOW) == 0
+            assert [s.id for s in await db.get_contact_submissions()] == [expired.id]
+    finally:
+        await other.disconnect()
+
+    assert await ContactArchiver(db, retention_months=12, archive_dir=tmp_path).run_once(NOW) == 1
+    assert archived_ids(tmp_path) == [expired.id]
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+import pytest
+
+import jobs
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+
+async def submit(client):
+    response = await client.post("/api/contact", json={
+        "name": "Asha", "email": "asha@example.com", "reason": "yoga", "message": "Do you run weekend classes?",
+    })
+    assert response.status_code == 200
+
+
+async def queued_notifications(db):
+    return [job for job in await db.claim_due_jobs(10, timedelta(minutes=5)) if job.kind == "contact.notify"]
+
+
+async def test_no_notification_is_queued_without_a_webhook(client, app, monkeypatch):
+    monkeypatch.delenv("CONTACT_WEBHOOK_URL", raising=False)
+    await submit(client)
+    assert await queued_notifications(app.state.db) == []
+
+
+async def test_submission_is_posted_to_the_webhook(client, app, monkeypatch):
+    monkeypatch.setenv("CONTACT_WEBHOOK_URL", "https://hooks.example.com/contact")
+    posted = []
+    monkeypatch.setattr("requests.post", lambda url, **kwargs: posted.append((url, kwargs)) or FakeResponse())
+
+    await submit(client)
+    [job] = await queued_notifications(app.state.db)
+    await jobs.notify_contact_submission(app.state.db, job.payload)
+
+    [(url, kwargs)] = posted
+    assert url == "https://hooks.example.com/contact"
+    assert "Asha <asha@example.com> (yoga)" in kwargs["data"]
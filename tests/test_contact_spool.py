@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from local_state import ContactSpool
+from models import ContactSubmission
+
+pytestmark = pytest.mark.anyio
+
+
+def submission(name="Asha"):
+    return ContactSubmission(name=name, email="asha@example.com", reason="yoga", message="Weekend classes?")
+
+
+class RecordingJobs:
+    def __init__(self):
+        self.enqueued = []
+
+    async def enqueue(self, kind, payload):
+        self.enqueued.append((kind, payload["submission_id"]))
+
+
+class FlakyDatabase:
+    """Stores submissions, failing once `fail_after` have been stored"""
+
+    def __init__(self, fail_after=None):
+        self.stored = []
+        self.fail_after = fail_after
+
+    async def restore_contact_submission(self, contact):
+        await asyncio.sleep(0.001)
+        if self.fail_after is not None and len(self.stored) >= self.fail_after:
+            raise ConnectionError("database unavailable")
+        if contact.id in self.stored:
+            return False
+        self.stored.append(contact.id)
+        return True
+
+
+async def test_replay_stores_everything_and_empties_the_spool(tmp_path):
+    spool, jobs = ContactSpool(tmp_path / "spool.jsonl"), RecordingJobs()
+    first, second = submission("Asha"), submission("Ravi")
+    spool.append(first, notify=True)
+    spool.append(second, notify=False)
+
+    db = FlakyDatabase()
+    assert await spool.replay(db, jobs) == 2
+    assert db.stored == [first.id, second.id]
+    assert jobs.enqueued == [("contact.notify", first.id)]
+    assert not spool.pending()
+
+
+async def test_unstored_submissions_stay_spooled(tmp_path):
+    spool, jobs = ContactSpool(tmp_path / "spool.jsonl"), RecordingJobs()
+    submissions = [submission(f"Sender {i}") for i in range(3)]
+    for contact in submissions:
+        spool.append(contact, notify=True)
+
+    assert await spool.replay(FlakyDatabase(fail_after=1), jobs) == 1
+    assert spool.pending()
+
+    db = FlakyDatabase()
+    assert await spool.replay(db, jobs) == 2
+    assert db.stored == [contact.id for contact in submissions[1:]]
+    assert not spool.pending()
+
+
+async def test_already_stored_submissions_are_not_notified_twice(tmp_path):
+    spool, jobs = ContactSpool(tmp_path / "spool.jsonl"), RecordingJobs()
+    contact = submission()
+    db = FlakyDatabase()
+    await db.restore_contact_submission(contact)
+    spool.append(contact, notify=True)
+
+    await spool.replay(db, jobs)
+    assert jobs.enqueued == []
+
+
+async def test_workers_sharing_a_spool_replay_each_line_once(tmp_path):
+    # One ContactSpool per worker process, all pointed at the same file
+    path = tmp_path / "spool.jsonl"
+    workers = [ContactSpool(path) for _ in range(3)]
+    for i in range(10):
+        workers[i % 3].append(submission(f"Sender {i}"), notify=True)
+
+    db, jobs = FlakyDatabase(), RecordingJobs()
+    replayed = await asyncio.gather(*(worker.replay(db, jobs) for worker in workers))
+
+    assert sum(replayed) == 10
+    assert len(db.stored) == len(set(db.stored)) == 10
+    assert len(jobs.enqueued) == 10
+
+
+async def test_restore_reports_whether_the_row_was_inserted(db):
+    contact = submission()
+    assert await db.restore_contact_submission(contact) is True
+    assert await db.restore_contact_submission(contact) is False
+    assert (await db.get_contact_submission(contact.id)).name == "Asha"
+
+
+async def test_contact_posted_during_an_outage_is_stored_once_the_database_is_back(client, app, tmp_path):
+    db, spool = app.state.db, app.state.contact_spool
+    spool.path = tmp_path / "spool.jsonl"
+    db.breaker._open()
+    db.breaker.open_seconds = 60
+
+    response = await client.post("/api/contact", json={
+        "name": "Asha", "email": "asha@example.com", "reason": "yoga", "message": "Do you run weekend classes?",
+    })
+    assert response.status_code == 200
+    assert spool.pending()
+
+    db.breaker.open_seconds = 0
+    assert await spool.replay(db, app.state.job_runner) == 1
+    assert [s.name for s in await db.get_contact_submissions()] == ["Asha"]
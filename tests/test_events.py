@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def messages(batch):
+    """(event type, id) of each event message in a batch, skipping retry hints and heartbeats"""
+    parsed = []
+    for message in batch:
+        fields = dict(line.split(": ", 1) for line in message.decode().strip().split("\n"))
+        if "event" in fields:
+            parsed.append((fields["event"], fields.get("id")))
+    return parsed
+
+
+async def test_subscribers_get_published_events():
+    from events import EventBroadcaster
+
+    events = EventBroadcaster()
+    sub = events.subscribe()
+    first = events.publish("reflection.created", {"id": "a"})
+    events.publish("reflection.deleted", {"id": "a"})
+
+    batch = await asyncio.wait_for(sub.next_batch(), 1)
+    assert batch[0] == b"retry: 5000\n\n"
+    assert messages(batch) == [
+        ("reflection.created", events.event_id(first.seq)),
+        ("reflection.deleted", events.event_id(first.seq + 1)),
+    ]
+    assert batch[1] == b'id: %s\nevent: reflection.created\ndata: {"id":"a"}\n\n' % events.event_id(1).encode()
+
+
+async def test_last_event_id_resumes_after_that_event():
+    from events import EventBroadcaster
+
+    events = EventBroadcaster()
+    seen = [events.publish("reflection.updated", {"id": str(i)}) for i in range(5)]
+
+    sub = events.subscribe(events.event_id(seen[2].seq))
+    assert [seq for _, seq in messages(await sub.next_batch())] == [events.event_id(4), events.event_id(5)]
+
+    caught_up = events.subscribe(events.event_id(seen[-1].seq))
+    assert messages(await caught_up.next_batch()) == []
+
+
+@pytest.mark.parametrize("last_event_id", [
+    "another-epoch-3",
+    "garbage",
+    "{epoch}-99",
+    "{epoch}-1",
+])
+async def test_unresumable_ids_get_a_reset(last_event_id):
+    from events import EventBroadcaster
+
+    events = EventBroadcaster(log_size=3)
+    for i in range(5):
+        events.publish("reflection.updated", {"id": str(i)})
+
+    # Event 1 has left the three-event log, so 2 onwards cannot be replayed
+    sub = events.subscribe(last_event_id.format(epoch=events.epoch))
+    assert messages(await sub.next_batch()) == [("reset", events.event_id(5))]
+
+
+async def test_resuming_from_the_oldest_logged_predecessor_replays_the_log():
+    from events import EventBroadcaster
+
+    events = EventBroadcaster(log_size=3)
+    for i in range(5):
+        events.publish("reflection.updated", {"id": str(i)})
+
+    sub = events.subscribe(events.event_id(2))
+    assert [seq for _, seq in messages(await sub.next_batch())] == [events.event_id(s) for s in (3, 4, 5)]
+
+
+async def test_replay_longer_than_the_backlog_is_delivered(monkeypatch):
+    import events as events_module
+    from events import EventBroadcaster
+
+    monkeypatch.setattr(events_module, "SUBSCRIBER_BACKLOG", 4)
+    events = EventBroadcaster(log_size=20)
+    for i in range(10):
+        events.publish("reflection.updated", {"id": str(i)})
+
+    sub = events.subscribe(events.event_id(0))
+    assert len(messages(await sub.next_batch())) == 10
+    assert not sub.closed
+
+
+async def test_slow_subscribers_are_disconnected(monkeypatch):
+    import events as events_module
+    from events import EventBroadcaster
+
+    monkeypatch.setattr(events_module, "SUBSCRIBER_BACKLOG", 4)
+    events = EventBroadcaster()
+    slow, fast = events.subscribe(), events.subscribe()
+
+    for i in range(6):
+        events.publish("reflection.updated", {"id": str(i)})
+        await fast.next_batch()
+
+    assert slow.closed and not fast.closed
+    assert events.subscriber_count == 1
+    # The retry hint and the first three events filled its backlog; those are still delivered
+    assert len(messages(await slow.next_batch())) == 3
+    assert not slow.push(b"late")
+
+
+async def test_subscriber_limit(monkeypatch):
+    import events as events_module
+    from events import EventBroadcaster
+
+    monkeypatch.setattr(events_module, "MAX_SUBSCRIBERS", 2)
+    events = EventBroadcaster()
+    first = events.subscribe()
+    events.subscribe()
+    with pytest.raises(OverflowError):
+        events.subscribe()
+    events.unsubscribe(first)
+    events.subscribe()
+
+
+async def test_heartbeats_reach_idle_subscribers_and_stop_closes_streams():
+    from events import HEARTBEAT, EventBroadcaster
+
+    events = EventBroadcaster(heartbeat_interval=0.01)
+    sub = events.subscribe()
+    await sub.next_batch()
+    events.start()
+    try:
+        assert HEARTBEAT in await asyncio.wait_for(sub.next_batch(), 1)
+    finally:
+        await events.stop()
+    assert sub.closed and events.subscriber_count == 0
@@ -0,0 +1,72 @@
+from datetime import timedelta
+from email.utils import format_datetime, parsedate_to_datetime
+
+import pytest
+
+from tests.conftest import reflection_body
+
+pytestmark = pytest.mark.anyio
+
+FEEDS = ["/feed.xml", "/atom.xml", "/feed.json", "/sitemap.xml"]
+
+
+@pytest.fixture(params=FEEDS)
+def feed(request):
+    return request.param
+
+
+async def test_matching_etag_is_a_304(admin_client, feed):
+    await admin_client.post("/api/reflections", json=reflection_body())
+    first = await admin_client.get(feed)
+    assert first.status_code == 200 and first.content
+
+    response = await admin_client.get(feed, headers={"If-None-Match": first.headers["etag"]})
+    assert response.status_code == 304
+    assert response.content == b""
+    # The compressed 200 carries a weak W/ form of the same tag
+    assert response.headers["etag"].removeprefix("W/") == first.headers["etag"].removeprefix("W/")
+    assert response.headers["last-modified"] == first.headers["last-modified"]
+
+
+async def test_etag_list_and_weak_etags_match(client, feed):
+    etag = (await client.get(feed)).headers["etag"]
+    strong = etag.removeprefix("W/")
+    for header in (f'"other", {strong}', f"W/{strong}", "*"):
+        assert (await client.get(feed, headers={"If-None-Match": header})).status_code == 304
+
+
+async def test_changed_feed_has_a_new_etag(admin_client, feed):
+    before = await admin_client.get(feed)
+    await admin_client.post("/api/reflections", json=reflection_body(title="New post"))
+
+    response = await admin_client.get(feed, headers={"If-None-Match": before.headers["etag"]})
+    assert response.status_code == 200
+    assert response.headers["etag"] != before.headers["etag"]
+    assert b"New post" in response.content or feed == "/sitemap.xml"
+
+
+async def test_if_modified_since(client, feed):
+    first = await client.get(feed)
+    last_modified = parsedate_to_datetime(first.headers["last-modified"])
+
+    for since, status in [
+        (last_modified, 304),
+        (last_modified + timedelta(hours=1), 304),
+        (last_modified - timedelta(seconds=1), 200),
+    ]:
+        response = await client.get(feed, headers={"If-Modified-Since": format_datetime(since, usegmt=True)})
+        assert response.status_code == status
+    assert (await client.get(feed, headers={"If-Modified-Since": "not a date"})).status_code == 200
+
+
+async def test_if_none_match_takes_precedence_over_if_modified_since(client, feed):
+    last_modified = (await client.get(feed)).headers["last-modified"]
+    response = await client.get(feed, headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+    assert response.status_code == 200
+
+
+async def test_unchanged_feeds_are_not_rendered_again(app, client):
+    for _ in range(2):
+        for feed in FEEDS:
+            assert (await client.get(feed)).status_code == 200
+    assert app.state.feed_cache.renders == 1
@@ -0,0 +1,48 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def stale(app):
+    """Treat every probe as too old, including one that is in flight"""
+    app.state.health_monitor.stale_after = -1.0
+
+
+async def readyz(client):
+    response = await client.get("/readyz")
+    return response.status_code, response.json()["status"]
+
+
+async def test_ready_after_a_successful_probe(client, app):
+    await app.state.health_monitor.probe()
+    assert await readyz(client) == (200, "ready")
+
+
+async def test_degraded_but_serving_when_the_probe_is_stale_and_the_snapshot_is_loaded(client, app):
+    stale(app)
+    assert app.state.db.snapshot.loaded
+    assert await readyz(client) == (200, "degraded")
+
+
+async def test_unavailable_without_a_snapshot(client, app, monkeypatch):
+    stale(app)
+    monkeypatch.setattr(app.state.db.snapshot, "loaded", False)
+    assert await readyz(client) == (503, "unavailable")
+
+
+def test_server_and_probe_read_the_same_port(monkeypatch):
+    import probe
+    import settings
+
+    monkeypatch.setenv("PORT", "9123")
+    assert settings.Settings.from_env().port == 9123
+
+    connected = []
+
+    def create_connection(address, timeout):
+        connected.append(address)
+        raise OSError("refused")
+
+    monkeypatch.setattr(probe.socket, "create_connection", create_connection)
+    assert probe.main() == 1
+    assert connected == [("127.0.0.1", 9123)]
@@ -0,0 +1,119 @@
+import asyncio
+
+import httpx
+import pytest
+
+from tests.conftest import reflection_body
+
+pytestmark = pytest.mark.anyio
+
+
+async def reflection_count(client):
+    return (await client.get("/api/reflections-admin")).json()["total"]
+
+
+async def test_same_key_replays_the_first_response(admin_client):
+    headers = {"Idempotency-Key": "create-1"}
+    first = await admin_client.post("/api/reflections", json=reflection_body(), headers=headers)
+    again = await admin_client.post("/api/reflections", json=reflection_body(), headers=headers)
+
+    assert first.status_code == again.status_code == 200
+    assert again.json() == first.json()
+    assert again.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert await reflection_count(admin_client) == 1
+
+
+async def test_different_keys_are_different_requests(admin_client):
+    for key in ("a", "b"):
+        response = await admin_client.post("/api/reflections", json=reflection_body(), headers={"Idempotency-Key": key})
+        assert response.status_code == 200
+    assert await reflection_count(admin_client) == 2
+
+
+async def test_same_key_with_a_different_body_is_rejected(admin_client):
+    headers = {"Idempotency-Key": "create-1"}
+    await admin_client.post("/api/reflections", json=reflection_body(), headers=headers)
+    response = await admin_client.post("/api/reflections", json=reflection_body(title="Other"), headers=headers)
+
+    assert response.status_code == 422
+    assert await reflection_count(admin_client) == 1
+
+
+async def test_concurrent_duplicates_on_one_worker_share_a_response(app, admin_client, monkeypatch):
+    db = app.state.db
+    create = db.create_reflection
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_create(*args, **kwargs):
+        started.set()
+        await release.wait()
+        return await create(*args, **kwargs)
+
+    monkeypatch.setattr(db, "create_reflection", slow_create)
+    headers = {"Idempotency-Key": "create-1"}
+    first = asyncio.create_task(admin_client.post("/api/reflections", json=reflection_body(), headers=headers))
+    await asyncio.wait_for(started.wait(), 2)
+    second = asyncio.create_task(admin_client.post("/api/reflections", json=reflection_body(), headers=headers))
+    await asyncio.sleep(0.05)
+    assert not second.done()
+
+    release.set()
+    first, second = await asyncio.wait_for(asyncio.gather(first, second), 2)
+    assert first.json() == second.json()
+    assert await reflection_count(admin_client) == 1
+
+
+async def test_key_in_flight_on_another_worker_is_a_409(app, admin_client, database_url, monkeypatch):
+    from server import create_app
+    from settings import Settings
+
+    db = app.state.db
+    create = db.create_reflection
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_create(*args, **kwargs):
+        started.set()
+        await release.wait()
+        return await create(*args, **kwargs)
+
+    monkeypatch.setattr(db, "create_reflection", slow_create)
+    other_worker = create_app(Settings(
+        database_url=database_url, run_background_tasks=False, seed_initial_data=False, log_format="text"
+    ))
+    await other_worker.router.startup()
+    try:
+        headers = {"Idempotency-Key": "create-1"}
+        first = asyncio.create_task(admin_client.post("/api/reflections", json=reflection_body(), headers=headers))
+        await asyncio.wait_for(started.wait(), 2)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=other_worker), base_url="http://test",
+                                     cookies=admin_client.cookies) as other_client:
+            response = await other_client.post("/api/reflections", json=reflection_body(), headers=headers)
+            assert response.status_code == 409
+            assert response.headers["retry-after"] == "1"
+
+            release.set()
+            assert (await asyncio.wait_for(first, 2)).status_code == 200
+            # Once finished, the other worker replays the stored response
+            replayed = await other_client.post("/api/reflections", json=reflection_body(), headers=headers)
+            assert replayed.headers["idempotent-replayed"] == "true"
+            assert replayed.json() == first.result().json()
+    finally:
+        release.set()
+        await other_worker.router.shutdown()
+
+
+async def test_keys_are_scoped_to_the_session(app, admin_client):
+    headers = {"Idempotency-Key": "create-1"}
+    await admin_client.post("/api/reflections", json=reflection_body(), headers=headers)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as anonymous:
+        response = await anonymous.post("/api/reflections", json=reflection_body(), headers=headers)
+    # Not a replay of the admin's response: the anonymous client is simply refused
+    assert response.status_code == 401
+    assert "idempotent-replayed" not in response.headers
+
+
+async def test_invalid_keys_are_rejected(admin_client):
+    response = await admin_client.post("/api/reflections", json=reflection_body(), headers={"Idempotency-Key": "x" * 256})
+    assert response.status_code == 400
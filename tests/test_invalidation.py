@@ -0,0 +1,58 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import Database
+from invalidation import InvalidationBus, MemoryHub, MemoryInvalidationBus
+
+pytestmark = pytest.mark.anyio
+
+
+def test_the_base_bus_is_abstract():
+    with pytest.raises(TypeError):
+        InvalidationBus()
+
+
+async def test_memory_buses_deliver_to_every_other_bus():
+    hub = MemoryHub()
+    sender, receiver = MemoryInvalidationBus(hub), MemoryInvalidationBus(hub)
+    received = []
+
+    async def on_keys(keys):
+        received.append(keys)
+
+    sender.subscribe(on_keys=on_keys)
+    receiver.subscribe(on_keys=on_keys)
+    await sender.start()
+    await receiver.start()
+    try:
+        await sender.publish(None, ["session:a"])
+        await asyncio.sleep(0.01)
+    finally:
+        await sender.stop()
+        await receiver.stop()
+
+    # The sender skips its own message
+    assert received == [["session:a"]]
+    assert receiver.stats() == {"backend": "memory", "connected": False, "received": 1, "flushes": 0}
+
+
+async def test_logout_evicts_the_session_cached_by_other_workers(db, database_url):
+    other_worker = Database(database_url)
+    await other_worker.connect()
+    try:
+        session = await db.create_admin_session({
+            "session_id": "admin-session",
+            "expires_at": datetime.utcnow() + timedelta(hours=1),
+        })
+        assert await other_worker.get_admin_session(session.session_id) is not None
+        assert session.session_id in other_worker._sessions
+
+        assert await db.delete_admin_session(session.session_id) is True
+        await asyncio.sleep(0.05)
+        assert session.session_id not in other_worker._sessions
+        assert await other_worker.get_admin_session(session.session_id) is None
+        assert await db.delete_admin_session(session.session_id) is False
+    finally:
+        await other_worker.disconnect()
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests.conftest import reflection_body
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_purge_deletes_only_done_jobs_past_retention(db):
+    finished = await db.enqueue_job("reflections.related", {"reflection_id": "a"})
+    failing = await db.enqueue_job("reflections.related", {"reflection_id": "b"})
+    pending = await db.enqueue_job("reflections.related", {"reflection_id": "c"})
+    claimed = {job.id: job for job in await db.claim_due_jobs(2, timedelta(minutes=5))}
+    await db.complete_job(finished.id)
+    await db.fail_job(claimed[failing.id], "boom", None)
+
+    await db.purge_finished_jobs(datetime.utcnow() - timedelta(days=1))
+    assert (await db.get_job_queue_stats()).done == 1
+
+    await db.purge_finished_jobs(datetime.utcnow() + timedelta(seconds=1))
+    stats = await db.get_job_queue_stats()
+    assert (stats.done, stats.failed, stats.pending) == (0, 1, 1)
+    assert pending.id not in claimed
+
+
+async def test_write_succeeds_when_queueing_the_follow_up_job_fails(admin_client, app, monkeypatch):
+    async def unavailable(*args, **kwargs):
+        raise RuntimeError("queue unavailable")
+
+    monkeypatch.setattr(app.state.job_runner, "enqueue", unavailable)
+    response = await admin_client.post("/api/reflections", json=reflection_body())
+    assert response.status_code == 200
+    assert (await admin_client.get(f"/api/reflections/{response.json()['id']}")).status_code == 200
@@ -0,0 +1,103 @@
+import json
+import logging
+import sys
+
+import pytest
+
+from logging_config import (
+    DeferredQueueHandler, JsonFormatter, RedactingFormatter, SamplingFilter, parse_sample_rates, redact,
+)
+
+
+def record(name="app", level=logging.INFO, msg="hello", args=(), exc_info=None, **extra):
+    entry = logging.LogRecord(name, level, __file__, 1, msg, args, exc_info)
+    entry.__dict__.update(extra)
+    return entry
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("from asha.k@example.com", "from a***@example.com"),
+    ("a@b.co and zed+tag@mail.example.org", "a***@b.co and z***@mail.example.org"),
+    ("client 203.0.113.42 connected", "client 203.0.x.x connected"),
+    ("10.0.0.1, 192.168.1.254", "10.0.x.x, 192.168.x.x"),
+    ("version 1.2.3 and @handle", "version 1.2.3 and @handle"),
+    ("nothing to hide", "nothing to hide"),
+])
+def test_redact(text, expected):
+    assert redact(text) == expected
+
+
+def test_sampling_keeps_one_in_n_info_records():
+    sampler = SamplingFilter({"database.reads": 0.25})
+    kept = [sampler.filter(record("database.reads")) for _ in range(12)]
+    assert kept == [True, False, False, False] * 3
+
+
+def test_sampling_passes_warnings_and_other_loggers():
+    sampler = SamplingFilter({"database.reads": 0.25, "noisy": 0})
+    assert all(sampler.filter(record("database.reads", logging.WARNING)) for _ in range(5))
+    assert all(sampler.filter(record("other")) for _ in range(5))
+    # Child loggers are matched by exact name only
+    assert all(sampler.filter(record("database.reads.child")) for _ in range(5))
+
+
+def test_sampling_rates_of_zero_and_one():
+    sampler = SamplingFilter({"noisy": 0, "everything": 1})
+    assert not any(sampler.filter(record("noisy", logging.DEBUG)) for _ in range(5))
+    assert sampler.filter(record("noisy", logging.ERROR))
+    assert all(sampler.filter(record("everything")) for _ in range(5))
+
+
+def test_json_formatter_fields_and_redaction():
+    line = JsonFormatter().format(record(
+        msg="Contact from %s", args=("asha@example.com",), request_id="r-1",
+        client="203.0.113.9", duration_ms=12.5, _private="skip",
+    ))
+    entry = json.loads(line)
+
+    assert entry["level"] == "INFO" and entry["logger"] == "app"
+    assert entry["message"] == "Contact from a***@example.com"
+    assert entry["request_id"] == "r-1"
+    assert entry["client"] == "203.0.x.x"
+    assert entry["duration_ms"] == 12.5
+    assert "_private" not in entry and "args" not in entry and "color_message" not in entry
+    assert entry["time"].endswith("+00:00")
+
+
+def test_json_formatter_includes_redacted_exceptions():
+    try:
+        raise ValueError("bad address asha@example.com")
+    except ValueError:
+        exc_info = sys.exc_info()
+    entry = json.loads(JsonFormatter().format(record(level=logging.ERROR, msg="failed", exc_info=exc_info)))
+    assert "ValueError: bad address a***@example.com" in entry["exception"]
+
+
+def test_json_formatter_serialises_other_values():
+    entry = json.loads(JsonFormatter().format(record(payload={"ids": [1, 2]}, when=object())))
+    assert entry["payload"] == {"ids": [1, 2]}
+    assert entry["when"].startswith("<object object")
+
+
+def test_text_formatter_redacts():
+    formatter = RedactingFormatter("%(levelname)s %(message)s")
+    assert formatter.format(record(msg="login from 198.51.100.7")) == "INFO login from 198.51.x.x"
+
+
+def test_queue_handler_defers_formatting():
+    class Unformattable:
+        def __str__(self):
+            raise AssertionError("formatted in the calling thread")
+
+    entry = record(msg="value %s", args=(Unformattable(),))
+    assert DeferredQueueHandler(None).prepare(entry) is entry
+    assert entry.args and not hasattr(entry, "message")
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates(" database.reads=0.05, uvicorn.access = 0.5 ,junk") == {
+        "database.reads": 0.05, "uvicorn.access": 0.5,
+    }
+    assert parse_sample_rates("") == {}
+    with pytest.raises(ValueError):
+        parse_sample_rates("x=often")
@@ -0,0 +1,87 @@
+import pytest
+
+from tests.conftest import reflection_body
+
+
+def render(content):
+    from markdown_render import render_markdown
+
+    return render_markdown(content)[1]
+
+
+def test_raw_html_is_escaped():
+    html = render('Hello <script>alert("x")</script> and <img src=x onerror="alert(1)">')
+    assert "<script" not in html and "<img" not in html
+    assert "&lt;script&gt;" in html
+
+
+def test_raw_html_blocks_are_escaped():
+    html = render('<div onclick="steal()">\n\nhi\n\n</div>')
+    assert "<div" not in html
+    assert "&lt;div onclick=" in html
+
+
+@pytest.mark.parametrize("url", [
+    "javascript:alert(1)",
+    "JAVASCRIPT:alert(1)",
+    "vbscript:msgbox(1)",
+    "data:text/html;base64,PHNjcmlwdD5hbGVydCgxKTwvc2NyaXB0Pg==",
+])
+def test_unsafe_link_schemes_are_not_linked(url):
+    html = render(f"[click]({url}) <{url}>")
+    assert "href" not in html
+
+
+def test_link_urls_cannot_break_out_of_the_attribute():
+    html = render('[x](https://example.com/"onmouseover="alert(1))')
+    assert 'href="https://example.com/%22onmouseover=%22alert(1)"' in html
+    assert ' onmouseover="' not in html
+
+
+def test_image_alt_text_and_titles_are_escaped():
+    html = render('![<b>alt</b>](https://example.com/a.png "t\\"><script>")')
+    assert "<script" not in html and "<b>" not in html
+
+
+def test_plain_links_and_images_still_render():
+    html = render("[site](https://example.com) ![pic](data:image/png;base64,AAAA)")
+    assert '<a href="https://example.com">site</a>' in html
+    assert '<img src="data:image/png;base64,AAAA" alt="pic"' in html
+
+
+@pytest.mark.anyio
+async def test_lists_leave_out_the_rendered_body(admin_client):
+    created = (await admin_client.post("/api/reflections", json=reflection_body(content="*hi*"))).json()
+    assert created["content_html"] == "<p><em>hi</em></p>\n"
+
+    for response in [
+        await admin_client.get("/api/reflections"),
+        await admin_client.get("/api/reflections-admin"),
+        await admin_client.get("/api/reflections/batch", params={"ids": created["id"]}),
+        await admin_client.post("/api/reflections/batch", json={"ids": [created["id"]]}),
+    ]:
+        assert response.status_code == 200
+        [listed] = response.json()["reflections"]
+        assert "content_html" not in listed and listed["content"] == "*hi*"
+
+    detail = (await admin_client.get(f"/api/reflections/{created['id']}")).json()
+    assert detail["content_html"] == "<p><em>hi</em></p>\n"
+
+
+@pytest.mark.anyio
+async def test_stored_html_from_an_older_renderer_is_rendered_again(db, monkeypatch):
+    import markdown_render
+    from models import ReflectionCreate
+
+    created = await db.create_reflection(ReflectionCreate(**reflection_body(content="*hi*")).dict())
+    await db.database.execute(
+        "UPDATE reflections SET content_html = :html WHERE id = :id",
+        {"html": "<p>stale</p>", "id": created.id},
+    )
+    # Still rendered by the current version: the stored HTML is served as is
+    assert (await db.get_reflection_by_id(created.id)).content_html == "<p>stale</p>"
+
+    monkeypatch.setattr(markdown_render, "RENDERER_VERSION", "test-bump")
+    # A write that leaves the body alone keeps the old hash (and moves past cached reads)
+    await db.update_reflection(created.id, {"title": "Bumped"})
+    assert (await db.get_reflection_by_id(created.id)).content_html == "<p><em>hi</em></p>\n"
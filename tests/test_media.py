@@ -0,0 +1,128 @@
+import io
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+IMAGE_ID = "ab" * 32
+
+
+def image_bytes(mode, size=(40, 30), color=None, fmt="PNG"):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def media_root(tmp_path, monkeypatch):
+    import media
+
+    monkeypatch.setattr(media, "MEDIA_ROOT", tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=90-500", (90, 99)),
+    ("bytes=99-99", (99, 99)),
+    ("bytes=100-", None),
+    ("bytes=20-10", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-9", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(header, expected):
+    from media import _parse_range
+
+    assert _parse_range(header, 100) == expected
+
+
+def test_alpha_is_kept_for_grey_images_with_alpha(media_root):
+    from PIL import Image
+
+    from media import process_image, variant_path
+
+    info = process_image(image_bytes("LA", color=(128, 0)), IMAGE_ID, "png")
+    assert {variant["width"] for variant in info["variants"]} == {40}
+    with Image.open(variant_path(IMAGE_ID, 40, "webp")) as derived:
+        assert derived.mode == "RGBA"
+        assert derived.getpixel((0, 0))[3] == 0
+
+
+def test_opaque_images_become_rgb(media_root):
+    from PIL import Image
+
+    from media import process_image, variant_path
+
+    process_image(image_bytes("L", color=128), IMAGE_ID, "png")
+    with Image.open(variant_path(IMAGE_ID, 40, "webp")) as derived:
+        assert derived.mode == "RGB"
+
+
+def test_images_over_the_pixel_limit_are_refused(media_root, monkeypatch):
+    import media
+
+    # Below Pillow's own error threshold (twice its limit), so only our check stops it
+    monkeypatch.setattr(media, "MAX_IMAGE_PIXELS", 40 * 30 - 1)
+    with pytest.raises(ValueError):
+        media.process_image(image_bytes("RGB"), IMAGE_ID, "png")
+    assert not media.original_path(IMAGE_ID, "png").exists()
+    assert not list(media_root.rglob("*.webp"))
+
+
+@pytest.fixture
+def stored_variant(media_root):
+    import media
+
+    path = media.variant_path(IMAGE_ID, 640, "webp")
+    path.parent.mkdir(parents=True)
+    path.write_bytes(bytes(range(100)))
+    return f"/api/media/{IMAGE_ID}/640.webp"
+
+
+async def test_serves_the_whole_file(client, stored_variant):
+    response = await client.get(stored_variant)
+    assert response.status_code == 200
+    assert response.content == bytes(range(100))
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+
+async def test_range_request_is_a_206(client, stored_variant):
+    response = await client.get(stored_variant, headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == bytes(range(10, 20))
+    assert response.headers["content-range"] == "bytes 10-19/100"
+    assert response.headers["content-length"] == "10"
+
+
+async def test_unsatisfiable_range_is_a_416(client, stored_variant):
+    response = await client.get(stored_variant, headers={"Range": "bytes=100-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */100"
+    assert response.content == b""
+
+
+async def test_matching_etag_is_a_304(client, stored_variant):
+    etag = (await client.get(stored_variant)).headers["etag"]
+    response = await client.get(stored_variant, headers={"If-None-Match": etag, "Range": "bytes=0-9"})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+async def test_range_with_a_stale_if_range_gets_the_whole_file(client, stored_variant):
+    response = await client.get(stored_variant, headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert response.status_code == 200
+    assert len(response.content) == 100
+
+
+async def test_head_sends_headers_only(client, stored_variant):
+    response = await client.head(stored_variant, headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.headers["content-length"] == "10"
+    assert response.content == b""
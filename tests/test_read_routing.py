@@ -0,0 +1,60 @@
+import pytest
+
+import database
+from read_your_writes import current_session
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def replicated_db(database_url):
+    # The primary doubles as its own replica; only the routing decision is under test
+    db = database.Database(database_url, read_url=database_url)
+    await db.connect()
+    yield db
+    await db.disconnect()
+
+
+def use_replica_as(db, session):
+    token = current_session.set(session)
+    try:
+        return db._use_replica()
+    finally:
+        current_session.reset(token)
+
+
+async def test_only_the_writing_session_is_pinned_to_the_primary(replicated_db):
+    token = current_session.set("admin-session")
+    try:
+        await replicated_db.update_contact_status("missing", database.ContactStatus.READ)
+    finally:
+        current_session.reset(token)
+
+    assert use_replica_as(replicated_db, "admin-session") is False
+    assert use_replica_as(replicated_db, "another-session") is True
+    assert use_replica_as(replicated_db, None) is True
+
+
+async def test_anonymous_writes_pin_nobody(replicated_db):
+    await replicated_db.update_contact_status("missing", database.ContactStatus.READ)
+    assert use_replica_as(replicated_db, None) is True
+    assert use_replica_as(replicated_db, "admin-session") is True
+
+
+async def test_pin_expires_after_the_window(replicated_db, monkeypatch):
+    monkeypatch.setattr(database, "READ_YOUR_WRITES_WINDOW", 0.0)
+    token = current_session.set("admin-session")
+    try:
+        await replicated_db.update_contact_status("missing", database.ContactStatus.READ)
+    finally:
+        current_session.reset(token)
+    assert use_replica_as(replicated_db, "admin-session") is True
+
+
+async def test_requests_are_tagged_with_their_session_cookie(admin_client, app):
+    db = app.state.db
+    response = await admin_client.post("/api/reflections", json={
+        "title": "Pinned", "excerpt": "e", "content": "c", "category": "blog", "tags": [],
+    })
+    assert response.status_code == 200
+    assert set(db._last_writes) == {admin_client.cookies["session_id"]}
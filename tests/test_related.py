@@ -0,0 +1,76 @@
+import pytest
+
+from database import Database
+from models import ReflectionCreate
+from recommendations import (
+    RELATED_REBUILD_LOCK, RelatedIndex, rebuild_related_index, refresh_related_reflections, related_index_for,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+async def create(db, title, tags):
+    reflection = ReflectionCreate(
+        title=title, excerpt=title, content=f"{title} and the practice of patience", category="blog", tags=tags
+    )
+    return await db.create_reflection(reflection.dict())
+
+
+async def test_worker_without_the_startup_rebuild_builds_its_index_on_first_job(db):
+    first = await create(db, "Morning practice", ["yoga"])
+    second = await create(db, "Evening practice", ["yoga"])
+    assert not related_index_for(db).built
+
+    await refresh_related_reflections(db, {"reflection_id": second.id})
+
+    assert related_index_for(db).built
+    related = await db.get_related_reflections(first.id)
+    assert [r.id for r in related] == [second.id]
+
+
+async def test_job_is_retried_while_another_worker_rebuilds(db, database_url):
+    if database_url.startswith("sqlite"):
+        pytest.skip("advisory locks are Postgres only")
+    reflection = await create(db, "Morning practice", ["yoga"])
+    other = type(db)(database_url)
+    await other.connect()
+    try:
+        async with other.advisory_lock(RELATED_REBUILD_LOCK) as locked:
+            assert locked
+            with pytest.raises(RuntimeError):
+                await refresh_related_reflections(db, {"reflection_id": reflection.id})
+    finally:
+        await other.disconnect()
+
+
+async def persisted_related(db, reflection_ids):
+    return {rid: [r.id for r in await db.get_related_reflections(rid)] for rid in reflection_ids}
+
+
+async def test_workers_catch_up_with_changes_handled_by_other_workers(db, database_url):
+    posts = [
+        await create(db, "Morning practice", ["yoga"]),
+        await create(db, "Evening practice", ["yoga"]),
+        await create(db, "Investing with patience", ["investing"]),
+    ]
+    other_worker = Database(database_url)
+    await other_worker.connect()
+    try:
+        assert await rebuild_related_index(db)
+        assert await rebuild_related_index(other_worker)
+
+        # This worker handles the first change and the other worker never sees its job
+        await db.update_reflection(posts[0].id, {"title": "Investing practice", "tags": ["investing"]})
+        await refresh_related_reflections(db, {"reflection_id": posts[0].id})
+        await db.delete_reflection(posts[2].id)
+        await refresh_related_reflections(other_worker, {"reflection_id": posts[2].id})
+
+        ids = [post.id for post in posts[:2]]
+        expected = RelatedIndex()
+        versions = await db.get_published_reflection_versions()
+        expected.rebuild(await db.get_reflections_from_primary(list(versions)), versions)
+        assert await persisted_related(db, ids) == {rid: [r for r, _ in expected.related(rid)] for rid in ids}
+        assert posts[2].id not in related_index_for(other_worker)._terms
+        assert related_index_for(other_worker)._terms[posts[0].id] == related_index_for(db)._terms[posts[0].id]
+    finally:
+        await other_worker.disconnect()
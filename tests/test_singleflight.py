@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight, make_key
+
+pytestmark = pytest.mark.anyio
+
+
+class SlowQuery:
+    def __init__(self, result="row"):
+        self.result = result
+        self.started = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.started += 1
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def test_concurrent_identical_calls_share_one_query():
+    flights, query = SingleFlight(), SlowQuery()
+    callers = [asyncio.ensure_future(flights.do("key", query)) for _ in range(10)]
+    await asyncio.sleep(0)
+    query.release.set()
+
+    assert await asyncio.gather(*callers) == ["row"] * 10
+    assert query.started == 1
+    assert flights.stats() == {"calls": 1, "coalesced": 9, "in_flight": 0}
+
+
+async def test_nothing_is_cached_once_the_call_finishes():
+    flights, query = SingleFlight(), SlowQuery()
+    query.release.set()
+    await flights.do("key", query)
+    await flights.do("key", query)
+    assert query.started == 2
+
+
+async def test_every_waiter_gets_the_exception():
+    flights, query = SingleFlight(), SlowQuery(result=RuntimeError("database down"))
+    callers = [asyncio.ensure_future(flights.do("key", query)) for _ in range(3)]
+    await asyncio.sleep(0)
+    query.release.set()
+
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert [str(result) for result in results] == ["database down"] * 3
+    assert flights.in_flight == 0
+
+
+async def test_a_cancelled_caller_does_not_cancel_the_others():
+    flights, query = SingleFlight(), SlowQuery()
+    leaving = asyncio.ensure_future(flights.do("key", query))
+    staying = asyncio.ensure_future(flights.do("key", query))
+    await asyncio.sleep(0)
+    leaving.cancel()
+    await asyncio.sleep(0)
+    query.release.set()
+
+    assert await staying == "row"
+    assert leaving.cancelled()
+
+
+async def test_the_query_is_cancelled_when_its_last_caller_leaves():
+    flights, query = SingleFlight(), SlowQuery()
+    caller = asyncio.ensure_future(flights.do("key", query))
+    await asyncio.sleep(0)
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    await asyncio.sleep(0)
+    assert flights.in_flight == 0
+
+    # A later caller starts a fresh query rather than joining the cancelled one
+    query.release.set()
+    assert await flights.do("key", query) == "row"
+    assert query.started == 2
+
+
+def test_keys_treat_lists_like_tuples():
+    assert make_key("get", (["a", "b"],), {"tags": ["x"]}) == make_key("get", (("a", "b"),), {"tags": ("x",)})
+    assert make_key("get", (1,), {}) != make_key("get", (2,), {})
+
+
+async def test_concurrent_database_reads_are_coalesced(db):
+    before = db.single_flight.stats()
+    results = await asyncio.gather(*(db.get_reflections() for _ in range(5)))
+
+    stats = db.single_flight.stats()
+    assert stats["calls"] - before["calls"] == 1
+    assert stats["coalesced"] - before["coalesced"] == 4
+    assert all(result == results[0] for result in results)
+
+
+class LaggingReplica:
+    """Stands in for a replica that has not seen the latest write yet"""
+
+    def __init__(self, database):
+        self.database = database
+        self.is_connected = True
+        self.release = asyncio.Event()
+        self.reads = 0
+
+    async def fetch_one(self, query):
+        self.reads += 1
+        await self.release.wait()
+        return None
+
+
+@pytest.fixture
+async def lagging_db(db, monkeypatch):
+    replica = LaggingReplica(db.database)
+    monkeypatch.setattr(type(db), "read_database", property(lambda self: replica))
+    db.replica = replica
+    return db
+
+
+async def test_a_session_pinned_to_the_primary_does_not_join_a_replica_flight(lagging_db):
+    from models import ReflectionCreate
+    from read_your_writes import current_session
+
+    db = lagging_db
+    token = current_session.set("admin-session")
+    try:
+        created = await db.create_reflection(ReflectionCreate(
+            title="Fresh", excerpt="e", content="c", category="blog", tags=[]
+        ).dict())
+        # Anonymous readers go to the replica, which does not have the row yet
+        current_session.set(None)
+        public = asyncio.ensure_future(db.get_reflection_by_id(created.id))
+        await asyncio.sleep(0.01)
+        assert db.replica.reads == 1
+
+        current_session.set("admin-session")
+        pinned = await asyncio.wait_for(db.get_reflection_by_id(created.id), 2)
+        assert pinned is not None and pinned.title == "Fresh"
+    finally:
+        current_session.reset(token)
+        db.replica.release.set()
+    assert await public is None
+
+
+async def test_update_returns_the_written_row_while_a_replica_read_is_in_flight(lagging_db):
+    from models import ReflectionCreate
+
+    db = lagging_db
+    created = await db.create_reflection(ReflectionCreate(
+        title="Before", excerpt="e", content="c", category="blog", tags=[]
+    ).dict())
+    public = asyncio.ensure_future(db.get_reflection_by_id(created.id))
+    await asyncio.sleep(0.01)
+    assert db.replica.reads == 1
+    try:
+        updated = await asyncio.wait_for(db.update_reflection(created.id, {"title": "After"}), 2)
+        assert updated.title == "After"
+    finally:
+        db.replica.release.set()
+    await public
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from spam import DROP_SCORE, QUARANTINE_SCORE, SpamAction, SpamFilter
+
+pytestmark = pytest.mark.anyio
+
+HAM_WORDS = "yoga classes weekend retreat breathing practice beginner schedule"
+SPAM_WORDS = "crypto casino bonus winner prize guaranteed profit bitcoin"
+
+
+def contact(message="Do you run weekend yoga classes?", name="Asha", email="asha@example.com", **extra):
+    return {"name": name, "email": email, "reason": "yoga", "message": message, **extra}
+
+
+def trained_filter(docs=10):
+    spam_filter = SpamFilter()
+    for i in range(docs):
+        spam_filter.learn(contact(f"{HAM_WORDS} {i}"), spam=False)
+        spam_filter.learn(contact(f"{SPAM_WORDS} {i}"), spam=True)
+    return spam_filter
+
+
+def test_plain_messages_are_accepted():
+    verdict = SpamFilter().classify(contact())
+    assert verdict == (0.0, SpamAction.ACCEPT, [])
+
+
+@pytest.mark.parametrize("submission, points, reason", [
+    (contact("see http://a.example"), 1.0, "1 links"),
+    (contact("http://a.example https://b.example www.c.example"), 3.0, "3 links"),
+    (contact(name="Visit www.spam.example"), 4.0, "link in name"),
+    (contact(email="someone@mailinator.com"), 2.0, "disposable email domain"),
+])
+def test_cheap_checks(submission, points, reason):
+    verdict = SpamFilter().classify(submission)
+    assert (verdict.score, verdict.reasons) == (points, [reason])
+
+
+def test_repeated_messages_score_higher_each_time():
+    spam_filter = SpamFilter()
+    scores = [spam_filter.classify(contact("Same   text, different spacing")).score for _ in range(3)]
+    assert scores == [0.0, 1.5, 4.0]
+    # Whitespace is normalised before fingerprinting
+    assert spam_filter.classify(contact("same text, different spacing")).score == 4.0
+
+
+def test_thresholds_pick_the_action():
+    quarantined = SpamFilter().classify(contact("http://a http://b http://c"))
+    dropped = SpamFilter().classify(contact(name="www.x.example", email="x@yopmail.com"))
+
+    assert QUARANTINE_SCORE <= quarantined.score < DROP_SCORE and quarantined.action == SpamAction.QUARANTINE
+    assert dropped.score >= DROP_SCORE and dropped.action == SpamAction.DROP
+
+
+def test_model_has_no_opinion_until_trained_on_both_classes():
+    spam_filter = trained_filter(docs=9)
+    assert not spam_filter.model_ready
+    assert spam_filter.classify(contact(SPAM_WORDS)).score == 0.0
+
+
+def test_model_scores_spam_up_and_ham_down():
+    spam_filter = trained_filter()
+    assert spam_filter.model_ready
+
+    spam = spam_filter.classify(contact(SPAM_WORDS))
+    ham = spam_filter.classify(contact(HAM_WORDS))
+    assert spam.score >= 2.0 and spam.reasons[0].startswith("classifier")
+    assert ham.score == -1.0
+
+
+def test_unlearning_undoes_a_label():
+    spam_filter = trained_filter()
+    before = spam_filter.model.counts.copy()
+    spam_filter.learn(contact("one mislabelled message"), spam=True)
+    spam_filter.learn(contact("one mislabelled message"), spam=True, weight=-1)
+    assert (spam_filter.model.counts == before).all()
+    assert spam_filter.model.docs == [10, 10]
+
+
+async def stored_contacts(admin_client):
+    response = await admin_client.get("/api/contact-submissions", params={"include_spam": True})
+    return {c["message"]: c for c in response.json()}
+
+
+async def test_suspicious_submissions_are_quarantined_and_can_be_released(admin_client):
+    message = "Offers: http://a.example http://b.example http://c.example"
+    response = await admin_client.post("/api/contact", json=contact(message))
+    assert response.status_code == 200 and response.json()["success"]
+
+    quarantined = (await stored_contacts(admin_client))[message]
+    assert quarantined["status"] == "quarantined"
+    inbox = (await admin_client.get("/api/contact-submissions")).json()
+    assert message not in [c["message"] for c in inbox]
+
+    released = await admin_client.post(f"/api/contact-submissions/{quarantined['id']}/not-spam")
+    assert released.json()["status"] == "read"
+    assert message in [c["message"] for c in (await admin_client.get("/api/contact-submissions")).json()]
+
+
+async def test_obvious_spam_is_dropped_with_the_usual_response(admin_client):
+    response = await admin_client.post("/api/contact", json=contact(name="www.x.example", email="x@yopmail.com"))
+    assert response.status_code == 200 and response.json()["success"]
+    assert await stored_contacts(admin_client) == {}
+
+
+async def test_labels_from_another_worker_retrain_the_model(db, database_url):
+    from database import Database
+    from models import ContactStatus
+
+    here, there = SpamFilter(), Database(database_url)
+    here.follow(db)
+    await there.connect()
+    try:
+        for i in range(10):
+            for words, status in ((HAM_WORDS, ContactStatus.READ), (SPAM_WORDS, ContactStatus.SPAM)):
+                submission = await there.create_contact_submission(contact(f"{words} {i}"))
+                await there.update_contact_status(submission.id, status)
+
+        for _ in range(100):
+            if here.model_ready and here.model.docs == [10, 10]:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await there.disconnect()
+
+    assert here.model.docs == [10, 10]
+    assert here.classify(contact(SPAM_WORDS)).score >= 2.0
+
+
+async def test_training_replaces_the_model(db):
+    from models import ContactStatus
+
+    spam_filter = trained_filter()
+    await spam_filter.train_from(db)
+    assert not spam_filter.model_ready
+
+    submission = await db.create_contact_submission(contact(SPAM_WORDS))
+    await db.update_contact_status(submission.id, ContactStatus.SPAM)
+    await spam_filter.train_from(db)
+    assert spam_filter.model.docs == [0, 1]